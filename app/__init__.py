@@ -1,6 +1,6 @@
 # app/__init__.py
 
-from flask import Flask, render_template
+from flask import Flask, Response, render_template
 from config import Config
 from flask_sqlalchemy import SQLAlchemy
 
@@ -10,6 +10,9 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    # Pool de conexões e PRAGMAs do SQLite, antes de o engine ser criado.
+    from app.services import database_service
+    database_service.configurar(app)
     db.init_app(app)
 
     # --- REGISTRO DOS BLUEPRINTS (CORRIGIDO) ---
@@ -41,6 +44,12 @@ def create_app(config_class=Config):
     def autenticacao_page():
         return render_template('autenticacao.html')
 
+    @app.route('/metrics')
+    def metrics():
+        """Histogramas de latência por operação e resultado, no formato do Prometheus (por processo)."""
+        from app.services import metrics_service
+        return Response(metrics_service.exportar_prometheus(), mimetype='text/plain; version=0.0.4')
+
     # --- ROTAS DE GESTÃO DA BASE DE DADOS ---
     @app.route('/init-db-super-secret')
     def init_db():
@@ -2,7 +2,7 @@
 
 from flask import request, jsonify, current_app
 from app.autenticacao import bp
-from app.services import auth_service
+from app.services import auth_service, imagem_service
 from app.decorators import require_api_key # NOVIDADE: Importa do novo local
 
 @bp.route('/autenticar', methods=['POST'])
@@ -26,7 +26,7 @@ def autenticar_transacao():
     logger.info(f"Iniciando fluxo de autenticação para o CPF: {cpf}")
 
     try:
-        resultado = auth_service.authenticate_user(cpf, selfie_bytes)
+        resultado = auth_service.authenticate_user(cpf, imagem_service.normalizar(selfie_bytes))
         if resultado['status_geral'] != 'APROVADO':
             if resultado['workflow_executado'].get('busca_usuario', {}).get('status') == 'FALHA':
                 return jsonify(resultado), 404
@@ -1,9 +1,14 @@
 # app/dashboard/routes.py
 
-import json
-from flask import render_template, jsonify, current_app
+from datetime import datetime
+from flask import render_template, jsonify, current_app, request, Response, stream_with_context
 from app.dashboard import bp
+from app.decorators import require_api_key
 from app.models import Verificacao
+from app.services import analytics_service, cache_service, client_registry, consulta_service, database_service, export_service, stats_service
+
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 500
 
 @bp.route('/dashboard')
 def index():
@@ -12,44 +17,141 @@ def index():
     """
     return render_template('dashboard.html', title='Dashboard de Verificações')
 
+def serializar_verificacao(v, incluir_resultado=True):
+    """Monta o registo de uma verificação no formato consumido pelo frontend."""
+    timestamp_str = v.timestamp.strftime('%d/%m/%Y %H:%M:%S') if v.timestamp else 'Data indisponível'
+
+    # O SQLAlchemy já converte o tipo JSON para um dicionário Python aqui.
+    dados_extra = v.dados_extra_json if v.dados_extra_json else {}
+
+    registo = {
+        'id': v.id,
+        'tipo': v.tipo_verificacao,
+        'status': v.status_geral,
+        'timestamp': timestamp_str,
+        'doc_frente_url': v.doc_frente_url,
+        'selfie_url': v.selfie_url,
+        'dados_extra': dados_extra,
+        'risk_score': v.risk_score
+    }
+    if incluir_resultado:
+        registo['dados_completos'] = v.get_resultado_completo()
+    return registo
+
 @bp.route('/api/verifications')
 def get_verifications():
     """
-    API interna que busca todas as verificações no banco de dados
-    e as retorna em formato JSON para o frontend.
+    API interna que retorna as verificações paginadas por cursor (timestamp, id), da mais recente para a mais antiga.
+    Parâmetros: cursor, limite, tipo, status, score_min, score_max, data_inicio, data_fim
+    e resumo=1 para omitir o resultado completo de cada verificação.
     """
     logger = current_app.logger
     try:
-        verifications = Verificacao.query.order_by(Verificacao.timestamp.desc()).all()
-        
+        filtros = consulta_service.ler_filtros(request.args)
+        limite = min(max(request.args.get('limite', LIMITE_PADRAO, type=int), 1), LIMITE_MAXIMO)
+        resumo = request.args.get('resumo', '').lower() in ('1', 'true', 'sim')
+
+        verifications, proximo_cursor = consulta_service.buscar_pagina(
+            filtros, cursor=request.args.get('cursor'), limite=limite, resumo=resumo
+        )
+
         data = []
         for v in verifications:
             try:
-                # NOVIDADE: Verifica se os campos não são nulos antes de processar
-                dados_completos = json.loads(v.resultado_completo_json) if v.resultado_completo_json else {}
-                timestamp_str = v.timestamp.strftime('%d/%m/%Y %H:%M:%S') if v.timestamp else 'Data indisponível'
-                
-                # O SQLAlchemy já converte o tipo JSON para um dicionário Python aqui.
-                dados_extra = v.dados_extra_json if v.dados_extra_json else {}
-
-                data.append({
-                    'id': v.id,
-                    'tipo': v.tipo_verificacao,
-                    'status': v.status_geral,
-                    'timestamp': timestamp_str,
-                    'dados_completos': dados_completos,
-                    'doc_frente_url': v.doc_frente_url,
-                    'selfie_url': v.selfie_url,
-                    'dados_extra': dados_extra,
-                    'risk_score': v.risk_score
-                })
+                data.append(serializar_verificacao(v, incluir_resultado=not resumo))
             except Exception as e:
                 logger.error(f"Erro ao processar o registo de verificação com ID {v.id}: {e}")
                 continue
-                
-        return jsonify(data)
-        
+
+        return jsonify({"dados": data, "proximo_cursor": proximo_cursor})
+
+    except consulta_service.FiltroInvalido as e:
+        return jsonify({"erro": str(e)}), 400
     except Exception as e:
         logger.error(f"Erro 500 na API /api/verifications. Detalhes: {e}", exc_info=True)
         # Retorna a mensagem de erro específica para ajudar na depuração
-        return jsonify({"erro": f"Ocorreu um erro interno no servidor: {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({"erro": f"Ocorreu um erro interno no servidor: {str(e)}"}), 500
+
+@bp.route('/api/verifications/stats')
+def get_verification_stats():
+    """
+    Resumo do dashboard (contagens por status/tipo, histograma de score e throughput horário) das
+    últimas `horas` horas, servido dos rollups em agregado_verificacao; o custo depende da janela
+    e não do tamanho do histórico.
+    """
+    logger = current_app.logger
+    try:
+        horas = min(max(request.args.get('horas', 24, type=int), 1), 24 * 90)
+        return jsonify(stats_service.resumo(horas))
+    except Exception as e:
+        logger.error(f"Erro 500 na API /api/verifications/stats. Detalhes: {e}", exc_info=True)
+        return jsonify({"erro": f"Ocorreu um erro interno no servidor: {str(e)}"}), 500
+
+@bp.route('/api/verifications/<int:verificacao_id>')
+def get_verification(verificacao_id):
+    """Retorna uma verificação com o resultado completo (usado pelo modal de detalhes)."""
+    v = Verificacao.query.get(verificacao_id)
+    if v is None:
+        return jsonify({"erro": "Verificação não encontrada."}), 404
+    return jsonify(serializar_verificacao(v))
+
+@bp.route('/api/verifications/export')
+@require_api_key
+def export_verifications():
+    """
+    Exporta o histórico de verificações em streaming (NDJSON ou CSV), com os mesmos filtros da listagem.
+    O consumo de memória é constante, independentemente do tamanho da tabela.
+    """
+    formato = request.args.get('formato', 'ndjson').lower()
+    try:
+        filtros = consulta_service.ler_filtros(request.args)
+        gerador = export_service.gerar_export(formato, filtros)
+    except consulta_service.FiltroInvalido as e:
+        return jsonify({"erro": str(e)}), 400
+
+    mimetype = 'application/x-ndjson' if formato == 'ndjson' else 'text/csv'
+    nome_arquivo = f"verificacoes_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{formato}"
+    return Response(
+        stream_with_context(gerador),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={nome_arquivo}'}
+    )
+
+@bp.route('/api/metrics/clients')
+def get_client_metrics():
+    """Métricas do registro de clientes (criações e reutilizações por cliente) do processo atual."""
+    return jsonify(client_registry.metricas())
+
+@bp.route('/api/metrics/cache')
+def get_cache_metrics():
+    """Métricas do cache de resultados (hits/misses por verificação) do processo atual."""
+    return jsonify(cache_service.metricas())
+
+@bp.route('/api/metrics/db')
+def get_db_metrics():
+    """Métricas do pool de conexões do processo atual e um teste de conexão (503 se o banco não responder)."""
+    saude = database_service.verificar_conexao()
+    dados = database_service.metricas()
+    dados['saude'] = saude
+    return jsonify(dados), 200 if saude['ok'] else 503
+
+@bp.route('/api/verifications/etapas/stats')
+def get_stage_stats():
+    """
+    Agregados por etapa do workflow (status/taxa de aprovação, distribuição de similaridade do
+    face match e latência), calculados com GROUP BY sobre a tabela resultado_etapa.
+    Aceita os filtros data_inicio e data_fim.
+    """
+    logger = current_app.logger
+    try:
+        filtros = consulta_service.ler_filtros(request.args)
+        return jsonify({
+            "status_por_etapa": analytics_service.status_por_etapa(filtros),
+            "distribuicao_similaridade": analytics_service.distribuicao_similaridade(filtros),
+            "latencia_por_etapa": analytics_service.latencia_por_etapa(filtros)
+        })
+    except consulta_service.FiltroInvalido as e:
+        return jsonify({"erro": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erro 500 na API /api/verifications/etapas/stats. Detalhes: {e}", exc_info=True)
+        return jsonify({"erro": f"Ocorreu um erro interno no servidor: {str(e)}"}), 500
@@ -1,15 +1,57 @@
 # app/models.py
 
+import hashlib
 import json
+import zlib
 from datetime import datetime
 from app import db
 
+
+def normalizar_documento(documento: str) -> str:
+    """Remove a pontuação de um CPF/CNPJ, mantendo apenas os dígitos."""
+    return ''.join(filter(str.isdigit, documento or ''))
+
+
+def chave_documento(documento: str):
+    """Gera a chave indexável (SHA-256 dos dígitos) usada nas buscas por CPF/CNPJ."""
+    digitos = normalizar_documento(documento)
+    if not digitos:
+        return None
+    return hashlib.sha256(digitos.encode('utf-8')).hexdigest()
+
+
+# Formato compacto do resultado completo: 1 byte de formato + JSON minificado comprimido.
+FORMATO_ZLIB = b'Z'
+
+
+def codificar_resultado(resultado: dict) -> bytes:
+    """Serializa o resultado em JSON minificado e comprime com zlib."""
+    minificado = json.dumps(resultado, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return FORMATO_ZLIB + zlib.compress(minificado, 6)
+
+
+def decodificar_resultado(comprimido: bytes, texto: str = None):
+    """Lê o resultado do formato compacto ou, em registros antigos, do JSON em texto."""
+    if comprimido:
+        if comprimido[:1] != FORMATO_ZLIB:
+            raise ValueError(f"Formato de resultado desconhecido: {comprimido[:1]!r}")
+        return json.loads(zlib.decompress(comprimido[1:]))
+    if not texto:
+        return {}
+    try:
+        return json.loads(texto)
+    except ValueError:
+        return texto
+
+
 class Verificacao(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     tipo_verificacao = db.Column(db.String(10), index=True)
     status_geral = db.Column(db.String(20), index=True)
     dados_entrada_json = db.Column(db.Text) 
+    # Registros antigos guardam o resultado em texto; os novos, no formato compacto (ver codificar_resultado).
     resultado_completo_json = db.Column(db.Text)
+    resultado_completo_bin = db.Column(db.LargeBinary, nullable=True)
     timestamp = db.Column(db.DateTime, index=True, default=datetime.utcnow)
 
     # Colunas para as imagens
@@ -19,15 +61,130 @@ class Verificacao(db.Model):
     # Novas colunas que estavam em falta
     dados_extra_json = db.Column(db.JSON, nullable=True)
     risk_score = db.Column(db.Integer, index=True, nullable=True)
+    # Versão das regras de score (score_rules.json) usada para calcular o risk_score.
+    risk_score_versao = db.Column(db.String(50), index=True, nullable=True)
+
+    # Chave normalizada do CPF/CNPJ informado (ver chave_documento), para buscas indexadas.
+    documento_chave = db.Column(db.String(64), index=True, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_verificacao_documento_tipo_timestamp', 'documento_chave', 'tipo_verificacao', 'timestamp'),
+    )
+
+    etapas = db.relationship('ResultadoEtapa', backref='verificacao', cascade='all, delete-orphan')
 
     def __repr__(self):
         return f'<Verificação {self.id} [{self.tipo_verificacao}] - {self.status_geral}>'
     
     def set_dados_entrada(self, dados):
         self.dados_entrada_json = json.dumps(dados)
+        documento = (dados.get('cpf') or dados.get('cnpj')) if isinstance(dados, dict) else None
+        self.documento_chave = chave_documento(documento)
         
     def set_resultado_completo(self, resultado):
         if isinstance(resultado, dict):
-            self.resultado_completo_json = json.dumps(resultado, indent=2)
+            self.resultado_completo_bin = codificar_resultado(resultado)
+            self.resultado_completo_json = None
         else:
-            self.resultado_completo_json = str(resultado)
\ No newline at end of file
+            self.resultado_completo_bin = None
+            self.resultado_completo_json = str(resultado)
+
+    def get_resultado_completo(self):
+        return decodificar_resultado(self.resultado_completo_bin, self.resultado_completo_json)
+
+    @property
+    def tem_resultado_completo(self):
+        return bool(self.resultado_completo_bin or self.resultado_completo_json)
+
+    def registrar_etapas(self, workflow_executado: dict):
+        """Cria os ResultadoEtapa do workflow; são gravados no mesmo commit da verificação."""
+        for nome_etapa, resultado in workflow_executado.items():
+            if isinstance(resultado, dict):
+                self.etapas.append(ResultadoEtapa.de_resultado(nome_etapa, resultado, self.timestamp))
+
+class JobVerificacao(db.Model):
+    """Job de verificação submetido em modo assíncrono; o resultado fica na Verificacao vinculada."""
+    id = db.Column(db.String(36), primary_key=True)
+    tipo_verificacao = db.Column(db.String(10), index=True)
+    status = db.Column(db.String(20), index=True, default='PENDENTE')
+    verificacao_id = db.Column(db.Integer, db.ForeignKey('verificacao.id'), nullable=True)
+    callback_url = db.Column(db.String(500), nullable=True)
+    erro = db.Column(db.Text, nullable=True)
+    criado_em = db.Column(db.DateTime, index=True, default=datetime.utcnow)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    verificacao = db.relationship('Verificacao')
+
+    def __repr__(self):
+        return f'<JobVerificacao {self.id} [{self.tipo_verificacao}] - {self.status}>'
+
+
+
+class ResultadoEtapa(db.Model):
+    """Resultado normalizado de uma etapa do workflow, para consultas analíticas em SQL."""
+    id = db.Column(db.Integer, primary_key=True)
+    verificacao_id = db.Column(db.Integer, db.ForeignKey('verificacao.id', ondelete='CASCADE'), nullable=False, index=True)
+    etapa = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20))
+    similaridade = db.Column(db.Float, nullable=True)
+    score = db.Column(db.Float, nullable=True)
+    latencia_ms = db.Column(db.Float, nullable=True)
+    # Cópia do timestamp da verificação, para agregações por período sem join.
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_resultado_etapa_etapa_status', 'etapa', 'status'),
+        db.Index('ix_resultado_etapa_etapa_timestamp', 'etapa', 'timestamp'),
+    )
+
+    def __repr__(self):
+        return f'<ResultadoEtapa {self.verificacao_id}:{self.etapa} - {self.status}>'
+
+    @staticmethod
+    def mapeamento(nome_etapa: str, resultado: dict, timestamp=None) -> dict:
+        """Valores das colunas para o resultado de uma etapa (usado também em bulk_insert_mappings)."""
+        detalhes = resultado.get('detalhes') if isinstance(resultado.get('detalhes'), dict) else {}
+        score = resultado.get('score', detalhes.get('score_autenticidade'))
+        return {
+            'etapa': nome_etapa,
+            'status': resultado.get('status'),
+            'similaridade': resultado.get('similaridade'),
+            'score': score if isinstance(score, (int, float)) else None,
+            'latencia_ms': resultado.get('duracao_ms'),
+            'timestamp': timestamp or datetime.utcnow()
+        }
+
+    @classmethod
+    def de_resultado(cls, nome_etapa: str, resultado: dict, timestamp=None):
+        return cls(**cls.mapeamento(nome_etapa, resultado, timestamp))
+
+
+class AgregadoVerificacao(db.Model):
+    """Rollup horário das verificações (contagem por tipo, status e faixa de score), mantido a cada inserção."""
+    id = db.Column(db.Integer, primary_key=True)
+    hora = db.Column(db.DateTime, nullable=False)
+    tipo_verificacao = db.Column(db.String(10), nullable=False)
+    status_geral = db.Column(db.String(20), nullable=False)
+    # Faixa de 100 pontos do risk_score (0 = 0-99, ..., 10 = 1000); -1 quando não há score.
+    faixa_score = db.Column(db.Integer, nullable=False)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('hora', 'tipo_verificacao', 'status_geral', 'faixa_score', name='uq_agregado_verificacao_grupo'),
+    )
+
+    def __repr__(self):
+        return f'<AgregadoVerificacao {self.hora} [{self.tipo_verificacao}/{self.status_geral}/{self.faixa_score}] = {self.total}>'
+
+
+class TextoOcr(db.Model):
+    """Texto reconhecido pelo OCR em /extrair-ocr, guardado para refazer a extração de campos (flask reextrair-ocr)."""
+    id = db.Column(db.Integer, primary_key=True)
+    # SHA-256 da imagem enviada ao OCR: o mesmo documento não é armazenado duas vezes.
+    documento_sha256 = db.Column(db.String(64), unique=True, nullable=False)
+    texto = db.Column(db.Text, nullable=False)
+    tipo_documento = db.Column(db.String(10), nullable=True)
+    criado_em = db.Column(db.DateTime, index=True, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<TextoOcr {self.id} [{self.tipo_documento}]>'
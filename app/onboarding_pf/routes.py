@@ -1,29 +1,18 @@
 # app/onboarding/pf/routes.py
 import os
-import re
-import json
 import base64
 from functools import wraps
 from io import BytesIO
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, url_for
 from app import db
-from app.models import Verificacao
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import JobVerificacao, TextoOcr
 from google.cloud import vision
-from google.oauth2 import service_account
-import cloudinary
-import cloudinary.uploader
 from PIL import Image
-from app.services import bgc_service, biometrics_service, data_service, document_service, score_service
+from app.services import cache_service, client_registry, imagem_service, job_service, metrics_service, ocr_service, pf_service
 
 bp = Blueprint('onboarding_pf', __name__)
 
-cloudinary.config(
-    cloud_name=os.environ.get('CLOUDINARY_CLOUD_NAME'),
-    api_key=os.environ.get('CLOUDINARY_API_KEY'),
-    api_secret=os.environ.get('CLOUDINARY_API_SECRET'),
-    secure=True
-)
-
 def require_api_key(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -37,21 +26,27 @@ def require_api_key(f):
     return decorated_function
 
 def get_vision_client():
-    logger = current_app.logger
-    google_creds_json_str = os.environ.get('GOOGLE_CREDENTIALS_JSON')
-    if google_creds_json_str:
-        creds_dict = json.loads(google_creds_json_str)
-        credentials = service_account.Credentials.from_service_account_info(creds_dict)
-        client = vision.ImageAnnotatorClient(credentials=credentials)
-    else:
-        credentials_path = os.path.join(current_app.root_path, '..', 'google-credentials.json')
-        if os.path.exists(credentials_path):
-            os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = credentials_path
-            client = vision.ImageAnnotatorClient()
-        else:
-            client = None
-    return client
+    """Retorna o cliente compartilhado da Google Vision API (ver client_registry)."""
+    return client_registry.get('vision')
+
+def armazenar_texto_ocr(doc_bytes, texto: str, tipo_documento: str = None):
+    """
+    Guarda o texto reconhecido (TextoOcr) para que a extração possa ser refeita depois com flask reextrair-ocr,
+    sem devolvê-lo ao cliente. Desligado com OCR_ARMAZENAR_TEXTO=false; falhas do banco não afetam o OCR.
+    """
+    if not current_app.config.get('OCR_ARMAZENAR_TEXTO', True):
+        return
+    digest = cache_service.digest(doc_bytes)
+    try:
+        if not db.session.query(TextoOcr.id).filter_by(documento_sha256=digest).first():
+            db.session.add(TextoOcr(documento_sha256=digest, texto=texto, tipo_documento=tipo_documento))
+            db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.warning(f"OCR: Texto reconhecido não armazenado: {e}")
 
+@cache_service.cache_por_conteudo('ocr_documento', config=('PROVEDORES_MOCK', 'OCR_CONFIANCA_MINIMA'))
+@metrics_service.medir('vision_ocr')
 def analisar_documento_com_google_vision(doc_frente_bytes):
     logger = current_app.logger
     logger.info("OCR: Iniciando análise de documento...")
@@ -60,46 +55,44 @@ def analisar_documento_com_google_vision(doc_frente_bytes):
         if client is None:
             return {"status": "ERRO_CONFIGURACAO", "motivo": "Serviço de OCR não configurado."}
 
-        # ✅ CORREÇÃO: Removemos o pré-processamento para enviar a imagem original de alta qualidade.
+        # A imagem chega normalizada (orientação EXIF e maior lado limitado por IMAGEM_MAX_LADO); nenhum outro
+        # filtro é aplicado, pois o pré-processamento agressivo piorava o OCR.
         image = vision.Image(content=doc_frente_bytes)
         
+        # Uma única chamada annotate_image traz texto e rostos. DOCUMENT_TEXT_DETECTION preenche tanto
+        # text_annotations quanto full_text_annotation, então o fallback é decidido na mesma resposta.
+        response = client.annotate_image(vision.AnnotateImageRequest(
+            image=image,
+            features=[
+                vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION),
+                vision.Feature(type_=vision.Feature.Type.FACE_DETECTION, max_results=1),
+            ]
+        ))
+        if response.error.message:
+            logger.error(f"OCR: Erro retornado pela Vision API: {response.error.message}")
+            return {"status": "ERRO_API", "motivo": "Ocorreu um erro interno no serviço de IA."}
+
         full_text = ""
-        response_text = client.text_detection(image=image)
-        texts = getattr(response_text, 'text_annotations', None)
+        texts = getattr(response, 'text_annotations', None)
         if texts:
             full_text = texts[0].description
-            logger.info("OCR: text_detection extraiu texto.")
-        else:
-            logger.warning("OCR: text_detection retornou vazio, tentando document_text_detection.")
-            response_doc = client.document_text_detection(image=image)
-            if getattr(response_doc, 'full_text_annotation', None):
-                full_text = response_doc.full_text_annotation.text
-                logger.info("OCR: document_text_detection extraiu texto.")
+            logger.info("OCR: text_annotations extraiu texto.")
+        elif getattr(response, 'full_text_annotation', None):
+            logger.warning("OCR: text_annotations vazio, usando full_text_annotation.")
+            full_text = response.full_text_annotation.text
         
         if not full_text.strip():
             logger.error("OCR: Nenhum texto detectado por nenhuma estratégia.")
             return {"status": "REPROVADO_OCR", "motivo": "Não foi possível detectar texto no documento."}
 
-        full_text_flat = full_text.replace('\n', ' ')
-        dados_extraidos = {}
-        
-        cpf_padrao = r'(\d{3}[\.\s]\d{3}[\.\s]\d{3}[-~\s]\d{2})'
-        if match := re.search(cpf_padrao, full_text_flat):
-            dados_extraidos['cpf'] = match.group(1)
-
-        nasc_padrao = r'(\d{2}/\d{2}/\d{4})'
-        if match := re.search(nasc_padrao, full_text_flat):
-            dados_extraidos['data_nascimento'] = match.group(1)
-        
-        nome_padrao = r'NOME[^\n]+\n([A-Z\s]+?)(?=\n)'
-        if match := re.search(nome_padrao, full_text, re.IGNORECASE):
-            nome = match.group(1).replace('\n', ' ').strip()
-            dados_extraidos['nome'] = re.sub(r'\s+', ' ', nome)
+        extracao = ocr_service.extrair_campos(full_text)
+        armazenar_texto_ocr(doc_frente_bytes, full_text, extracao['tipo_documento'])
+        dados_extraidos = ocr_service.valores(extracao, current_app.config.get('OCR_CONFIANCA_MINIMA', 0))
+        confianca = {campo: c['confianca'] for campo, c in extracao['campos'].items()}
 
         foto_3x4_base64 = None
-        response_face = client.face_detection(image=image)
-        if response_face.face_annotations:
-            face = response_face.face_annotations[0]
+        if response.face_annotations:
+            face = response.face_annotations[0]
             vertices = face.bounding_poly.vertices
             img = Image.open(BytesIO(doc_frente_bytes))
             cropped_image = img.crop((vertices[0].x, vertices[0].y, vertices[2].x, vertices[2].y))
@@ -110,13 +103,15 @@ def analisar_documento_com_google_vision(doc_frente_bytes):
         else:
             logger.warning("OCR: Nenhum rosto detectado no documento.")
 
-        campos_faltando = [f for f in ('nome', 'cpf', 'data_nascimento') if f not in dados_extraidos]
+        campos_faltando = [f for f in ocr_service.CAMPOS_OBRIGATORIOS if f not in dados_extraidos]
         if campos_faltando:
             motivo = f"Não foi possível extrair os campos: {', '.join(campos_faltando)}. Tente uma foto melhor."
-            return {"status": "REPROVADO_OCR", "motivo": motivo}
+            return {"status": "REPROVADO_OCR", "motivo": motivo, "tipo_documento": extracao['tipo_documento'],
+                    "confianca": confianca}
 
-        logger.info(f"OCR: Dados extraídos com sucesso: {dados_extraidos}")
-        return {"status": "SUCESSO", "dados": dados_extraidos, "foto_3x4_base64": foto_3x4_base64}
+        logger.info(f"OCR: Dados extraídos com sucesso ({extracao['tipo_documento'] or 'modelo não identificado'}): {dados_extraidos}")
+        return {"status": "SUCESSO", "dados": dados_extraidos, "tipo_documento": extracao['tipo_documento'],
+                "confianca": confianca, "foto_3x4_base64": foto_3x4_base64}
         
     except Exception as e:
         logger.error(f"OCR: Erro inesperado na função de análise: {e}", exc_info=True)
@@ -132,89 +127,66 @@ def extrair_ocr():
     if not doc_bytes:
         return jsonify({"status": "REPROVADO_OCR", "motivo": "O arquivo do documento está vazio."}), 200
     
-    resultado_ocr = analisar_documento_com_google_vision(doc_bytes)
+    resultado_ocr = analisar_documento_com_google_vision(imagem_service.normalizar(doc_bytes))
     return jsonify(resultado_ocr), 200
 
 @bp.route('/verificar', methods=['POST'])
 @require_api_key
 def verificar_pessoa_fisica():
+    """
+    Executa o workflow de verificação de Pessoa Física.
+    Com modo=async (form ou query string), o workflow é enfileirado e a rota responde 202 com o job_id;
+    o resultado é consultado em /jobs/<job_id> ou enviado ao callback_url informado.
+    """
     logger = current_app.logger
     if 'documento_frente' not in request.files or 'selfie_documento' not in request.files or 'selfie_liveness' not in request.files:
         return jsonify({"erro": "Todos os arquivos são obrigatórios."}), 400
-    
-    nome_cliente = request.form.get('nome', 'N/A')
-    cpf_cliente = request.form.get('cpf', 'N/A')
-    foto_doc_b64 = request.form.get('foto_documento_b64', '')
-    latitude = request.form.get('latitude')
-    longitude = request.form.get('longitude')
 
-    arquivo_frente = request.files['documento_frente']
-    arquivo_selfie_doc = request.files['selfie_documento']
-    arquivo_selfie_liveness = request.files['selfie_liveness']
+    dados = {
+        'nome': request.form.get('nome', 'N/A'),
+        'cpf': request.form.get('cpf', 'N/A'),
+        'foto_documento_b64': request.form.get('foto_documento_b64', ''),
+        'latitude': request.form.get('latitude'),
+        'longitude': request.form.get('longitude'),
+    }
 
-    logger.info(f'ONBOARDING PF: Iniciando fluxo para {nome_cliente}')
-    
-    try:
-        doc_frente_url = cloudinary.uploader.upload(arquivo_frente, folder="onboarding_docs").get('secure_url')
-        selfie_doc_url = cloudinary.uploader.upload(arquivo_selfie_doc, folder="onboarding_selfies_docs").get('secure_url')
-        selfie_liveness_url = cloudinary.uploader.upload(arquivo_selfie_liveness, folder="onboarding_selfies_liveness").get('secure_url')
-    except Exception as e:
-        logger.error(f"Erro no upload para o Cloudinary: {e}", exc_info=True)
-        return jsonify({"erro": f"Falha no upload de imagens: {e}"}), 500
-    
-    arquivo_frente.seek(0); frente_bytes = arquivo_frente.read()
-    arquivo_selfie_doc.seek(0); selfie_doc_bytes = arquivo_selfie_doc.read()
-    arquivo_selfie_liveness.seek(0); selfie_liveness_bytes = arquivo_selfie_liveness.read()
-    
-    foto_doc_bytes = b''
-    if foto_doc_b64:
+    # Ingestão das mídias: cada arquivo é lido uma única vez e o mesmo buffer é
+    # compartilhado pelos uploads (em paralelo) e pelas etapas de análise.
+    midias = {
+        campo: (request.files[campo].read(), request.files[campo].filename)
+        for campo in ('documento_frente', 'selfie_documento', 'selfie_liveness')
+    }
+
+    modo = request.values.get('modo', 'sync').lower()
+    if modo == 'async':
         try:
-            foto_doc_bytes = base64.b64decode(foto_doc_b64)
+            job = job_service.submeter('PF', 'onboarding_pf', {'dados': dados, 'midias': midias},
+                                       callback_url=request.form.get('callback_url'))
+        except job_service.CallbackInvalido as e:
+            return jsonify({"erro": str(e)}), 400
         except Exception as e:
-            logger.error(f"Erro ao decodificar a foto 3x4 do documento: {e}")
-
-    workflow_executado = {}
-    status_geral = "APROVADO"
-    
-    etapas = {
-        'receita_federal_pep': data_service.check_receita_federal_pep(cpf_cliente),
-        'liveness_passivo': biometrics_service.check_liveness_passivo(selfie_liveness_bytes),
-        'face_match_liveness': biometrics_service.check_facematch_real(foto_doc_bytes, selfie_liveness_bytes),
-        'face_match_selfie_com_documento': biometrics_service.check_facematch_real(foto_doc_bytes, selfie_doc_bytes),
-        'background_check': bgc_service.check_background(cpf_cliente, nome_cliente),
-        'validacao_documento': document_service.validate_document(frente_bytes)
-    }
+            logger.error(f"Erro ao enfileirar o job de onboarding PF: {e}", exc_info=True)
+            db.session.rollback()
+            return jsonify({"erro": "Não foi possível enfileirar a verificação."}), 500
+        return jsonify({
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": url_for('onboarding_pf.status_job', job_id=job.id)
+        }), 202
 
-    for nome_etapa, resultado in etapas.items():
-        workflow_executado[nome_etapa] = resultado
-        if resultado.get('status') != 'APROVADO':
-            status_geral = "PENDENCIA"
-            
-    resposta_final = {"status_geral": status_geral, "workflow_executado": workflow_executado}
-    
-    score_result = score_service.calculate_risk_score(workflow_executado)
-    resposta_final["risk_score"] = score_result
-    
     try:
-        dados_extra = {'selfie_documento_url': selfie_doc_url}
-        if latitude and longitude:
-            dados_extra['geolocalizacao'] = {'latitude': latitude, 'longitude': longitude}
-
-        nova_verificacao = Verificacao(
-            tipo_verificacao='PF',
-            status_geral=status_geral,
-            doc_frente_url=doc_frente_url,
-            selfie_url=selfie_liveness_url,
-            dados_extra_json=dados_extra,
-            risk_score=score_result.get('score')
-        )
-        nova_verificacao.set_dados_entrada({'nome': nome_cliente, 'cpf': cpf_cliente})
-        nova_verificacao.set_resultado_completo(resposta_final)
-        db.session.add(nova_verificacao)
-        db.session.commit()
-        logger.info(f"Verificação para {nome_cliente} salva com sucesso no BD.")
-    except Exception as e:
-        logger.error(f'Falha ao salvar no BD: {e}', exc_info=True)
-        db.session.rollback()
+        resposta_final, _ = pf_service.processar_onboarding(dados, midias)
+    except pf_service.FalhaUpload as e:
+        logger.error(f"Erro no upload das imagens: {e}", exc_info=True)
+        return jsonify({"erro": f"Falha no upload de imagens: {e}"}), 500
+
+    return jsonify(resposta_final), 200
 
-    return jsonify(resposta_final), 200
\ No newline at end of file
+@bp.route('/jobs/<job_id>', methods=['GET'])
+@require_api_key
+def status_job(job_id):
+    """Retorna o status de um job assíncrono e, quando concluído, o resultado da verificação."""
+    job = db.session.get(JobVerificacao, job_id)
+    if job is None or job.tipo_verificacao != 'PF':
+        return jsonify({"erro": "Job não encontrado."}), 404
+    return jsonify(job_service.serializar_job(job)), 200
@@ -1,8 +1,9 @@
 # app/onboarding/pj/routes.py
 import os
+import time
 from functools import wraps
-from flask import Blueprint, request, jsonify, current_app
-from app.services import cnpj_service, bgc_service
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from app.services import cnpj_service, bgc_service, lote_service, metrics_service, persistencia_service
 
 # ✅ CORREÇÃO: Nome do Blueprint alterado para ser único e correto.
 bp = Blueprint('onboarding_pj', __name__)
@@ -62,45 +63,78 @@ def formatar_resultado_cnpj(api_data):
         "workflow_executado": { "consulta_cnpj_receita": { "status": status_workflow, "dados": dados_formatados } }
     }
 
-@bp.route('/verificar', methods=['POST'])
-@require_api_key
-def verificar_empresa():
-    """Rota que executa o workflow de verificação de Pessoa Jurídica."""
+def verificar_cnpj(cnpj_limpo: str):
+    """
+    Executa o workflow de verificação de um CNPJ já normalizado (consulta na Receita + BGC dos sócios).
+    Retorna a tupla (resposta, status_code HTTP); em caso de sucesso, resposta['timings'] traz a duração (ms) de cada fase.
+    """
     logger = current_app.logger
-    data = request.get_json()
-    if not data or 'cnpj' not in data:
-        return jsonify({"erro": "O campo 'cnpj' é obrigatório."}), 400
-
-    cnpj_limpo = ''.join(filter(str.isdigit, data.get('cnpj', '')))
-    if len(cnpj_limpo) != 14:
-        return jsonify({"erro": "O CNPJ fornecido é inválido."}), 400
-        
+    inicio = time.perf_counter()
+    timings = {}
     logger.info(f"ONBOARDING PJ: Iniciando consulta para o CNPJ: {cnpj_limpo}")
     
-    resultado = cnpj_service.consultar_cnpj(cnpj_limpo)
+    with metrics_service.medir('consulta_cnpj', timings):
+        resultado = cnpj_service.consultar_cnpj(cnpj_limpo)
     
     if resultado["sucesso"]:
         dados_formatados = formatar_resultado_cnpj(resultado["dados"])
         
         socios = dados_formatados["workflow_executado"]["consulta_cnpj_receita"]["dados"].get("quadro_de_socios_e_administradores", [])
         
+        nomes_socios = [socio.get("nome_socio") for socio in socios if socio.get("nome_socio")]
         resultados_bgc_socios = []
-        if socios:
-            for socio in socios:
-                nome_socio = socio.get("nome_socio")
-                if nome_socio:
-                    resultado_bgc = bgc_service.check_background(nome=nome_socio)
-                    resultados_bgc_socios.append({
-                        "nome_socio": nome_socio,
-                        "status": resultado_bgc.get("status"),
-                        "detalhes": resultado_bgc.get("detalhes")
-                    })
-                    if resultado_bgc.get("status") == "PENDENCIA":
-                        dados_formatados["status_geral"] = "PENDENCIA"
+        with metrics_service.medir('bgc_socios', timings):
+            resultados_bgc = bgc_service.check_background_socios(nomes_socios)
+        for nome_socio, resultado_bgc in zip(nomes_socios, resultados_bgc):
+            resultados_bgc_socios.append({
+                "nome_socio": nome_socio,
+                "status": resultado_bgc.get("status"),
+                "detalhes": resultado_bgc.get("detalhes")
+            })
+            if resultado_bgc.get("status") != "APROVADO":
+                dados_formatados["status_geral"] = "PENDENCIA"
         
         if resultados_bgc_socios:
             dados_formatados["workflow_executado"]["background_check_socios"] = resultados_bgc_socios
 
-        return jsonify(dados_formatados), 200
+        timings['total'] = round((time.perf_counter() - inicio) * 1000, 1)
+        dados_formatados["timings"] = timings
+        return dados_formatados, 200
     else:
-        return jsonify({"erro": resultado["erro"], "detalhes": resultado.get("detalhes")}), resultado.get("status_code", 500)
\ No newline at end of file
+        return {"erro": resultado["erro"], "detalhes": resultado.get("detalhes")}, resultado.get("status_code", 500)
+
+@bp.route('/verificar', methods=['POST'])
+@require_api_key
+def verificar_empresa():
+    """Rota que executa o workflow de verificação de Pessoa Jurídica."""
+    data = request.get_json()
+    if not data or 'cnpj' not in data:
+        return jsonify({"erro": "O campo 'cnpj' é obrigatório."}), 400
+
+    cnpj_limpo = ''.join(filter(str.isdigit, data.get('cnpj', '')))
+    if len(cnpj_limpo) != 14:
+        return jsonify({"erro": "O CNPJ fornecido é inválido."}), 400
+
+    resposta, status_code = verificar_cnpj(cnpj_limpo)
+    if status_code == 200:
+        registro = persistencia_service.registro_verificacao('PJ', {'cnpj': cnpj_limpo}, resposta)
+        persistencia_service.gravar_lote([registro], resposta['timings'])
+    return jsonify(resposta), status_code
+
+@bp.route('/verificar-lote', methods=['POST'])
+@require_api_key
+def verificar_empresas_em_lote():
+    """
+    Verifica uma lista de CNPJs ({"cnpjs": [...]}) e devolve os resultados em NDJSON, à medida que
+    cada CNPJ termina. A primeira linha resume a entrada (válidos, inválidos, duplicados) e a última o lote.
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('cnpjs'), list):
+        return jsonify({"erro": "O campo 'cnpjs' (lista) é obrigatório."}), 400
+
+    limite = current_app.config.get('PJ_LOTE_MAX_ITENS', 5000)
+    if len(data['cnpjs']) > limite:
+        return jsonify({"erro": f"O lote excede o limite de {limite} CNPJs."}), 400
+
+    linhas = lote_service.verificar_cnpjs(data['cnpjs'], verificar_cnpj)
+    return Response(stream_with_context(lote_service.para_ndjson(linhas)), mimetype='application/x-ndjson')
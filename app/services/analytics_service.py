@@ -0,0 +1,62 @@
+# app/services/analytics_service.py
+
+from app import db
+from app.models import ResultadoEtapa
+
+# Etapas cuja distribuição de similaridade é reportada.
+ETAPAS_FACE_MATCH = ('face_match_liveness', 'face_match_selfie_com_documento')
+FAIXAS_SIMILARIDADE = 10
+
+
+def _filtrar_periodo(query, filtros: dict):
+    if 'data_inicio' in filtros:
+        query = query.filter(ResultadoEtapa.timestamp >= filtros['data_inicio'])
+    if 'data_fim' in filtros:
+        query = query.filter(ResultadoEtapa.timestamp <= filtros['data_fim'])
+    return query
+
+
+def status_por_etapa(filtros: dict) -> dict:
+    """Contagem por (etapa, status) e taxa de aprovação de cada etapa, via GROUP BY."""
+    query = db.session.query(ResultadoEtapa.etapa, ResultadoEtapa.status, db.func.count(ResultadoEtapa.id))
+    linhas = _filtrar_periodo(query, filtros).group_by(ResultadoEtapa.etapa, ResultadoEtapa.status).all()
+
+    etapas = {}
+    for etapa, status, total in linhas:
+        dados = etapas.setdefault(etapa, {'total': 0, 'por_status': {}})
+        dados['por_status'][status or 'DESCONHECIDO'] = total
+        dados['total'] += total
+    for dados in etapas.values():
+        dados['taxa_aprovacao'] = round(dados['por_status'].get('APROVADO', 0) / dados['total'], 4) if dados['total'] else None
+    return etapas
+
+
+def distribuicao_similaridade(filtros: dict) -> dict:
+    """Histograma da similaridade do face match em faixas de 0.1, agregado no banco."""
+    faixa = db.func.floor(ResultadoEtapa.similaridade * FAIXAS_SIMILARIDADE)
+    query = (db.session.query(ResultadoEtapa.etapa, faixa.label('faixa'), db.func.count(ResultadoEtapa.id))
+             .filter(ResultadoEtapa.etapa.in_(ETAPAS_FACE_MATCH), ResultadoEtapa.similaridade.isnot(None)))
+    linhas = _filtrar_periodo(query, filtros).group_by(ResultadoEtapa.etapa, faixa).all()
+
+    histogramas = {etapa: [0] * FAIXAS_SIMILARIDADE for etapa in ETAPAS_FACE_MATCH}
+    for etapa, indice, total in linhas:
+        # Similaridade 1.0 cai na última faixa.
+        histogramas[etapa][min(int(indice), FAIXAS_SIMILARIDADE - 1)] += total
+    return {
+        etapa: [
+            {'faixa': f"{i / FAIXAS_SIMILARIDADE:.1f}-{(i + 1) / FAIXAS_SIMILARIDADE:.1f}", 'total': total}
+            for i, total in enumerate(contagens)
+        ]
+        for etapa, contagens in histogramas.items()
+    }
+
+
+def latencia_por_etapa(filtros: dict) -> dict:
+    """Latência média e máxima (ms) por etapa."""
+    query = db.session.query(
+        ResultadoEtapa.etapa,
+        db.func.avg(ResultadoEtapa.latencia_ms),
+        db.func.max(ResultadoEtapa.latencia_ms)
+    ).filter(ResultadoEtapa.latencia_ms.isnot(None))
+    linhas = _filtrar_periodo(query, filtros).group_by(ResultadoEtapa.etapa).all()
+    return {etapa: {'media_ms': round(media or 0, 1), 'maxima_ms': round(maxima or 0, 1)} for etapa, media, maxima in linhas}
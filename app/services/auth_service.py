@@ -1,24 +1,34 @@
 # app/services/auth_service.py
 
+import time
 from flask import current_app
-from app.models import Verificacao
-from app.services import biometrics_service
+from app.models import Verificacao, chave_documento
+from app.services import biometrics_service, metrics_service, storage_service
 
 def authenticate_user(cpf: str, selfie_atual_bytes: bytes):
     """
     Orquestra o fluxo de autenticação transacional para um usuário existente.
     """
     logger = current_app.logger
+    inicio = time.perf_counter()
+    timings = {}
     workflow_executado = {}
     status_geral = "APROVADO"
 
     # Passo 1: Encontrar a verificação de onboarding original do usuário pelo CPF.
     logger.info(f"AUTH_SERVICE: Buscando verificação original para o CPF: {cpf}")
-    # Filtra por verificações de Pessoa Física (PF) que contenham o CPF nos dados de entrada.
-    verificacao_original = Verificacao.query.filter(
-        Verificacao.tipo_verificacao == 'PF',
-        Verificacao.dados_entrada_json.contains(cpf)
-    ).order_by(Verificacao.timestamp.desc()).first()
+    # Busca pela chave normalizada do CPF, coberta pelo índice (documento_chave, tipo_verificacao, timestamp).
+    # Um CPF sem dígitos não tem chave: sem esse retorno antecipado, "documento_chave == None" viraria
+    # IS NULL e casaria com qualquer onboarding gravado sem CPF.
+    chave = chave_documento(cpf)
+    verificacao_original = None
+    if chave is not None:
+        with metrics_service.medir('busca_usuario', timings):
+            verificacao_original = Verificacao.query.filter(
+                Verificacao.documento_chave == chave,
+                Verificacao.documento_chave.isnot(None),
+                Verificacao.tipo_verificacao == 'PF'
+            ).order_by(Verificacao.timestamp.desc()).first()
 
     if not verificacao_original or not verificacao_original.selfie_url:
         logger.warning(f"AUTH_SERVICE: Nenhuma verificação de onboarding com selfie encontrada para o CPF: {cpf}")
@@ -37,19 +47,26 @@ def authenticate_user(cpf: str, selfie_atual_bytes: bytes):
     workflow_executado["busca_usuario"] = {"status": "SUCESSO", "detalhes": "Selfie de onboarding localizada."}
 
     # Passo 2: Liveness Passivo na nova selfie.
-    resultado_liveness_passivo = biometrics_service.check_liveness_passivo(selfie_atual_bytes)
+    with metrics_service.medir('liveness_passivo', timings):
+        resultado_liveness_passivo = biometrics_service.check_liveness_passivo(selfie_atual_bytes)
     workflow_executado["liveness_passivo"] = resultado_liveness_passivo
     if resultado_liveness_passivo["status"] != "APROVADO":
         status_geral = "PENDENCIA"
         
     # Passo 3: Face Match (Selfie Atual vs. Selfie do Onboarding)
-    # A função check_facematch espera bytes, mas para a foto original temos uma URL.
-    # Em um sistema real, faríamos o download da selfie_onboarding_url para comparar.
-    # Aqui, vamos simular essa comparação, passando a URL como se fosse a foto em base64.
-    logger.info("AUTH_SERVICE: Simulando Face Match entre a selfie atual e a selfie do onboarding.")
-    resultado_face_match = biometrics_service.check_facematch(selfie_onboarding_url, selfie_atual_bytes)
+    # A selfie do onboarding é lida do backend de armazenamento onde foi salva.
+    logger.info("AUTH_SERVICE: Comparando a selfie atual com a selfie do onboarding.")
+    try:
+        with metrics_service.medir('download_selfie_onboarding', timings):
+            selfie_onboarding_bytes = storage_service.baixar(selfie_onboarding_url)
+        with metrics_service.medir('face_match_transacional', timings):
+            resultado_face_match = biometrics_service.check_facematch_real(selfie_onboarding_bytes, selfie_atual_bytes)
+    except Exception as e:
+        logger.error(f"AUTH_SERVICE: Falha ao obter a selfie do onboarding: {e}", exc_info=True)
+        resultado_face_match = {"status": "ERRO", "motivo": "Não foi possível obter a selfie do onboarding."}
     workflow_executado["face_match_transacional"] = resultado_face_match
     if resultado_face_match["status"] != "APROVADO":
         status_geral = "PENDENCIA"
 
-    return {"status_geral": status_geral, "workflow_executado": workflow_executado}
\ No newline at end of file
+    timings['total'] = round((time.perf_counter() - inicio) * 1000, 1)
+    return {"status_geral": status_geral, "workflow_executado": workflow_executado, "timings": timings}
\ No newline at end of file
@@ -1,6 +1,7 @@
 # app/services/bgc_service.py
 import random
 from flask import current_app
+from app.services import cache_service, workflow_service
 
 def check_background(nome: str, cpf: str = None) -> dict:
     """
@@ -35,4 +36,36 @@ def check_background(nome: str, cpf: str = None) -> dict:
         return {
             "status": "PENDENCIA",
             "detalhes": pendencias
-        }
\ No newline at end of file
+        }
+
+def _check_background_socio(nome: str) -> dict:
+    """BGC de um sócio, reaproveitando por alguns minutos o resultado de sócios já consultados."""
+    chave = cache_service.digest(nome.strip().upper())
+    resultado = cache_service.buscar('bgc_socio', chave)
+    if resultado is None:
+        resultado = check_background(nome=nome)
+        ttl = current_app.config.get('BGC_SOCIOS_CACHE_TTL', 300)
+        cache_service.gravar('bgc_socio', chave, resultado, ttl)
+    return resultado
+
+
+def check_background_socios(nomes: list) -> list:
+    """
+    Executa o BGC dos sócios (QSA) em paralelo, com concorrência limitada (BGC_SOCIOS_MAX_CONCORRENCIA)
+    e prazo total por empresa (BGC_SOCIOS_PRAZO). Nomes repetidos são consultados uma única vez.
+    Retorna uma lista de resultados na mesma ordem de `nomes`.
+    """
+    logger = current_app.logger
+    unicos = list(dict.fromkeys(nomes))
+    prazo = current_app.config.get('BGC_SOCIOS_PRAZO', 15)
+    logger.info(f"BGC Service: Verificando {len(unicos)} sócios em paralelo (prazo de {prazo}s).")
+
+    resultados = workflow_service.mapear_paralelo(
+        _check_background_socio,
+        unicos,
+        max_concorrencia=current_app.config.get('BGC_SOCIOS_MAX_CONCORRENCIA', 8),
+        prazo=prazo,
+        resultado_timeout=lambda nome: {"status": "ERRO", "detalhes": f"Tempo limite de {prazo}s excedido na verificação do sócio."}
+    )
+    por_nome = dict(zip(unicos, resultados))
+    return [por_nome[nome] for nome in nomes]
@@ -1,26 +1,16 @@
 # app/services/biometrics_service.py
 import base64
-import json
 import os
-import boto3
 from flask import current_app
 from google.cloud import vision
-from google.oauth2 import service_account
+from app.services import cache_service, client_registry, liveness_service, metrics_service
 
 def _get_vision_client():
-    """Inicializa e retorna o cliente da Google Vision API."""
-    logger = current_app.logger
-    google_creds_json_str = current_app.config.get('GOOGLE_CREDENTIALS_JSON') or os.environ.get('GOOGLE_CREDENTIALS_JSON')
-    if google_creds_json_str:
-        creds_dict = json.loads(google_creds_json_str)
-        credentials = service_account.Credentials.from_service_account_info(creds_dict)
-        client = vision.ImageAnnotatorClient(credentials=credentials)
-        logger.debug("Biometrics Service: Autenticado no Vision API.")
-    else:
-        client = vision.ImageAnnotatorClient()
-        logger.debug("Biometrics Service: Autenticado no Vision API via configuração padrão.")
-    return client
+    """Retorna o cliente compartilhado da Google Vision API (ver client_registry)."""
+    return client_registry.get('vision')
 
+@cache_service.cache_por_conteudo('face_match', config=('PROVEDORES_MOCK',))
+@metrics_service.medir('rekognition_face_match')
 def check_facematch_real(img1_bytes: bytes, img2_bytes: bytes) -> dict:
     """
     Compara duas faces usando o Amazon Rekognition.
@@ -36,20 +26,12 @@ def check_facematch_real(img1_bytes: bytes, img2_bytes: bytes) -> dict:
 
     try:
         # Pega as credenciais das variáveis de ambiente
-        aws_access_key = os.environ.get('AWS_ACCESS_KEY_ID')
-        aws_secret_key = os.environ.get('AWS_SECRET_ACCESS_KEY')
-        aws_region = os.environ.get('AWS_REGION', 'us-east-1')
-
-        if not all([aws_access_key, aws_secret_key]):
+        credenciais = all([os.environ.get('AWS_ACCESS_KEY_ID'), os.environ.get('AWS_SECRET_ACCESS_KEY')])
+        if not credenciais and not current_app.config.get('PROVEDORES_MOCK'):
             logger.error("Credenciais da AWS não configuradas nas variáveis de ambiente.")
             return {"status": "ERRO", "motivo": "Serviço de biometria não configurado no servidor."}
 
-        rekognition_client = boto3.client(
-            'rekognition',
-            aws_access_key_id=aws_access_key,
-            aws_secret_access_key=aws_secret_key,
-            region_name=aws_region
-        )
+        rekognition_client = client_registry.get('rekognition')
 
         response = rekognition_client.compare_faces(
             SourceImage={'Bytes': img1_bytes},
@@ -85,15 +67,45 @@ def check_facematch_real(img1_bytes: bytes, img2_bytes: bytes) -> dict:
         return {"status": "ERRO", "motivo": "Falha no serviço de biometria."}
 
 
+@cache_service.cache_por_conteudo('liveness_passivo', config=(
+    'PROVEDORES_MOCK', 'LIVENESS_MODO', 'LIVENESS_LOCAL_MIN_LADO', 'LIVENESS_LOCAL_CONTRASTE_MIN',
+    'LIVENESS_LOCAL_BRILHO_MIN', 'LIVENESS_LOCAL_BRILHO_MAX', 'LIVENESS_LOCAL_NITIDEZ_MIN', 'LIVENESS_LOCAL_PELE_MIN'))
 def check_liveness_passivo(selfie_bytes: bytes) -> dict:
-    """Realiza uma Prova de Vida Passiva aprimorada, usando a Google Vision API."""
-    logger = current_app.logger
-    logger.info("Biometrics Service (Liveness Passivo v2): Iniciando verificação aprimorada...")
+    """
+    Realiza a Prova de Vida Passiva com o motor definido em LIVENESS_MODO:
+    'vision' (Google Vision), 'local_vision' (pré-filtro local; só as selfies aprovadas nele vão ao Vision)
+    ou 'local' (apenas o pré-filtro local, para ambientes sem acesso ao provedor). O pré-filtro avalia a
+    qualidade da imagem e se há uma região com cor de pele no centro, mas não detecta nem conta rostos;
+    por isso, no modo 'local' a selfie que passa por ele fica em PENDENCIA, nunca APROVADO.
+    """
+    modo = current_app.config.get('LIVENESS_MODO', 'vision')
+    if modo not in liveness_service.MODOS:
+        current_app.logger.error(f"LIVENESS_MODO inválido: '{modo}'.")
+        return {"status": "ERRO_CONFIGURACAO", "motivo": "Modo de prova de vida inválido na configuração."}
     try:
         if selfie_bytes.startswith(b"data:image"):
             header, b64data = selfie_bytes.split(b",", 1)
             selfie_bytes = base64.b64decode(b64data)
+    except Exception as e:
+        current_app.logger.error(f"Erro ao decodificar a selfie: {e}")
+        return {"status": "REPROVADO", "motivo": "Selfie muito pequena ou inválida."}
+
+    if modo in ('local_vision', 'local'):
+        resultado_local = liveness_service.avaliar(selfie_bytes)
+        if resultado_local['status'] != 'APROVADO':
+            return resultado_local
+        if modo == 'local':
+            return dict(resultado_local, status="PENDENCIA",
+                        detalhes="Selfie aprovada no pré-filtro local, que não detecta rostos; requer revisão.")
+    return _check_liveness_vision(selfie_bytes)
 
+
+@metrics_service.medir('vision_liveness')
+def _check_liveness_vision(selfie_bytes: bytes) -> dict:
+    """Realiza uma Prova de Vida Passiva aprimorada, usando a Google Vision API."""
+    logger = current_app.logger
+    logger.info("Biometrics Service (Liveness Passivo v2): Iniciando verificação aprimorada...")
+    try:
         if len(selfie_bytes) < 5000:
             return {"status": "REPROVADO", "motivo": "Selfie muito pequena ou inválida."}
 
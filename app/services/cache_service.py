@@ -0,0 +1,197 @@
+# app/services/cache_service.py
+
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import wraps
+from flask import current_app
+
+# Status que indicam falha transitória (configuração, rede, API) e por isso nunca são armazenados.
+STATUS_NAO_CACHEAVEIS = {"ERRO", "ERRO_API", "ERRO_CONFIGURACAO"}
+
+
+class MemoryCache:
+    """Cache em memória do processo, com expiração por TTL e remoção LRU ao atingir `max_itens`."""
+
+    def __init__(self, config):
+        self.max_itens = config.get('CACHE_MAX_ITENS', 1024)
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return copy.deepcopy(valor)
+
+    def set(self, chave, valor, ttl):
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + ttl, copy.deepcopy(valor))
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def tamanho(self):
+        return len(self._itens)
+
+
+class RedisCache:
+    """Cache compartilhado entre processos/instâncias, em Redis (requer o pacote `redis`)."""
+
+    def __init__(self, config):
+        import redis
+        self._redis = redis.Redis.from_url(config['CACHE_REDIS_URL'])
+        self._prefixo = config.get('CACHE_REDIS_PREFIX', 'antifraude:')
+
+    def get(self, chave):
+        valor = self._redis.get(self._prefixo + chave)
+        return json.loads(valor) if valor is not None else None
+
+    def set(self, chave, valor, ttl):
+        self._redis.set(self._prefixo + chave, json.dumps(valor), ex=max(1, int(ttl)))
+
+    def tamanho(self):
+        return None
+
+
+BACKENDS = {
+    'memory': MemoryCache,
+    'redis': RedisCache,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+_contadores = {}
+_contadores_lock = threading.Lock()
+
+
+def get_backend():
+    """Retorna o backend configurado em CACHE_BACKEND (criado uma única vez por processo)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                nome_backend = current_app.config.get('CACHE_BACKEND', 'memory')
+                if nome_backend not in BACKENDS:
+                    raise ValueError(f"Backend de cache desconhecido: {nome_backend}")
+                _backend = BACKENDS[nome_backend](current_app.config)
+    return _backend
+
+
+def _contar(nome: str, contador: str):
+    with _contadores_lock:
+        contadores = _contadores.setdefault(nome, {'hits': 0, 'misses': 0})
+        contadores[contador] += 1
+
+
+def digest(conteudo) -> str:
+    """SHA-256 do conteúdo (bytes ou str)."""
+    if isinstance(conteudo, str):
+        conteudo = conteudo.encode('utf-8')
+    return hashlib.sha256(conteudo or b'').hexdigest()
+
+
+def buscar(nome: str, chave: str):
+    """Lê `chave` do cache `nome`, contabilizando hit/miss. Falhas do backend contam como miss."""
+    try:
+        resultado = get_backend().get(f"{nome}:{chave}")
+    except Exception as e:
+        current_app.logger.warning(f"CACHE_SERVICE: Falha ao ler o cache '{nome}': {e}")
+        resultado = None
+    _contar(nome, 'hits' if resultado is not None else 'misses')
+    return resultado
+
+
+def gravar(nome: str, chave: str, valor, ttl: float = None):
+    """Grava `valor` no cache `nome` com o TTL informado (padrão: CACHE_TTL)."""
+    ttl = ttl if ttl is not None else current_app.config.get('CACHE_TTL', 3600)
+    try:
+        get_backend().set(f"{nome}:{chave}", valor, ttl)
+    except Exception as e:
+        current_app.logger.warning(f"CACHE_SERVICE: Falha ao gravar no cache '{nome}': {e}")
+
+
+_em_andamento = {}
+_em_andamento_lock = threading.Lock()
+
+
+def executar_unico(chave: str, funcao):
+    """
+    Coalesce chamadas concorrentes: se já houver uma execução em andamento para `chave`,
+    aguarda o resultado dela em vez de disparar outra chamada (inclusive exceções são repassadas).
+    """
+    with _em_andamento_lock:
+        futuro = _em_andamento.get(chave)
+        lider = futuro is None
+        if lider:
+            futuro = Future()
+            _em_andamento[chave] = futuro
+
+    if not lider:
+        return futuro.result()
+
+    try:
+        futuro.set_result(funcao())
+    except Exception as e:
+        futuro.set_exception(e)
+    finally:
+        with _em_andamento_lock:
+            _em_andamento.pop(chave, None)
+    return futuro.result()
+
+
+def _digest_config(chaves: tuple) -> str:
+    """Digest curto dos valores atuais das chaves de configuração `chaves`."""
+    valores = [current_app.config.get(chave) for chave in chaves]
+    return digest(json.dumps(valores, default=str))[:16]
+
+
+def cache_por_conteudo(nome: str, config: tuple = ()):
+    """
+    Decorator que armazena o resultado de uma verificação indexado pelo SHA-256 dos argumentos
+    (para o face match, os digests das duas imagens, na ordem recebida).
+    `config` lista as chaves de configuração que alteram o resultado (ex: LIVENESS_MODO); os seus valores
+    entram na chave, para que uma mudança de configuração, ou outra instância com outra configuração
+    usando o mesmo Redis, não receba resultados calculados com outros parâmetros.
+    Resultados com status de erro transitório não são armazenados.
+    """
+    def decorator(funcao):
+        @wraps(funcao)
+        def wrapper(*args):
+            if not current_app.config.get('CACHE_ENABLED', True):
+                return funcao(*args)
+
+            chave = ":".join(digest(a) for a in args)
+            if config:
+                chave = f"{_digest_config(config)}:{chave}"
+            resultado = buscar(nome, chave)
+            if resultado is not None:
+                return resultado
+
+            resultado = funcao(*args)
+            if isinstance(resultado, dict) and resultado.get('status') not in STATUS_NAO_CACHEAVEIS:
+                gravar(nome, chave, resultado)
+            return resultado
+        return wrapper
+    return decorator
+
+
+def metricas() -> dict:
+    """Contadores de hits/misses por cache e o número de itens no backend local."""
+    with _contadores_lock:
+        caches = {nome: dict(valores) for nome, valores in _contadores.items()}
+    return {
+        'backend': type(_backend).__name__ if _backend else None,
+        'itens': _backend.tamanho() if _backend else 0,
+        'caches': caches,
+    }
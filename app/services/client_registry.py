@@ -0,0 +1,104 @@
+# app/services/client_registry.py
+
+import json
+import os
+import threading
+from flask import current_app
+
+# Fábricas registradas: nome -> callable(app) que cria o cliente.
+_fabricas = {}
+_clientes = {}
+_metricas = {}
+_metricas_lock = threading.Lock()
+_lock = threading.Lock()
+_pid = os.getpid()
+
+
+def registrar(nome: str, fabrica):
+    """Registra a fábrica de um cliente. O cliente só é criado no primeiro `get`."""
+    _fabricas[nome] = fabrica
+
+
+def get(nome: str):
+    """
+    Retorna o cliente compartilhado `nome`, criando-o sob demanda (uma única vez por processo).
+    Seguro entre threads; após um fork o processo filho cria os seus próprios clientes.
+    """
+    if os.getpid() != _pid:
+        resetar()
+    cliente = _clientes.get(nome)
+    if cliente is not None:
+        _contar(nome, 'reutilizacoes')
+        return cliente
+    with _lock:
+        cliente = _clientes.get(nome)
+        if cliente is None:
+            cliente = _fabricas[nome](current_app)
+            _clientes[nome] = cliente
+            _contar(nome, 'criacoes')
+            current_app.logger.info(f"CLIENT_REGISTRY: Cliente '{nome}' criado (pid {os.getpid()}).")
+            return cliente
+    _contar(nome, 'reutilizacoes')
+    return cliente
+
+
+def _contar(nome: str, contador: str):
+    with _metricas_lock:
+        metricas = _metricas.setdefault(nome, {'criacoes': 0, 'reutilizacoes': 0})
+        metricas[contador] += 1
+
+
+def resetar():
+    """Descarta os clientes do processo atual (usado após fork: canais gRPC/TLS não sobrevivem ao fork)."""
+    global _lock, _metricas_lock, _pid
+    _lock = threading.Lock()
+    _metricas_lock = threading.Lock()
+    _clientes.clear()
+    _metricas.clear()
+    _pid = os.getpid()
+
+
+def metricas() -> dict:
+    """Retorna os contadores de criações e reutilizações por cliente no processo atual."""
+    with _metricas_lock:
+        clientes = {nome: dict(valores, ativo=nome in _clientes) for nome, valores in _metricas.items()}
+    return {'pid': os.getpid(), 'clientes': clientes}
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=resetar)
+
+
+def _criar_vision_client(app):
+    if app.config.get('PROVEDORES_MOCK'):
+        from app.services.provedores_mock import VisionMock
+        return VisionMock(app.config)
+    from google.cloud import vision
+    from google.oauth2 import service_account
+    google_creds_json_str = app.config.get('GOOGLE_CREDENTIALS_JSON') or os.environ.get('GOOGLE_CREDENTIALS_JSON')
+    if google_creds_json_str:
+        credentials = service_account.Credentials.from_service_account_info(json.loads(google_creds_json_str))
+        return vision.ImageAnnotatorClient(credentials=credentials)
+
+    credentials_path = os.path.join(app.root_path, '..', 'google-credentials.json')
+    if os.path.exists(credentials_path):
+        credentials = service_account.Credentials.from_service_account_file(credentials_path)
+        return vision.ImageAnnotatorClient(credentials=credentials)
+    return vision.ImageAnnotatorClient()
+
+
+def _criar_rekognition_client(app):
+    if app.config.get('PROVEDORES_MOCK'):
+        from app.services.provedores_mock import RekognitionMock
+        return RekognitionMock(app.config)
+    import boto3
+    return boto3.client(
+        'rekognition',
+        aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY'),
+        region_name=os.environ.get('AWS_REGION', 'us-east-1')
+    )
+
+
+registrar('vision', _criar_vision_client)
+registrar('rekognition', _criar_rekognition_client)
@@ -1,31 +1,175 @@
 # app/services/cnpj_service.py
+import os
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from flask import current_app
+from app.services import cache_service, metrics_service, provedores_mock
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class LimitadorTaxa:
+    """Token bucket compartilhado entre as threads: no máximo `taxa` chamadas por segundo (com rajada de `rajada`)."""
+
+    def __init__(self, taxa: float, rajada: int = 1):
+        self.taxa = taxa
+        self.capacidade = max(1, rajada)
+        self._tokens = float(self.capacidade)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def aguardar(self):
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.taxa)
+                self._ultimo = agora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.taxa
+            time.sleep(espera)
+
+
+_limitador = None
+
+
+def _get_limitador():
+    """
+    Limitador das chamadas à BrasilAPI (BRASILAPI_RATE_LIMIT por segundo, compartilhado pelo processo; 0 desativa).
+    Desligado com PROVEDORES_MOCK, em que a latência e os erros já vêm do simulador.
+    """
+    global _limitador
+    taxa = current_app.config.get('BRASILAPI_RATE_LIMIT', 0)
+    if not taxa or current_app.config.get('PROVEDORES_MOCK'):
+        return None
+    if _limitador is None:
+        with _session_lock:
+            if _limitador is None:
+                _limitador = LimitadorTaxa(taxa, current_app.config.get('BRASILAPI_RATE_BURST', 1))
+    return _limitador
+
+
+def _get_session():
+    """
+    Retorna a sessão HTTP compartilhada (pool de conexões com keep-alive) para a BrasilAPI,
+    ou o substituto local com PROVEDORES_MOCK.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None and current_app.config.get('PROVEDORES_MOCK'):
+                _session = provedores_mock.BrasilApiMock(current_app.config)
+            elif _session is None:
+                tamanho_pool = current_app.config.get('BRASILAPI_POOL_SIZE', 20)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=tamanho_pool, pool_maxsize=tamanho_pool)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def _resetar_session():
+    """Descarta a sessão e o limitador herdados no processo filho após um fork (os sockets não podem ser compartilhados)."""
+    global _session, _session_lock, _limitador
+    _session = None
+    _session_lock = threading.Lock()
+    _limitador = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_resetar_session)
+
+
+def _espera_429(response, tentativa: int) -> float:
+    """Segundos a aguardar após um 429: o Retry-After (segundos ou data HTTP), ou backoff exponencial (1s, 2s, 4s...)."""
+    valor = (getattr(response, 'headers', None) or {}).get('Retry-After')
+    espera = 2.0 ** tentativa
+    if valor:
+        try:
+            espera = float(valor)
+        except ValueError:
+            try:
+                espera = (parsedate_to_datetime(valor) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                pass
+    return min(max(0.0, espera), current_app.config.get('BRASILAPI_RETRY_AFTER_MAX', 30))
+
+
+def _requisitar_brasilapi(cnpj_limpo: str) -> dict:
+    url = f"{current_app.config.get('BRASILAPI_BASE_URL', 'https://brasilapi.com.br/api/cnpj/v1/')}{cnpj_limpo}"
+    limitador = _get_limitador()
+    tentativas_429 = current_app.config.get('BRASILAPI_TENTATIVAS_429', 3)
+    tentativa = 0
+    while True:
+        if limitador is not None:
+            limitador.aguardar()
+        with metrics_service.medir('brasilapi') as medicao:
+            response = _get_session().get(url, timeout=current_app.config.get('BRASILAPI_TIMEOUT', 10))
+            medicao.resultado = f"http_{response.status_code}"
+        if response.status_code != 429 or tentativa >= tentativas_429:
+            break
+        espera = _espera_429(response, tentativa)
+        current_app.logger.warning(f"CNPJ_SERVICE: BrasilAPI respondeu 429; nova tentativa em {espera:.1f}s.")
+        time.sleep(espera)
+        tentativa += 1
+    consulta = {
+        "status_code": response.status_code,
+        "dados": response.json() if response.status_code == 200 else None,
+        "data_consulta_utc": datetime.now(timezone.utc).isoformat()
+    }
+
+    # Sucessos ficam em cache por CNPJ_CACHE_TTL; CNPJs inexistentes (404) por CNPJ_CACHE_TTL_NEGATIVO.
+    # Demais falhas (429, 5xx) não são armazenadas.
+    if response.status_code == 200:
+        cache_service.gravar('cnpj', cnpj_limpo, consulta, current_app.config.get('CNPJ_CACHE_TTL', 86400))
+    elif response.status_code == 404:
+        cache_service.gravar('cnpj', cnpj_limpo, consulta, current_app.config.get('CNPJ_CACHE_TTL_NEGATIVO', 3600))
+    return consulta
+
+
+def buscar_receita(cnpj_limpo: str) -> dict:
+    """
+    Retorna a resposta da BrasilAPI para o CNPJ: {"status_code", "dados", "data_consulta_utc"}.
+    Usa o cache de CNPJs e coalesce consultas simultâneas ao mesmo CNPJ em uma única chamada.
+    Propaga requests.exceptions.RequestException em caso de falha de comunicação.
+    """
+    if current_app.config.get('CACHE_ENABLED', True):
+        consulta = cache_service.buscar('cnpj', cnpj_limpo)
+        if consulta is not None:
+            return consulta
+    return cache_service.executar_unico(f"cnpj:{cnpj_limpo}", lambda: _requisitar_brasilapi(cnpj_limpo))
+
 
 def consultar_cnpj(cnpj_limpo: str):
     """
     Consulta um CNPJ na BrasilAPI e retorna os dados de forma estruturada.
     """
     try:
-        brasil_api_url = f"https://brasilapi.com.br/api/cnpj/v1/{cnpj_limpo}"
-        response = requests.get(brasil_api_url, timeout=10)
+        consulta = buscar_receita(cnpj_limpo)
 
         # Adiciona informações de diagnóstico no retorno
         consulta_info = {
             "fonte_dos_dados": "BrasilAPI",
-            "data_consulta_utc": datetime.now(timezone.utc).isoformat()
+            "data_consulta_utc": consulta["data_consulta_utc"]
         }
 
-        if response.status_code == 200:
-            dados_api = response.json()
+        if consulta["status_code"] == 200:
+            dados_api = dict(consulta["dados"])
             # Combina os dados da consulta com as informações de diagnóstico
             dados_api.update(consulta_info)
             return {"sucesso": True, "dados": dados_api}
-        
+
         else:
             return {
-                "sucesso": False, 
-                "status_code": response.status_code,
+                "sucesso": False,
+                "status_code": consulta["status_code"],
                 "erro": "CNPJ não encontrado ou serviço indisponível.",
                 "detalhes": consulta_info
             }
@@ -35,4 +179,4 @@ def consultar_cnpj(cnpj_limpo: str):
             "sucesso": False,
             "erro": "Falha de comunicação com a API de consulta.",
             "detalhes": str(e)
-        }
\ No newline at end of file
+        }
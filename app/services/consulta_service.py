@@ -0,0 +1,106 @@
+# app/services/consulta_service.py
+
+import base64
+from datetime import datetime
+from app import db
+from app.models import Verificacao
+
+# Colunas retornadas no modo resumo (sem o resultado completo).
+COLUNAS_RESUMO = (
+    Verificacao.id, Verificacao.tipo_verificacao, Verificacao.status_geral, Verificacao.timestamp,
+    Verificacao.doc_frente_url, Verificacao.selfie_url, Verificacao.dados_extra_json, Verificacao.risk_score,
+)
+
+
+class FiltroInvalido(ValueError):
+    """Parâmetro de filtro ou cursor inválido recebido na consulta."""
+
+
+def _parse_data(valor: str, nome: str):
+    try:
+        return datetime.fromisoformat(valor)
+    except ValueError:
+        raise FiltroInvalido(f"O parâmetro '{nome}' deve estar no formato ISO 8601 (ex: 2024-01-31 ou 2024-01-31T12:00:00).")
+
+
+def _parse_int(valor: str, nome: str):
+    try:
+        return int(valor)
+    except ValueError:
+        raise FiltroInvalido(f"O parâmetro '{nome}' deve ser um número inteiro.")
+
+
+def ler_filtros(args) -> dict:
+    """Converte os parâmetros da query string (ou opções da CLI) no dicionário de filtros."""
+    filtros = {}
+    if args.get('tipo'):
+        filtros['tipo'] = args['tipo'].upper()
+    if args.get('status'):
+        filtros['status'] = args['status'].upper()
+    if args.get('score_min') not in (None, ''):
+        filtros['score_min'] = _parse_int(str(args['score_min']), 'score_min')
+    if args.get('score_max') not in (None, ''):
+        filtros['score_max'] = _parse_int(str(args['score_max']), 'score_max')
+    if args.get('data_inicio'):
+        filtros['data_inicio'] = _parse_data(args['data_inicio'], 'data_inicio')
+    if args.get('data_fim'):
+        filtros['data_fim'] = _parse_data(args['data_fim'], 'data_fim')
+    return filtros
+
+
+def aplicar_filtros(query, filtros: dict):
+    """Aplica os filtros (todos sobre colunas indexadas) a uma query de Verificacao."""
+    if 'tipo' in filtros:
+        query = query.filter(Verificacao.tipo_verificacao == filtros['tipo'])
+    if 'status' in filtros:
+        query = query.filter(Verificacao.status_geral == filtros['status'])
+    if 'score_min' in filtros:
+        query = query.filter(Verificacao.risk_score >= filtros['score_min'])
+    if 'score_max' in filtros:
+        query = query.filter(Verificacao.risk_score <= filtros['score_max'])
+    if 'data_inicio' in filtros:
+        query = query.filter(Verificacao.timestamp >= filtros['data_inicio'])
+    if 'data_fim' in filtros:
+        query = query.filter(Verificacao.timestamp <= filtros['data_fim'])
+    return query
+
+
+def codificar_cursor(timestamp: datetime, id_: int) -> str:
+    bruto = f"{timestamp.isoformat()}|{id_}".encode('utf-8')
+    return base64.urlsafe_b64encode(bruto).decode('ascii')
+
+
+def decodificar_cursor(cursor: str):
+    try:
+        timestamp_str, id_str = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(timestamp_str), int(id_str)
+    except (ValueError, UnicodeDecodeError):
+        raise FiltroInvalido("O cursor informado é inválido.")
+
+
+def buscar_pagina(filtros: dict, cursor: str = None, limite: int = 50, resumo: bool = False):
+    """
+    Retorna uma página de verificações em ordem (timestamp, id) decrescente, usando paginação por chave.
+    Retorna a tupla (linhas, proximo_cursor); proximo_cursor é None na última página.
+    """
+    if resumo:
+        query = db.session.query(*COLUNAS_RESUMO)
+    else:
+        query = Verificacao.query
+    query = aplicar_filtros(query, filtros)
+
+    if cursor:
+        cursor_ts, cursor_id = decodificar_cursor(cursor)
+        query = query.filter(db.or_(
+            Verificacao.timestamp < cursor_ts,
+            db.and_(Verificacao.timestamp == cursor_ts, Verificacao.id < cursor_id)
+        ))
+
+    linhas = query.order_by(Verificacao.timestamp.desc(), Verificacao.id.desc()).limit(limite + 1).all()
+
+    proximo_cursor = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        ultima = linhas[-1]
+        proximo_cursor = codificar_cursor(ultima.timestamp, ultima.id)
+    return linhas, proximo_cursor
@@ -0,0 +1,135 @@
+# app/services/database_service.py
+
+import os
+import sqlite3
+import threading
+import time
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import NullPool, QueuePool
+from app import db
+
+MODOS_POOL = ('queue', 'null')
+
+_espera = {'aquisicoes': 0, 'total_ms': 0.0, 'maxima_ms': 0.0, 'timeouts': 0}
+_espera_lock = threading.Lock()
+
+# PRAGMAs aplicados a cada nova conexão SQLite (definidos em configurar).
+_pragmas_sqlite = []
+
+
+class PoolMedido(QueuePool):
+    """QueuePool que mede o tempo gasto para obter uma conexão (espera no pool + abertura, se necessária)."""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with _espera_lock:
+                _espera['timeouts'] += 1
+            raise
+        finally:
+            duracao_ms = (time.perf_counter() - inicio) * 1000
+            with _espera_lock:
+                _espera['aquisicoes'] += 1
+                _espera['total_ms'] += duracao_ms
+                _espera['maxima_ms'] = max(_espera['maxima_ms'], duracao_ms)
+
+
+@event.listens_for(PoolMedido, 'connect')
+def _marcar_pid(dbapi_connection, connection_record):
+    connection_record.info['pid'] = os.getpid()
+
+
+@event.listens_for(PoolMedido, 'checkout')
+def _descartar_conexao_herdada(dbapi_connection, connection_record, connection_proxy):
+    # Conexões abertas antes de um fork (ex: gunicorn --preload) não podem ser usadas pelo processo filho;
+    # DisconnectionError faz o pool descartá-la e abrir outra.
+    pid = os.getpid()
+    if connection_record.info.get('pid') != pid:
+        connection_record.dbapi_connection = connection_proxy.dbapi_connection = None
+        raise exc.DisconnectionError(f"Conexão criada no processo {connection_record.info.get('pid')}, usada no {pid}.")
+
+
+@event.listens_for(Engine, 'connect')
+def _aplicar_pragmas_sqlite(dbapi_connection, connection_record):
+    if not _pragmas_sqlite or not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for pragma in _pragmas_sqlite:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def opcoes_engine(config) -> dict:
+    """Monta o SQLALCHEMY_ENGINE_OPTIONS a partir do DB_POOL_MODE e dos parâmetros DB_POOL_* da config."""
+    modo = config.get('DB_POOL_MODE', 'queue')
+    if modo not in MODOS_POOL:
+        raise ValueError(f"DB_POOL_MODE inválido: '{modo}'. Use: {', '.join(MODOS_POOL)}.")
+
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    sqlite = url.get_backend_name() == 'sqlite'
+    if sqlite and url.database in (None, '', ':memory:'):
+        # Banco em memória: mantém o pool padrão do SQLAlchemy (uma conexão por thread).
+        return {}
+    if modo == 'null':
+        return {'poolclass': NullPool}
+
+    opcoes = {
+        'poolclass': PoolMedido,
+        'pool_size': config.get('DB_POOL_SIZE', 5),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', True),
+    }
+    if sqlite:
+        # Com pool, uma mesma conexão SQLite é usada por threads diferentes (uma de cada vez).
+        opcoes['connect_args'] = {'check_same_thread': False}
+    return opcoes
+
+
+def configurar(app):
+    """Define as opções do engine (a menos que SQLALCHEMY_ENGINE_OPTIONS já venha da config) e os PRAGMAs do SQLite."""
+    if not app.config.get('SQLALCHEMY_ENGINE_OPTIONS'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opcoes_engine(app.config)
+
+    _pragmas_sqlite.clear()
+    _pragmas_sqlite.append(f"PRAGMA busy_timeout={int(app.config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}")
+    if app.config.get('SQLITE_WAL', True):
+        _pragmas_sqlite.extend(["PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL"])
+
+
+def verificar_conexao() -> dict:
+    """Executa um SELECT 1 e retorna {"ok", "latencia_ms", "erro"?}."""
+    inicio = time.perf_counter()
+    try:
+        with db.engine.connect() as conexao:
+            conexao.execute(text('SELECT 1'))
+        return {'ok': True, 'latencia_ms': round((time.perf_counter() - inicio) * 1000, 2)}
+    except exc.SQLAlchemyError as e:
+        return {'ok': False, 'latencia_ms': round((time.perf_counter() - inicio) * 1000, 2), 'erro': str(e)}
+
+
+def metricas() -> dict:
+    """Estado do pool do processo atual (conexões em uso, ociosas, overflow) e o tempo de espera por conexão."""
+    pool = db.engine.pool
+    dados = {'dialeto': db.engine.dialect.name, 'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        dados.update({
+            'tamanho': pool.size(),
+            'em_uso': pool.checkedout(),
+            'ociosas': pool.checkedin(),
+            'overflow': max(0, pool.overflow()),
+        })
+    with _espera_lock:
+        aquisicoes = _espera['aquisicoes']
+        dados['espera'] = {
+            'aquisicoes': aquisicoes,
+            'media_ms': round(_espera['total_ms'] / aquisicoes, 2) if aquisicoes else 0.0,
+            'maxima_ms': round(_espera['maxima_ms'], 2),
+            'timeouts': _espera['timeouts'],
+        }
+    return dados
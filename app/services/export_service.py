@@ -0,0 +1,70 @@
+# app/services/export_service.py
+
+import csv
+import io
+import json
+from app.models import Verificacao
+from app.services import consulta_service
+
+FORMATOS = ('ndjson', 'csv')
+
+COLUNAS_CSV = [
+    'id', 'tipo_verificacao', 'status_geral', 'risk_score', 'timestamp',
+    'doc_frente_url', 'selfie_url', 'dados_entrada', 'dados_extra', 'resultado_completo'
+]
+
+
+def iterar_verificacoes(filtros: dict, lote: int = 1000):
+    """
+    Percorre as verificações filtradas com cursor no servidor (stream_results + yield_per),
+    mantendo em memória no máximo `lote` registros por vez.
+    """
+    query = consulta_service.aplicar_filtros(Verificacao.query, filtros)
+    query = query.order_by(Verificacao.id).execution_options(stream_results=True).yield_per(lote)
+    for v in query:
+        yield v
+
+
+def _registro_exportacao(v) -> dict:
+    return {
+        'id': v.id,
+        'tipo_verificacao': v.tipo_verificacao,
+        'status_geral': v.status_geral,
+        'risk_score': v.risk_score,
+        'timestamp': v.timestamp.isoformat() if v.timestamp else None,
+        'doc_frente_url': v.doc_frente_url,
+        'selfie_url': v.selfie_url,
+        'dados_entrada': json.loads(v.dados_entrada_json) if v.dados_entrada_json else None,
+        'dados_extra': v.dados_extra_json,
+        'resultado_completo': v.get_resultado_completo() if v.tem_resultado_completo else None,
+    }
+
+
+def gerar_ndjson(filtros: dict, lote: int = 1000):
+    """Gera o export em NDJSON, uma linha por verificação."""
+    for v in iterar_verificacoes(filtros, lote):
+        yield json.dumps(_registro_exportacao(v), ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def gerar_csv(filtros: dict, lote: int = 1000):
+    """Gera o export em CSV; campos estruturados são serializados como JSON na própria célula."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUNAS_CSV)
+    writer.writeheader()
+    for v in iterar_verificacoes(filtros, lote):
+        registro = _registro_exportacao(v)
+        for campo in ('dados_entrada', 'dados_extra', 'resultado_completo'):
+            if registro[campo] is not None:
+                registro[campo] = json.dumps(registro[campo], ensure_ascii=False, separators=(',', ':'))
+        writer.writerow(registro)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def gerar_export(formato: str, filtros: dict, lote: int = 1000):
+    if formato not in FORMATOS:
+        raise consulta_service.FiltroInvalido(f"Formato de exportação inválido. Use: {', '.join(FORMATOS)}.")
+    return gerar_ndjson(filtros, lote) if formato == 'ndjson' else gerar_csv(filtros, lote)
@@ -0,0 +1,77 @@
+# app/services/imagem_service.py
+
+import base64
+import os
+import time
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from functools import partial
+from io import BytesIO
+from PIL import Image, ImageOps, UnidentifiedImageError
+from flask import current_app
+from app.services import workflow_service
+
+
+def _remover_data_uri(conteudo: bytes) -> bytes:
+    if conteudo.startswith(b"data:image"):
+        return base64.b64decode(conteudo.split(b",", 1)[1])
+    return conteudo
+
+
+def normalizar(conteudo: bytes, max_lado: int = None, qualidade: int = None) -> bytes:
+    """
+    Prepara uma imagem para os provedores (Vision, Rekognition) e o armazenamento: decodifica uma única vez,
+    aplica a orientação EXIF, reduz o maior lado para `max_lado` (IMAGEM_MAX_LADO) e recodifica em JPEG.
+    Imagens que já estão em JPEG, na orientação correta e dentro do limite são devolvidas sem alteração;
+    conteúdo que não é imagem (ou que excede o limite de pixels do Pillow) também, para que cada etapa
+    trate o erro como antes.
+    """
+    if not conteudo or not current_app.config.get('IMAGEM_NORMALIZAR', True):
+        return conteudo
+    max_lado = max_lado or current_app.config.get('IMAGEM_MAX_LADO', 1600)
+    qualidade = qualidade or current_app.config.get('IMAGEM_QUALIDADE_JPEG', 90)
+
+    try:
+        bruto = _remover_data_uri(conteudo)
+        img = Image.open(BytesIO(bruto))
+        formato = img.format
+        orientacao = img.getexif().get(0x0112, 1)
+        if formato == 'JPEG' and orientacao == 1 and max(img.size) <= max_lado:
+            return bruto
+
+        # Em JPEG, o draft decodifica direto em escala reduzida (ainda >= max_lado), bem mais rápido.
+        img.draft('RGB', (max_lado, max_lado))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_lado, max_lado), Image.LANCZOS)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        saida = BytesIO()
+        img.save(saida, format='JPEG', quality=qualidade)
+        return saida.getvalue()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError) as e:
+        current_app.logger.warning(f"IMAGEM_SERVICE: Imagem não normalizada, usando o conteúdo original: {e}")
+        return conteudo
+
+
+def normalizar_midias(midias: dict) -> dict:
+    """
+    Normaliza em paralelo as mídias {campo: (conteudo, nome_arquivo)} e devolve o mesmo formato.
+    Arquivos recodificados passam a ter extensão .jpg. Mídias não normalizadas dentro de
+    IMAGEM_NORMALIZAR_TIMEOUT segundos (ex: pool ocupado) seguem com o conteúdo original.
+    """
+    prazo = current_app.config.get('IMAGEM_NORMALIZAR_TIMEOUT', 10)
+    inicio = time.perf_counter()
+    futuros = {campo: workflow_service.submeter(partial(normalizar, conteudo)) for campo, (conteudo, _) in midias.items()}
+    normalizadas = {}
+    for campo, futuro in futuros.items():
+        conteudo, nome_arquivo = midias[campo]
+        try:
+            normalizado = futuro.result(timeout=max(0.0, prazo - (time.perf_counter() - inicio)))
+        except FuturesTimeoutError:
+            futuro.cancel()
+            current_app.logger.warning(f"IMAGEM_SERVICE: '{campo}' não normalizada em {prazo}s, usando o conteúdo original.")
+            normalizado = conteudo
+        if normalizado is not conteudo and nome_arquivo:
+            nome_arquivo = os.path.splitext(nome_arquivo)[0] + '.jpg'
+        normalizadas[campo] = (normalizado, nome_arquivo)
+    return normalizadas
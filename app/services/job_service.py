@@ -0,0 +1,186 @@
+# app/services/job_service.py
+
+import ipaddress
+import os
+import socket
+import threading
+import uuid
+from urllib.parse import urlsplit
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app import db
+from app.models import JobVerificacao
+
+# Status possíveis de um job.
+PENDENTE = 'PENDENTE'
+EXECUTANDO = 'EXECUTANDO'
+CONCLUIDO = 'CONCLUIDO'
+ERRO = 'ERRO'
+
+
+class LocalJobQueue:
+    """
+    Fila local: executa os jobs num pool de threads do próprio processo.
+    Os parâmetros (incluindo as imagens) ficam em memória até a execução, então um job
+    pendente se perde se o processo reiniciar. Para filas compartilhadas, registre outro backend em BACKENDS.
+    """
+
+    def __init__(self, config):
+        self._executor = ThreadPoolExecutor(
+            max_workers=config.get('JOBS_MAX_WORKERS', 4), thread_name_prefix='job-verificacao'
+        )
+
+    def enfileirar(self, app, job_id: str, tarefa, parametros: dict):
+        self._executor.submit(_executar_job, app, job_id, tarefa, parametros)
+
+
+BACKENDS = {
+    'local': LocalJobQueue,
+}
+
+# Tarefas executáveis pelos jobs: nome -> callable(**parametros) que retorna (resposta_final, verificacao_id).
+TAREFAS = {}
+
+_fila = None
+_fila_lock = threading.Lock()
+
+
+def registrar_tarefa(nome: str, funcao):
+    TAREFAS[nome] = funcao
+
+
+def _get_fila():
+    global _fila
+    if _fila is None:
+        with _fila_lock:
+            if _fila is None:
+                nome_backend = current_app.config.get('JOBS_BACKEND', 'local')
+                if nome_backend not in BACKENDS:
+                    raise ValueError(f"Backend de jobs desconhecido: {nome_backend}")
+                _fila = BACKENDS[nome_backend](current_app.config)
+    return _fila
+
+
+def _resetar_fila():
+    """Descarta a fila herdada no processo filho após um fork."""
+    global _fila, _fila_lock
+    _fila = None
+    _fila_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_resetar_fila)
+
+
+class CallbackInvalido(ValueError):
+    """callback_url recusado: não é https, o host não está liberado ou resolve para um endereço não público."""
+
+
+def validar_callback_url(url: str):
+    """
+    Confere se o resultado (com dados pessoais e biométricos) pode ser enviado a `url`: exige https,
+    host presente em JOBS_CALLBACK_HOSTS (quando configurado) e que todos os endereços resolvidos
+    sejam públicos, recusando rede privada, loopback, link-local e afins. Levanta CallbackInvalido.
+    """
+    partes = urlsplit(url or '')
+    if partes.scheme != 'https' or not partes.hostname:
+        raise CallbackInvalido("O callback_url deve ser uma URL https.")
+    host = partes.hostname.lower()
+    permitidos = current_app.config.get('JOBS_CALLBACK_HOSTS') or ()
+    if permitidos and host not in permitidos:
+        raise CallbackInvalido(f"Host de callback não permitido: {host}.")
+    try:
+        enderecos = {info[4][0] for info in socket.getaddrinfo(host, partes.port or 443, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError):
+        raise CallbackInvalido(f"Não foi possível resolver o host de callback: {host}.")
+    for endereco in enderecos:
+        if not ipaddress.ip_address(endereco.split('%', 1)[0]).is_global:
+            raise CallbackInvalido(f"O host de callback {host} resolve para um endereço não público.")
+
+
+def submeter(tipo_verificacao: str, tarefa: str, parametros: dict, callback_url: str = None) -> JobVerificacao:
+    """
+    Persiste um novo job PENDENTE e o enfileira para execução. Retorna o job criado.
+    Levanta CallbackInvalido se `callback_url` não passar em validar_callback_url.
+    """
+    if tarefa not in TAREFAS:
+        raise ValueError(f"Tarefa de job desconhecida: {tarefa}")
+    if callback_url:
+        validar_callback_url(callback_url)
+    job = JobVerificacao(id=str(uuid.uuid4()), tipo_verificacao=tipo_verificacao, status=PENDENTE, callback_url=callback_url)
+    db.session.add(job)
+    db.session.commit()
+    _get_fila().enfileirar(current_app._get_current_object(), job.id, tarefa, parametros)
+    current_app.logger.info(f"JOB_SERVICE: Job {job.id} ({tarefa}) enfileirado.")
+    return job
+
+
+def _atualizar_job(job_id: str, **campos):
+    job = db.session.get(JobVerificacao, job_id)
+    for campo, valor in campos.items():
+        setattr(job, campo, valor)
+    db.session.commit()
+    return job
+
+
+def _executar_job(app, job_id: str, tarefa: str, parametros: dict):
+    with app.app_context():
+        logger = app.logger
+        try:
+            _atualizar_job(job_id, status=EXECUTANDO)
+            resposta_final, verificacao_id = TAREFAS[tarefa](**parametros)
+            if verificacao_id is None:
+                # A tarefa rodou, mas a verificação não foi gravada: sem ela, /jobs/<id> não teria resultado.
+                logger.error(f"JOB_SERVICE: Job {job_id} terminou sem verificação gravada.")
+                resposta_final = None
+                job = _atualizar_job(job_id, status=ERRO, erro="A verificação não pôde ser gravada.")
+            else:
+                job = _atualizar_job(job_id, status=CONCLUIDO, verificacao_id=verificacao_id)
+                logger.info(f"JOB_SERVICE: Job {job_id} concluído (verificação {verificacao_id}).")
+        except Exception as e:
+            logger.error(f"JOB_SERVICE: Falha no job {job_id}: {e}", exc_info=True)
+            db.session.rollback()
+            resposta_final = None
+            job = _atualizar_job(job_id, status=ERRO, erro=str(e))
+
+        if job.callback_url:
+            _notificar_callback(job, resposta_final)
+
+
+def serializar_job(job: JobVerificacao, resposta_final: dict = None) -> dict:
+    dados = {
+        'job_id': job.id,
+        'tipo_verificacao': job.tipo_verificacao,
+        'status': job.status,
+        'verificacao_id': job.verificacao_id,
+        'criado_em': job.criado_em.isoformat() if job.criado_em else None,
+        'atualizado_em': job.atualizado_em.isoformat() if job.atualizado_em else None,
+    }
+    if job.erro:
+        dados['erro'] = job.erro
+    if resposta_final is None and job.verificacao is not None and job.verificacao.tem_resultado_completo:
+        resposta_final = job.verificacao.get_resultado_completo()
+    if resposta_final is not None:
+        dados['resultado'] = resposta_final
+    return dados
+
+
+def _notificar_callback(job: JobVerificacao, resposta_final: dict):
+    """
+    Envia o resultado do job ao webhook informado na submissão (melhor esforço, sem novas tentativas).
+    A URL é validada de novo no envio, pois o DNS pode ter mudado desde a submissão, e redirecionamentos
+    não são seguidos.
+    """
+    try:
+        validar_callback_url(job.callback_url)
+        requests.post(
+            job.callback_url,
+            json=serializar_job(job, resposta_final),
+            timeout=current_app.config.get('JOBS_CALLBACK_TIMEOUT', 10),
+            allow_redirects=False
+        )
+    except CallbackInvalido as e:
+        current_app.logger.warning(f"JOB_SERVICE: Callback do job {job.id} recusado: {e}")
+    except requests.exceptions.RequestException as e:
+        current_app.logger.warning(f"JOB_SERVICE: Falha ao notificar o callback do job {job.id}: {e}")
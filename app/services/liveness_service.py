@@ -0,0 +1,105 @@
+# app/services/liveness_service.py
+
+from io import BytesIO
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+from flask import current_app
+from app.services import metrics_service
+
+MODOS = ('vision', 'local_vision', 'local')
+
+# Lado máximo usado nas métricas locais; acima disso só aumenta o custo.
+LADO_ANALISE = 512
+# Lado usado na estimativa da região de pele, que só precisa da cor média de áreas grandes.
+LADO_PELE = 128
+# Faixa de crominância (Cb, Cr) de pele humana, pouco sensível ao tom e ao brilho (Chai & Ngan, 1999).
+PELE_CB = (77, 127)
+PELE_CR = (133, 173)
+
+
+def variancia_laplaciano(cinza: np.ndarray) -> float:
+    """Variância do Laplaciano (kernel de 4 vizinhos): valores baixos indicam imagem borrada."""
+    centro = cinza[1:-1, 1:-1]
+    laplaciano = cinza[:-2, 1:-1] + cinza[2:, 1:-1] + cinza[1:-1, :-2] + cinza[1:-1, 2:] - 4 * centro
+    return float(laplaciano.var())
+
+
+def fracao_pele_central(img: Image.Image):
+    """
+    Fração dos pixels da região central (metade do meio em cada eixo) com crominância de pele.
+    Heurística barata para "há algo parecido com um rosto no centro": não localiza nem conta rostos.
+    Retorna None para imagens sem cor (tons de cinza), em que a heurística não se aplica.
+    """
+    if img.getbands() in (('L',), ('L', 'A'), ('1',), ('I',), ('F',)):
+        return None
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    fator = max(1, max(img.size) // LADO_PELE)
+    reduzida = img.reduce(fator) if fator > 1 else img
+    ycbcr = np.asarray(reduzida.convert('YCbCr'), dtype=np.int16)
+    if np.abs(ycbcr[..., 1:] - 128).mean() < 2:
+        return None
+    altura, largura = ycbcr.shape[:2]
+    centro = ycbcr[altura // 4: altura - altura // 4 or None, largura // 4: largura - largura // 4 or None]
+    cb, cr = centro[..., 1], centro[..., 2]
+    pele = (cb >= PELE_CB[0]) & (cb <= PELE_CB[1]) & (cr >= PELE_CR[0]) & (cr <= PELE_CR[1])
+    return float(pele.mean()) if pele.size else 0.0
+
+
+def calcular_metricas(img: Image.Image) -> dict:
+    """Dimensões, brilho, contraste, saturação do histograma, nitidez e fração de pele no centro."""
+    largura, altura = img.size
+    cinza_img = img.convert('L')
+    cinza_img.thumbnail((LADO_ANALISE, LADO_ANALISE))
+    cinza = np.asarray(cinza_img, dtype=np.float32)
+
+    fracao_pele = fracao_pele_central(img)
+    if fracao_pele is not None:
+        fracao_pele = round(fracao_pele, 3)
+    histograma = np.bincount(cinza.astype(np.uint8).ravel(), minlength=256) / cinza.size
+    return {
+        'largura': largura,
+        'altura': altura,
+        'brilho_medio': round(float(cinza.mean()), 1),
+        'contraste': round(float(cinza.std()), 1),
+        'fracao_escura': round(float(histograma[:16].sum()), 3),
+        'fracao_estourada': round(float(histograma[240:].sum()), 3),
+        'nitidez': round(variancia_laplaciano(cinza), 1),
+        'fracao_pele': fracao_pele,
+    }
+
+
+@metrics_service.medir('liveness_local')
+def avaliar(selfie_bytes: bytes) -> dict:
+    """
+    Pré-filtro local da selfie, no mesmo formato de check_liveness_passivo.
+    Reprova selfies obviamente inválidas (pequenas, em branco, escuras, estouradas, borradas ou sem região
+    com cor de pele no centro, ou seja, sem rosto aparente); as demais retornam APROVADO para seguir ao
+    provedor remoto. A heurística de pele não detecta nem conta rostos (várias pessoas ou uma foto de foto
+    passam por ela), então o APROVADO daqui não é prova de vida.
+    """
+    config = current_app.config
+    try:
+        img = Image.open(BytesIO(selfie_bytes))
+        img.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        return {"status": "REPROVADO", "motivo": "Selfie muito pequena ou inválida.", "motor": "local"}
+
+    metricas = calcular_metricas(img)
+    motivo = None
+    if min(metricas['largura'], metricas['altura']) < config.get('LIVENESS_LOCAL_MIN_LADO', 200):
+        motivo = "Selfie muito pequena ou inválida."
+    elif metricas['brilho_medio'] < config.get('LIVENESS_LOCAL_BRILHO_MIN', 40) or metricas['fracao_escura'] > 0.6:
+        motivo = "A selfie está muito escura. Por favor, procure um local mais iluminado."
+    elif metricas['brilho_medio'] > config.get('LIVENESS_LOCAL_BRILHO_MAX', 225) or metricas['fracao_estourada'] > 0.6:
+        motivo = "A selfie está muito clara (superexposta). Evite luz forte diretamente na câmera."
+    elif metricas['contraste'] < config.get('LIVENESS_LOCAL_CONTRASTE_MIN', 8):
+        motivo = "A selfie parece estar em branco ou com a câmera coberta. Tente novamente."
+    elif metricas['nitidez'] < config.get('LIVENESS_LOCAL_NITIDEZ_MIN', 15):
+        motivo = "A selfie está borrada. Por favor, mantenha a câmera estável."
+    elif metricas['fracao_pele'] is not None and metricas['fracao_pele'] < config.get('LIVENESS_LOCAL_PELE_MIN', 0.1):
+        motivo = "Nenhum rosto detectado na selfie. Tente uma foto com boa iluminação."
+
+    if motivo:
+        return {"status": "REPROVADO", "motivo": motivo, "motor": "local", "metricas": metricas}
+    return {"status": "APROVADO", "detalhes": "Selfie aprovada no pré-filtro local.", "motor": "local", "metricas": metricas}
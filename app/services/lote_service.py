@@ -0,0 +1,77 @@
+# app/services/lote_service.py
+
+import json
+import time
+from flask import current_app
+from app.services import persistencia_service, workflow_service
+
+
+def normalizar_cnpjs(entradas: list):
+    """
+    Normaliza uma lista de CNPJs (com ou sem pontuação).
+    Retorna (cnpjs válidos sem repetição, na ordem de entrada; entradas inválidas; nº de duplicados).
+    """
+    validos = {}
+    invalidos = []
+    duplicados = 0
+    for entrada in entradas:
+        cnpj_limpo = ''.join(filter(str.isdigit, str(entrada or '')))
+        if len(cnpj_limpo) != 14:
+            invalidos.append(entrada)
+        elif cnpj_limpo in validos:
+            duplicados += 1
+        else:
+            validos[cnpj_limpo] = None
+    return list(validos), invalidos, duplicados
+
+
+def verificar_cnpjs(entradas: list, verificar_cnpj, max_concorrencia: int = None):
+    """
+    Gerador com os eventos da verificação de um lote de CNPJs:
+    um 'inicio', um 'resultado' por CNPJ (na ordem em que terminam) e um 'fim' com o resumo.
+    `verificar_cnpj(cnpj_limpo)` deve retornar (resposta, status_code).
+    A taxa de chamadas à BrasilAPI é limitada no cnpj_service (BRASILAPI_RATE_LIMIT).
+    As verificações concluídas são gravadas em lotes de PJ_LOTE_TAMANHO_GRAVACAO.
+    """
+    logger = current_app.logger
+    max_concorrencia = max_concorrencia or current_app.config.get('PJ_LOTE_MAX_CONCORRENCIA', 8)
+    cnpjs, invalidos, duplicados = normalizar_cnpjs(entradas)
+    total = len(cnpjs)
+    inicio = time.perf_counter()
+    logger.info(f"LOTE PJ: Iniciando verificação de {total} CNPJs ({len(invalidos)} inválidos, {duplicados} duplicados).")
+
+    yield {"tipo": "inicio", "total": total, "invalidos": invalidos, "duplicados": duplicados}
+
+    contagem = {"sucesso": 0, "falha": 0}
+    concluidos = 0
+    # Os resultados são gravados em lotes (bulk insert) pela thread que consome o gerador.
+    with persistencia_service.BufferVerificacoes() as buffer:
+        for indice, cnpj, resultado, erro in workflow_service.mapear_conforme_concluir(verificar_cnpj, cnpjs, max_concorrencia):
+            concluidos += 1
+            evento = {"tipo": "resultado", "indice": indice, "cnpj": cnpj, "progresso": f"{concluidos}/{total}"}
+            if erro is not None:
+                logger.error(f"LOTE PJ: Erro inesperado ao verificar o CNPJ {cnpj}: {erro}")
+                evento.update({"status_code": 500, "erro": "Erro interno ao verificar o CNPJ."})
+            else:
+                resposta, status_code = resultado
+                evento.update({"status_code": status_code, "resultado": resposta})
+                if status_code == 200:
+                    buffer.adicionar(persistencia_service.registro_verificacao('PJ', {'cnpj': cnpj}, resposta))
+            contagem["sucesso" if evento["status_code"] == 200 else "falha"] += 1
+            yield evento
+        buffer.descarregar()
+
+    yield {
+        "tipo": "fim",
+        "total": total,
+        "sucesso": contagem["sucesso"],
+        "falha": contagem["falha"],
+        "gravadas": buffer.gravadas,
+        "duracao_s": round(time.perf_counter() - inicio, 2)
+    }
+
+
+def para_ndjson(eventos):
+    """Serializa os eventos como linhas NDJSON."""
+    for evento in eventos:
+        yield json.dumps(evento, ensure_ascii=False) + '\n'
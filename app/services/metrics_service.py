@@ -0,0 +1,105 @@
+# app/services/metrics_service.py
+
+import os
+import threading
+import time
+from functools import wraps
+
+# Limites superiores (segundos) dos buckets dos histogramas de latência.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+NOME_METRICA = 'antifraude_operacao_duracao_segundos'
+
+# (operacao, resultado) -> {"buckets": [contagem por limite], "soma": segundos, "total": n}
+_histogramas = {}
+_lock = threading.Lock()
+
+
+def observar(operacao: str, resultado: str, duracao_s: float):
+    """Registra uma duração no histograma da operação/resultado."""
+    with _lock:
+        histograma = _histogramas.get((operacao, resultado))
+        if histograma is None:
+            histograma = _histogramas[(operacao, resultado)] = {'buckets': [0] * len(BUCKETS), 'soma': 0.0, 'total': 0}
+        for i, limite in enumerate(BUCKETS):
+            if duracao_s <= limite:
+                histograma['buckets'][i] += 1
+                break
+        histograma['soma'] += duracao_s
+        histograma['total'] += 1
+
+
+def _resultado_do_retorno(retorno) -> str:
+    """Resultado de uma verificação a partir do retorno: o 'status' do dict (APROVADO, ERRO...) ou 'sucesso'."""
+    if isinstance(retorno, dict) and retorno.get('status'):
+        return str(retorno['status']).lower()
+    return 'sucesso'
+
+
+class medir:
+    """
+    Mede a duração de uma operação e a registra no histograma (operacao, resultado).
+    Como context manager, o resultado é 'erro' se houver exceção, ou o valor atribuído a `.resultado`
+    (padrão 'sucesso'). Como decorator, o resultado vem do 'status' do dict retornado.
+    Se `tempos` for informado, a duração em ms também é gravada em tempos[operacao].
+    """
+
+    def __init__(self, operacao: str, tempos: dict = None):
+        self.operacao = operacao
+        self.tempos = tempos
+        self.resultado = None
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duracao = time.perf_counter() - self._inicio
+        resultado = 'erro' if exc_type is not None else (self.resultado or 'sucesso')
+        observar(self.operacao, resultado, duracao)
+        if self.tempos is not None:
+            self.tempos[self.operacao] = round(duracao * 1000, 1)
+        return False
+
+    def __call__(self, funcao):
+        operacao = self.operacao
+
+        @wraps(funcao)
+        def wrapper(*args, **kwargs):
+            with medir(operacao) as medicao:
+                retorno = funcao(*args, **kwargs)
+                medicao.resultado = _resultado_do_retorno(retorno)
+                return retorno
+        return wrapper
+
+
+def exportar_prometheus() -> str:
+    """Histogramas do processo atual no formato de texto do Prometheus."""
+    with _lock:
+        histogramas = {chave: {'buckets': list(h['buckets']), 'soma': h['soma'], 'total': h['total']}
+                       for chave, h in _histogramas.items()}
+
+    linhas = [
+        f'# HELP {NOME_METRICA} Duração das operações (provedores externos, uploads, banco) por resultado.',
+        f'# TYPE {NOME_METRICA} histogram',
+    ]
+    for (operacao, resultado), h in sorted(histogramas.items()):
+        rotulos = f'operacao="{operacao}",resultado="{resultado}"'
+        acumulado = 0
+        for limite, contagem in zip(BUCKETS, h['buckets']):
+            acumulado += contagem
+            linhas.append(f'{NOME_METRICA}_bucket{{{rotulos},le="{limite}"}} {acumulado}')
+        linhas.append(f'{NOME_METRICA}_bucket{{{rotulos},le="+Inf"}} {h["total"]}')
+        linhas.append(f'{NOME_METRICA}_sum{{{rotulos}}} {h["soma"]:.6f}')
+        linhas.append(f'{NOME_METRICA}_count{{{rotulos}}} {h["total"]}')
+    return '\n'.join(linhas) + '\n'
+
+
+def _resetar_apos_fork():
+    """Zera os histogramas no processo filho, para não repetir as contagens herdadas do pai."""
+    global _lock
+    _lock = threading.Lock()
+    _histogramas.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_resetar_apos_fork)
@@ -0,0 +1,251 @@
+# app/services/ocr_service.py
+# Extração de campos do texto reconhecido (OCR) em documentos de identificação: RG, CNH, CNH-e e RNE.
+# O texto é percorrido uma única vez por uma expressão pré-compilada que reconhece, na mesma passada,
+# os valores (CPF, datas, números de documento), os rótulos (NOME, NASCIMENTO, CPF...) e as marcas
+# que identificam o modelo do documento. Cada campo extraído vem com uma confiança entre 0 e 1.
+#
+# Custo: esta extração NÃO é mais rápida que a anterior (três re.search sobre o texto, que paravam no
+# primeiro casamento). Em `flask benchmark-micro` ela custa ~50-65 µs por documento, contra ~18-21 µs
+# antes (cerca de 3x); num texto sem campos, ~75 µs contra ~69 µs. O custo extra vem de reconhecer todos
+# os tokens do texto, e não só o primeiro de cada padrão, e de resolver quatro campos por proximidade
+# dos rótulos. É o que permite identificar o modelo, validar o CPF e não devolver a data de expedição
+# do RG como data de nascimento, como fazia a versão anterior. Compilar as expressões no carregamento
+# do módulo não é um ganho por si só, pois o cache de padrões do re já evitava recompilá-las. Frente à
+# chamada ao Vision que precede a extração (centenas de ms), a diferença é desprezível.
+
+import re
+from bisect import bisect_right
+from datetime import date
+from itertools import accumulate
+
+TIPOS_DOCUMENTO = ('RG', 'CNH', 'CNH-e', 'RNE')
+CAMPOS_OBRIGATORIOS = ('nome', 'cpf', 'data_nascimento')
+
+_LETRA = "A-ZÀ-ÖØ-Ý"
+
+# A ordem das alternativas importa: numa mesma posição vence a primeira que casar
+# (ex: "CNH DIGITAL" é marca de CNH-e antes de ser marca de CNH; "REGISTRO GERAL" é marca de RG antes de rótulo).
+_TOKENS_NUMERICOS = (
+    ('cpf', r'\d{3}[.\s]\d{3}[.\s]\d{3}[-~\s]\d{2}(?!\d)'),
+    ('numero_rg', r'\d{1,2}\.\d{3}\.\d{3}-[\dX](?![\d.])'),
+    ('numero_cnh', r'\d{11}(?!\d)'),
+    ('data', r'\d{2}/\d{2}/\d{4}(?!\d)'),
+)
+_TOKENS_PALAVRAS = (
+    ('marca_cnhe', r'QR[\s-]?CODE\b|ASSINAD[OA]\s+DIGITALMENTE\b|CERTIFICADO\s+DIGITAL\b|CNH\s*DIGITAL\b|SERPRO\b'),
+    ('marca_cnh', r'HABILITA[CÇ][AÃ]O\b|D[EO]TRAN\b|(?:DE|SE)NATRAN\b|CNH\b'),
+    ('marca_rne', r'ESTRANGEIRO\b|REGISTRO\s+NACIONAL\s+MIGRAT|R[NM]E\b|C?RNM\b'),
+    ('marca_rg', r'CARTEIRA\s+DE\s+IDENTIDADE\b|REGISTRO\s+GERAL\b|IDENTIFICA[CÇ][AÃ]O\b|RG\b'),
+    ('rotulo_prenome', r'PRENOMES?\b(?:\s*/\s*GIVEN\s+NAMES?)?'),
+    ('rotulo_nome', r'NOME\b(?!\s+SOCIAL)(?:\s+E\s+SOBRENOME|\s*/\s*(?:NAME|SURNAME))?'),
+    ('rotulo_nascimento', r'NASC(?:IMENTO|\.)?\b|DATE\s+OF\s+BIRTH\b'),
+    ('rotulo_cpf', r'CPF\b'),
+    ('rotulo_registro', r'REGISTRO\b'),
+)
+
+
+def _alternativas(tokens) -> str:
+    return '|'.join(f'(?P<{nome}>{padrao})' for nome, padrao in tokens)
+
+
+# Cada token começa depois de um separador, que a expressão consome: como ela começa por uma classe de
+# caracteres, o re pula em C as posições no meio de palavras e números. A letra inicial de cada rótulo/marca
+# filtra as palavras antes de testar as alternativas. O texto recebe um '\n' inicial e é convertido para maiúsculas.
+_TOKENS = re.compile(
+    rf'[^{_LETRA}\d](?:(?=\d)(?:{_alternativas(_TOKENS_NUMERICOS)})'
+    rf'|(?=[ACDEHINPQRS])(?:{_alternativas(_TOKENS_PALAVRAS)})'
+    rf'|(?=[A-Z]\d)(?P<numero_rne>[A-Z]\d{{6}}-[\dA-Z](?![{_LETRA}\d])))'
+)
+
+_NOME_VALIDO = re.compile(rf"[{_LETRA}][{_LETRA}' ]*[{_LETRA}]")
+_ESPACOS = re.compile(r'\s+')
+
+# Número do documento de cada modelo: token e rótulo que o acompanha (None quando o token basta).
+_NUMERO_POR_TIPO = {
+    'RG': ('numero_rg', None),
+    'CNH': ('numero_cnh', 'rotulo_registro'),
+    'CNH-e': ('numero_cnh', 'rotulo_registro'),
+    'RNE': ('numero_rne', None),
+}
+
+
+def cpf_valido(cpf: str) -> bool:
+    """Confere os dígitos verificadores de um CPF (com ou sem pontuação)."""
+    digitos = [int(c) for c in cpf if c.isdigit()]
+    if len(digitos) != 11 or digitos.count(digitos[0]) == 11:
+        return False
+    for posicao in (9, 10):
+        soma = 0
+        peso = posicao + 1
+        for d in digitos[:posicao]:
+            soma += d * peso
+            peso -= 1
+        if (soma * 10 % 11) % 10 != digitos[posicao]:
+            return False
+    return True
+
+
+def _data(valor: str):
+    try:
+        return date(int(valor[6:]), int(valor[3:5]), int(valor[:2]))
+    except ValueError:
+        return None
+
+
+def _tokenizar(texto: str):
+    """
+    Única passada sobre o texto. Retorna as linhas, a posição em que começa cada linha a partir da 2ª
+    e os tokens agrupados por tipo: {tipo: [(valor, nº da linha, posição final), ...]}, na ordem do texto.
+    """
+    texto = '\n' + texto.upper()
+    linhas = texto.split('\n')
+    inicios = list(accumulate(len(linha) + 1 for linha in linhas[:-1]))
+    tokens = {}
+    for m in _TOKENS.finditer(texto):
+        tipo = m.lastgroup
+        # m.start() é o separador; o token começa no caractere seguinte.
+        tokens.setdefault(tipo, []).append((m.group(tipo), bisect_right(inicios, m.start() + 1), m.end()))
+    return linhas, inicios, tokens
+
+
+def _detectar_tipo(tokens) -> str:
+    if 'marca_cnh' in tokens:
+        return 'CNH-e' if 'marca_cnhe' in tokens else 'CNH'
+    if 'marca_rne' in tokens:
+        return 'RNE'
+    if 'marca_rg' in tokens:
+        return 'RG'
+    return None
+
+
+def _proximo(tokens, tipo_rotulo: str, tipo_valor: str):
+    """Primeiro token `tipo_valor` na mesma linha (depois do rótulo) ou na linha seguinte a um rótulo `tipo_rotulo`."""
+    valores = tokens.get(tipo_valor)
+    if not valores:
+        return None
+    for _, linha_rotulo, fim_rotulo in tokens.get(tipo_rotulo, ()):
+        for valor, linha, fim in valores:
+            if linha == linha_rotulo and fim > fim_rotulo or linha == linha_rotulo + 1:
+                return valor
+    return None
+
+
+def _extrair_cpf(tokens):
+    candidatos = [valor.replace('\n', ' ') for valor, _, _ in tokens.get('cpf', ())]
+    if not candidatos:
+        return None
+    rotulado = _proximo(tokens, 'rotulo_cpf', 'cpf')
+    rotulado = rotulado.replace('\n', ' ') if rotulado else None
+    # Preferência: rotulado e válido > válido > rotulado > primeiro encontrado.
+    if rotulado and cpf_valido(rotulado):
+        return {'valor': rotulado, 'confianca': 0.98}
+    validos = [c for c in candidatos if cpf_valido(c)]
+    if validos:
+        return {'valor': validos[0], 'confianca': 0.85}
+    return {'valor': rotulado or candidatos[0], 'confianca': 0.4 if rotulado else 0.3}
+
+
+def _extrair_nascimento(tokens):
+    hoje = date.today()
+    datas = tokens.get('data')
+    if not datas:
+        return None
+    plausiveis = [(d, valor) for valor, _, _ in datas
+                  for d in [_data(valor)] if d and 0 <= hoje.year - d.year <= 120 and d <= hoje]
+    if not plausiveis:
+        # Nenhuma data válida como nascimento (ex: dígito trocado pelo OCR): devolve a primeira, com confiança baixa.
+        return {'valor': datas[0][0], 'confianca': 0.2}
+    rotulado = _proximo(tokens, 'rotulo_nascimento', 'data')
+    if rotulado and any(valor == rotulado for _, valor in plausiveis):
+        return {'valor': rotulado, 'confianca': 0.95}
+    # Sem rótulo, a data mais antiga do documento é a de nascimento (expedição, validade e 1ª habilitação são posteriores).
+    _, mais_antiga = min(plausiveis)
+    return {'valor': mais_antiga, 'confianca': 0.6 if len(plausiveis) > 1 else 0.5}
+
+
+def _valor_apos_rotulo(linhas, inicios, tokens, linhas_com_rotulo, tipo_rotulo: str):
+    """Nome escrito depois do rótulo, na mesma linha ou nas duas seguintes; retorna (nome, na_mesma_linha)."""
+    for _, linha, fim in tokens.get(tipo_rotulo, ()):
+        candidatos = [(linhas[linha][fim - inicios[linha - 1]:], True)]
+        candidatos += [(linhas[i], False) for i in range(linha + 1, min(linha + 3, len(linhas))) if i not in linhas_com_rotulo]
+        for candidato, mesma_linha in candidatos:
+            candidato = _ESPACOS.sub(' ', candidato.strip(" \t\r:-/|.,"))
+            # Na linha do rótulo só é aceito um nome composto, para não confundir com outro rótulo ao lado.
+            if candidato and _NOME_VALIDO.fullmatch(candidato) and (' ' in candidato or not mesma_linha):
+                return candidato, mesma_linha
+    return None, False
+
+
+def _extrair_nome(linhas, inicios, tokens, tipo_documento):
+    if 'rotulo_nome' not in tokens and 'rotulo_prenome' not in tokens:
+        return None
+    linhas_com_rotulo = {linha for tipo, lista in tokens.items() if tipo.startswith(('rotulo_', 'marca_'))
+                         for _, linha, _ in lista}
+    nome, mesma_linha = _valor_apos_rotulo(linhas, inicios, tokens, linhas_com_rotulo, 'rotulo_nome')
+    if tipo_documento == 'RNE' or not nome:
+        # No RNE o sobrenome (NOME / NAME) e os prenomes (PRENOME / GIVEN NAMES) ficam em campos separados.
+        prenome, _ = _valor_apos_rotulo(linhas, inicios, tokens, linhas_com_rotulo, 'rotulo_prenome')
+        if prenome and nome:
+            return {'valor': f"{prenome} {nome}", 'confianca': 0.9}
+        if prenome:
+            return {'valor': prenome, 'confianca': 0.5}
+    if not nome:
+        return None
+    if ' ' not in nome:
+        return {'valor': nome, 'confianca': 0.5}
+    return {'valor': nome, 'confianca': 0.85 if mesma_linha else 0.9}
+
+
+def _extrair_numero(tokens, tipo_documento):
+    if tipo_documento not in _NUMERO_POR_TIPO:
+        return None
+    tipo_valor, tipo_rotulo = _NUMERO_POR_TIPO[tipo_documento]
+    if tipo_rotulo:
+        rotulado = _proximo(tokens, tipo_rotulo, tipo_valor)
+        if rotulado:
+            return {'valor': rotulado, 'confianca': 0.9}
+    candidatos = [valor for valor, _, _ in tokens.get(tipo_valor, ())]
+    if not candidatos:
+        return None
+    return {'valor': candidatos[0], 'confianca': 0.6 if tipo_rotulo or len(candidatos) > 1 else 0.8}
+
+
+def extrair_campos(texto: str) -> dict:
+    """
+    Extrai nome, CPF, data de nascimento e número do documento do texto de um RG, CNH, CNH-e ou RNE.
+    Retorna {"tipo_documento": str|None, "campos": {campo: {"valor": str, "confianca": float}}};
+    os campos não encontrados ficam de fora.
+    """
+    linhas, inicios, tokens = _tokenizar(texto or '')
+    tipo_documento = _detectar_tipo(tokens)
+    extraidos = {
+        'nome': _extrair_nome(linhas, inicios, tokens, tipo_documento),
+        'cpf': _extrair_cpf(tokens),
+        'data_nascimento': _extrair_nascimento(tokens),
+        'numero_documento': _extrair_numero(tokens, tipo_documento),
+    }
+    return {'tipo_documento': tipo_documento, 'campos': {campo: v for campo, v in extraidos.items() if v}}
+
+
+def valores(extracao: dict, confianca_minima: float = 0.0) -> dict:
+    """Valores dos campos extraídos com confiança de pelo menos `confianca_minima`."""
+    return {campo: c['valor'] for campo, c in extracao['campos'].items() if c['confianca'] >= confianca_minima}
+
+
+def reextrair(registros, confianca_minima: float = 0.0):
+    """
+    Gerador para reprocessar textos de OCR já armazenados (ex: os guardados por /extrair-ocr em TextoOcr).
+    Cada registro é um dict com "texto_ocr" (ou "texto") e, opcionalmente, "id"; para cada um é gerado
+    {"id", "tipo_documento", "dados", "confianca", "campos_faltando"}.
+    """
+    for indice, registro in enumerate(registros):
+        texto = registro.get('texto_ocr') or registro.get('texto') or ''
+        extracao = extrair_campos(texto)
+        dados = valores(extracao, confianca_minima)
+        yield {
+            'id': registro.get('id', indice),
+            'tipo_documento': extracao['tipo_documento'],
+            'dados': dados,
+            'confianca': {campo: c['confianca'] for campo, c in extracao['campos'].items()},
+            'campos_faltando': [c for c in CAMPOS_OBRIGATORIOS if c not in dados],
+        }
@@ -0,0 +1,95 @@
+# app/services/persistencia_service.py
+
+import json
+from datetime import datetime
+from flask import current_app
+from app import db
+from app.models import Verificacao, ResultadoEtapa, chave_documento, codificar_resultado
+from app.services import metrics_service, stats_service
+
+
+def registro_verificacao(tipo_verificacao: str, dados_entrada: dict, resposta: dict, **colunas) -> dict:
+    """
+    Monta o registro de uma verificação concluída para gravar_lote:
+    {"verificacao": valores das colunas de Verificacao, "etapas": valores de cada ResultadoEtapa}.
+    `colunas` permite informar colunas adicionais (ex: doc_frente_url).
+    Os 'timings' da resposta não são gravados.
+    """
+    timestamp = datetime.utcnow()
+    score = resposta.get('risk_score') if isinstance(resposta.get('risk_score'), dict) else {}
+    documento = dados_entrada.get('cpf') or dados_entrada.get('cnpj')
+    verificacao = {
+        'tipo_verificacao': tipo_verificacao,
+        'status_geral': resposta.get('status_geral'),
+        'dados_entrada_json': json.dumps(dados_entrada),
+        'resultado_completo_bin': codificar_resultado({k: v for k, v in resposta.items() if k != 'timings'}),
+        'timestamp': timestamp,
+        'risk_score': score.get('score'),
+        'risk_score_versao': score.get('versao_regras'),
+        'documento_chave': chave_documento(documento),
+    }
+    verificacao.update(colunas)
+    etapas = [
+        ResultadoEtapa.mapeamento(nome_etapa, resultado, timestamp)
+        for nome_etapa, resultado in (resposta.get('workflow_executado') or {}).items()
+        if isinstance(resultado, dict)
+    ]
+    return {'verificacao': verificacao, 'etapas': etapas}
+
+
+def gravar_lote(registros: list, tempos: dict = None) -> int:
+    """
+    Grava as verificações (e suas etapas e rollups) em uma única transação, com bulk_insert_mappings.
+    Em caso de falha faz rollback e registra o erro, sem propagar. Retorna o nº de verificações gravadas.
+    Se `tempos` for informado, recebe a duração do commit em tempos['db_commit'].
+    """
+    if not registros:
+        return 0
+    logger = current_app.logger
+    verificacoes = [registro['verificacao'] for registro in registros]
+    try:
+        # return_defaults preenche o id gerado em cada dict, necessário para vincular as etapas.
+        db.session.bulk_insert_mappings(Verificacao, verificacoes, return_defaults=True)
+        etapas = []
+        for registro in registros:
+            for etapa in registro['etapas']:
+                etapas.append(dict(etapa, verificacao_id=registro['verificacao']['id']))
+        if etapas:
+            db.session.bulk_insert_mappings(ResultadoEtapa, etapas)
+        stats_service.registrar(verificacoes)
+        with metrics_service.medir('db_commit', tempos):
+            db.session.commit()
+        return len(verificacoes)
+    except Exception as e:
+        logger.error(f'PERSISTENCIA: Falha ao gravar lote de {len(verificacoes)} verificações: {e}', exc_info=True)
+        db.session.rollback()
+        return 0
+
+
+class BufferVerificacoes:
+    """
+    Acumula registros de verificação e os grava em lotes de `tamanho` com gravar_lote.
+    Usado como context manager, grava o que restar ao sair (inclusive se o lote for interrompido).
+    Não é thread-safe: deve ser alimentado por uma única thread.
+    """
+
+    def __init__(self, tamanho: int = None):
+        self.tamanho = tamanho or current_app.config.get('PJ_LOTE_TAMANHO_GRAVACAO', 200)
+        self.pendentes = []
+        self.gravadas = 0
+
+    def adicionar(self, registro: dict):
+        self.pendentes.append(registro)
+        if len(self.pendentes) >= self.tamanho:
+            self.descarregar()
+
+    def descarregar(self):
+        registros, self.pendentes = self.pendentes, []
+        self.gravadas += gravar_lote(registros)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.descarregar()
+        return False
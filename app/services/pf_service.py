@@ -0,0 +1,126 @@
+# app/services/pf_service.py
+
+import base64
+import time
+from flask import current_app
+from app import db
+from app.models import Verificacao
+from app.services import bgc_service, biometrics_service, data_service, document_service, imagem_service, job_service, metrics_service, score_service, stats_service, storage_service, workflow_service
+
+
+class FalhaUpload(Exception):
+    """Falha ao armazenar as imagens do onboarding."""
+
+
+def processar_onboarding(dados: dict, midias: dict):
+    """
+    Orquestra o fluxo completo de verificação de Pessoa Física (PF).
+    dados: {'nome', 'cpf', 'foto_documento_b64', 'latitude', 'longitude'}.
+    midias: {'documento_frente', 'selfie_documento', 'selfie_liveness'} -> (conteudo_bytes, nome_arquivo).
+    Retorna a tupla (resposta_final, id da Verificacao persistida ou None); resposta_final['timings'] traz a
+    duração (ms) de cada fase, que não é gravada no resultado persistido.
+    Lança FalhaUpload se o armazenamento das imagens falhar.
+    """
+    logger = current_app.logger
+    inicio = time.perf_counter()
+    timings = {}
+    nome_cliente = dados.get('nome') or 'N/A'
+    cpf_cliente = dados.get('cpf') or 'N/A'
+    foto_doc_b64 = dados.get('foto_documento_b64') or ''
+    latitude = dados.get('latitude')
+    longitude = dados.get('longitude')
+
+    # Cada imagem é decodificada e reduzida uma única vez; os bytes normalizados são usados
+    # por todas as etapas. Os uploads guardam os arquivos originais como evidência (com EXIF e resolução completa).
+    with metrics_service.medir('normalizar_imagens', timings):
+        normalizadas = imagem_service.normalizar_midias(midias)
+
+    frente_bytes = normalizadas['documento_frente'][0]
+    selfie_doc_bytes = normalizadas['selfie_documento'][0]
+    selfie_liveness_bytes = normalizadas['selfie_liveness'][0]
+
+    logger.info(f'ONBOARDING PF: Iniciando fluxo para {nome_cliente}')
+
+    # Os uploads rodam em paralelo enquanto as etapas de análise já são executadas.
+    try:
+        uploads = storage_service.iniciar_uploads({
+            'doc_frente': (midias['documento_frente'][0], "onboarding_docs", midias['documento_frente'][1]),
+            'selfie_doc': (midias['selfie_documento'][0], "onboarding_selfies_docs", midias['selfie_documento'][1]),
+            'selfie_liveness': (midias['selfie_liveness'][0], "onboarding_selfies_liveness", midias['selfie_liveness'][1]),
+        })
+    except Exception as e:
+        raise FalhaUpload(str(e)) from e
+
+    foto_doc_bytes = b''
+    if foto_doc_b64:
+        try:
+            foto_doc_bytes = imagem_service.normalizar(base64.b64decode(foto_doc_b64))
+        except Exception as e:
+            logger.error(f"Erro ao decodificar a foto 3x4 do documento: {e}")
+
+    status_geral = "APROVADO"
+
+    # As etapas são independentes entre si e executadas em paralelo pelo workflow_service.
+    etapas = {
+        'receita_federal_pep': lambda: data_service.check_receita_federal_pep(cpf_cliente),
+        'liveness_passivo': lambda: biometrics_service.check_liveness_passivo(selfie_liveness_bytes),
+        'face_match_liveness': lambda: biometrics_service.check_facematch_real(foto_doc_bytes, selfie_liveness_bytes),
+        'face_match_selfie_com_documento': lambda: biometrics_service.check_facematch_real(foto_doc_bytes, selfie_doc_bytes),
+        'background_check': lambda: bgc_service.check_background(cpf_cliente, nome_cliente),
+        'validacao_documento': lambda: document_service.validate_document(frente_bytes)
+    }
+
+    with metrics_service.medir('etapas_pf', timings):
+        workflow_executado = workflow_service.executar_etapas(etapas)
+    for nome_etapa, resultado in workflow_executado.items():
+        if resultado.get('status') != 'APROVADO':
+            status_geral = "PENDENCIA"
+
+    try:
+        with metrics_service.medir('aguardar_uploads', timings):
+            urls = storage_service.aguardar_uploads(uploads)
+    except Exception as e:
+        raise FalhaUpload(str(e)) from e
+    doc_frente_url, selfie_doc_url, selfie_liveness_url = urls['doc_frente'], urls['selfie_doc'], urls['selfie_liveness']
+
+    resposta_final = {"status_geral": status_geral, "workflow_executado": workflow_executado}
+
+    with metrics_service.medir('score', timings):
+        score_result = score_service.calculate_risk_score(workflow_executado)
+    resposta_final["risk_score"] = score_result
+
+    verificacao_id = None
+    try:
+        dados_extra = {'selfie_documento_url': selfie_doc_url}
+        if latitude and longitude:
+            dados_extra['geolocalizacao'] = {'latitude': latitude, 'longitude': longitude}
+
+        nova_verificacao = Verificacao(
+            tipo_verificacao='PF',
+            status_geral=status_geral,
+            doc_frente_url=doc_frente_url,
+            selfie_url=selfie_liveness_url,
+            dados_extra_json=dados_extra,
+            risk_score=score_result.get('score'),
+            risk_score_versao=score_result.get('versao_regras')
+        )
+        nova_verificacao.set_dados_entrada({'nome': nome_cliente, 'cpf': cpf_cliente})
+        nova_verificacao.set_resultado_completo(resposta_final)
+        nova_verificacao.registrar_etapas(workflow_executado)
+        db.session.add(nova_verificacao)
+        stats_service.registrar([nova_verificacao])
+        with metrics_service.medir('db_commit', timings):
+            db.session.commit()
+        verificacao_id = nova_verificacao.id
+        logger.info(f"Verificação para {nome_cliente} salva com sucesso no BD.")
+    except Exception as e:
+        logger.error(f'Falha ao salvar no BD: {e}', exc_info=True)
+        db.session.rollback()
+
+    timings['por_etapa'] = {nome: resultado.get('duracao_ms') for nome, resultado in workflow_executado.items()}
+    timings['total'] = round((time.perf_counter() - inicio) * 1000, 1)
+    resposta_final['timings'] = timings
+    return resposta_final, verificacao_id
+
+
+job_service.registrar_tarefa('onboarding_pf', processar_onboarding)
@@ -1,21 +1,20 @@
 # app/services/pj_service.py
 
-import requests
 from flask import current_app
+from app.services import cnpj_service, metrics_service
 
+@metrics_service.medir('pj_receita_federal')
 def _consultar_receita_federal(cnpj: str):
-    """Consulta os dados de um CNPJ na BrasilAPI."""
+    """Consulta os dados de um CNPJ na BrasilAPI (via cache e sessão compartilhada do cnpj_service)."""
     logger = current_app.logger
     try:
-        url_receita = f"{current_app.config['BRASILAPI_BASE_URL']}{cnpj}"
-        response = requests.get(url_receita, timeout=10)
-        response.raise_for_status()
-        dados_receita = response.json()
+        consulta = cnpj_service.buscar_receita(cnpj)
+        if consulta["status_code"] != 200:
+            logger.error(f'PJ_SERVICE: Erro ao consultar CNPJ {cnpj} na Receita: HTTP {consulta["status_code"]}')
+            return {"status": "PENDENCIA", "erro": f"CNPJ não encontrado ou inválido. Detalhes: HTTP {consulta['status_code']}"}
+        dados_receita = consulta["dados"]
         logger.info(f'PJ_SERVICE: CNPJ {cnpj} encontrado na Receita Federal.')
         return {"status": "APROVADO", "dados": dados_receita}
-    except requests.exceptions.HTTPError as e:
-        logger.error(f'PJ_SERVICE: Erro ao consultar CNPJ {cnpj} na Receita: {e}')
-        return {"status": "PENDENCIA", "erro": f"CNPJ não encontrado ou inválido. Detalhes: {str(e)}"}
     except Exception as e:
         logger.error(f'PJ_SERVICE: Erro inesperado ao consultar CNPJ {cnpj}: {e}')
         return {"status": "ERRO", "erro": f"Erro interno ao consultar Receita Federal: {str(e)}"}
@@ -0,0 +1,227 @@
+# app/services/provedores_mock.py
+# Substitutos locais e determinísticos dos provedores externos (Google Vision, AWS Rekognition,
+# Cloudinary e BrasilAPI), usados em testes de carga e desenvolvimento com PROVEDORES_MOCK=true.
+# O resultado de cada chamada depende apenas do conteúdo enviado; a latência (log-normal, com mediana
+# e p95 configuráveis em MOCK_PERFIS) e os erros (taxa_erro) são sorteados a partir de MOCK_SEMENTE.
+
+import hashlib
+import itertools
+import json
+import math
+import random
+import threading
+import time
+
+PERFIS_PADRAO = {
+    'vision': {'mediana_ms': 180, 'p95_ms': 450, 'taxa_erro': 0.0},
+    'rekognition': {'mediana_ms': 250, 'p95_ms': 600, 'taxa_erro': 0.0},
+    'cloudinary': {'mediana_ms': 300, 'p95_ms': 900, 'taxa_erro': 0.0},
+    'brasilapi': {'mediana_ms': 120, 'p95_ms': 400, 'taxa_erro': 0.0},
+}
+
+TEXTO_DOCUMENTO = (
+    "REPUBLICA FEDERATIVA DO BRASIL\nCARTEIRA DE IDENTIDADE\nNOME / NAME\n{nome}\n"
+    "CPF {cpf}\nDATA DE NASCIMENTO {nascimento}\n"
+)
+NOMES = ("MARIA DA SILVA", "JOAO PEREIRA SANTOS", "ANA CAROLINA SOUZA", "CARLOS EDUARDO LIMA")
+
+
+def _cpf(semente: int) -> str:
+    """CPF formatado com dígitos verificadores válidos, derivado da semente."""
+    digitos = [int(c) for c in f"{semente % 10**9:09d}"]
+    for posicao in (9, 10):
+        soma = sum(d * peso for d, peso in zip(digitos, range(posicao + 1, 1, -1)))
+        digitos.append(soma * 10 % 11 % 10)
+    d = ''.join(map(str, digitos))
+    return f"{d[:3]}.{d[3:6]}.{d[6:9]}-{d[9:]}"
+
+
+class ErroProvedorMock(Exception):
+    """Falha simulada de um provedor (sorteada conforme a taxa_erro do perfil)."""
+
+
+def _digest(*partes) -> int:
+    h = hashlib.sha256()
+    for parte in partes:
+        h.update(parte if isinstance(parte, bytes) else str(parte).encode('utf-8'))
+    return int.from_bytes(h.digest()[:8], 'big')
+
+
+class Simulador:
+    """Sorteia latência e erros de um provedor; cada chamada usa um gerador semeado por (semente, provedor, nº da chamada)."""
+
+    def __init__(self, provedor: str, config):
+        perfis = dict(PERFIS_PADRAO)
+        personalizados = config.get('MOCK_PERFIS')
+        if isinstance(personalizados, str):
+            personalizados = json.loads(personalizados) if personalizados else {}
+        for nome, perfil in (personalizados or {}).items():
+            perfis[nome] = dict(perfis.get(nome, {}), **perfil)
+
+        perfil = perfis[provedor]
+        self.provedor = provedor
+        self.mediana_s = perfil['mediana_ms'] / 1000
+        self.sigma = math.log(max(perfil['p95_ms'], perfil['mediana_ms']) / perfil['mediana_ms']) / 1.645 if perfil['mediana_ms'] else 0.0
+        self.taxa_erro = perfil['taxa_erro']
+        self.semente = config.get('MOCK_SEMENTE', 42)
+        self._contador = itertools.count()
+        self._lock = threading.Lock()
+
+    def chamar(self):
+        """Aguarda a latência sorteada; lança ErroProvedorMock com probabilidade taxa_erro."""
+        with self._lock:
+            n = next(self._contador)
+        rng = random.Random(f"{self.semente}:{self.provedor}:{n}")
+        if self.mediana_s:
+            time.sleep(self.mediana_s * math.exp(self.sigma * rng.gauss(0, 1)))
+        if rng.random() < self.taxa_erro:
+            raise ErroProvedorMock(f"Falha simulada em {self.provedor} (chamada {n}).")
+
+
+class VisionMock:
+    """Implementa annotate_image e face_detection do ImageAnnotatorClient com respostas do próprio SDK."""
+
+    def __init__(self, config):
+        self.simulador = Simulador('vision', config)
+
+    def _resposta_erro(self, e):
+        from google.cloud import vision
+        return vision.AnnotateImageResponse(error={'message': str(e)})
+
+    def _face(self, semente: int):
+        from google.cloud import vision
+        # 80% sorrindo (aprovado), 15% sem sorriso (pendência), 5% sem rosto.
+        faixa = semente % 100
+        if faixa >= 95:
+            return []
+        return [vision.FaceAnnotation(
+            bounding_poly=vision.BoundingPoly(vertices=[
+                vision.Vertex(x=10, y=10), vision.Vertex(x=110, y=10),
+                vision.Vertex(x=110, y=140), vision.Vertex(x=10, y=140),
+            ]),
+            detection_confidence=0.97,
+            joy_likelihood=vision.Likelihood.VERY_LIKELY if faixa < 80 else vision.Likelihood.UNLIKELY,
+            under_exposed_likelihood=vision.Likelihood.VERY_UNLIKELY,
+            blurred_likelihood=vision.Likelihood.VERY_UNLIKELY,
+            headwear_likelihood=vision.Likelihood.VERY_UNLIKELY,
+        )]
+
+    def face_detection(self, image, **kwargs):
+        from google.cloud import vision
+        try:
+            self.simulador.chamar()
+        except ErroProvedorMock as e:
+            return self._resposta_erro(e)
+        return vision.AnnotateImageResponse(face_annotations=self._face(_digest(image.content)))
+
+    def annotate_image(self, request, **kwargs):
+        from google.cloud import vision
+        try:
+            self.simulador.chamar()
+        except ErroProvedorMock as e:
+            return self._resposta_erro(e)
+        semente = _digest(request.image.content)
+        texto = TEXTO_DOCUMENTO.format(
+            nome=NOMES[semente % len(NOMES)],
+            cpf=_cpf(semente),
+            nascimento=f"{semente % 28 + 1:02d}/{semente % 12 + 1:02d}/{1950 + semente % 50}",
+        )
+        return vision.AnnotateImageResponse(
+            text_annotations=[vision.EntityAnnotation(description=texto)],
+            full_text_annotation=vision.TextAnnotation(text=texto),
+            face_annotations=self._face(0),
+        )
+
+
+class RekognitionMock:
+    """Implementa compare_faces do cliente boto3 do Rekognition."""
+
+    class exceptions:
+        class InvalidParameterException(Exception):
+            pass
+
+    def __init__(self, config):
+        self.simulador = Simulador('rekognition', config)
+
+    def compare_faces(self, SourceImage, TargetImage, SimilarityThreshold=0, **kwargs):
+        self.simulador.chamar()
+        semente = _digest(SourceImage['Bytes'], TargetImage['Bytes'])
+        # 90% dos pares com alta similaridade (93-99%), 10% abaixo do limiar.
+        if semente % 100 < 90:
+            similaridade = 93 + (semente % 600) / 100
+        else:
+            similaridade = 40 + (semente % 4000) / 100
+        return {'FaceMatches': [{'Similarity': similaridade}], 'UnmatchedFaces': []}
+
+
+class _RespostaHttp:
+    def __init__(self, status_code: int, dados=None):
+        self.status_code = status_code
+        self._dados = dados
+        self.headers = {}
+
+    def json(self):
+        return self._dados
+
+
+class BrasilApiMock:
+    """Substitui a requests.Session usada pelo cnpj_service para a BrasilAPI."""
+
+    def __init__(self, config):
+        self.simulador = Simulador('brasilapi', config)
+
+    def get(self, url, timeout=None, **kwargs):
+        try:
+            self.simulador.chamar()
+        except ErroProvedorMock:
+            return _RespostaHttp(503)
+        cnpj = url.rstrip('/').rsplit('/', 1)[-1]
+        semente = _digest(cnpj)
+        # 5% dos CNPJs não existem; 10% dos existentes não estão ativos.
+        if semente % 100 >= 95:
+            return _RespostaHttp(404)
+        socios = [
+            {"nome_socio": NOMES[(semente + i) % len(NOMES)], "qualificacao_socio": "Sócio-Administrador" if i == 0 else "Sócio"}
+            for i in range(1 + semente % 4)
+        ]
+        return _RespostaHttp(200, {
+            "cnpj": cnpj,
+            "razao_social": f"EMPRESA SIMULADA {cnpj[:8]} LTDA",
+            "nome_fantasia": f"SIMULADA {cnpj[:4]}",
+            "descricao_situacao_cadastral": "ATIVA" if semente % 100 < 85 else "BAIXADA",
+            "data_inicio_atividade": "2010-05-20",
+            "descricao_porte": "DEMAIS",
+            "natureza_juridica": "Sociedade Empresária Limitada",
+            "capital_social": 10000 + semente % 1000000,
+            "cnae_fiscal_descricao": "Desenvolvimento de programas de computador sob encomenda",
+            "logradouro": "RUA SIMULADA", "numero": str(semente % 1000), "bairro": "CENTRO",
+            "municipio": "SAO PAULO", "uf": "SP", "cep": "01001000",
+            "ddd_telefone_1": "11", "telefone1": "40000000", "email": "contato@simulada.com.br",
+            "qsa": socios,
+        })
+
+
+class ArmazenamentoMock:
+    """Backend de armazenamento em memória com a latência do Cloudinary; as URLs são mock://<pasta>/<sha256>."""
+
+    def __init__(self, config):
+        self.simulador = Simulador('cloudinary', config)
+        self.limite_itens = config.get('MOCK_ARMAZENAMENTO_MAX_ITENS', 1000)
+        self._arquivos = {}
+        self._lock = threading.Lock()
+
+    def salvar(self, conteudo: bytes, pasta: str, nome_arquivo: str = None) -> str:
+        self.simulador.chamar()
+        url = f"mock://{pasta}/{hashlib.sha256(conteudo).hexdigest()}"
+        with self._lock:
+            if len(self._arquivos) >= self.limite_itens:
+                self._arquivos.pop(next(iter(self._arquivos)))
+            self._arquivos[url] = conteudo
+        return url
+
+    def ler(self, url: str) -> bytes:
+        self.simulador.chamar()
+        with self._lock:
+            if url not in self._arquivos:
+                raise FileNotFoundError(url)
+            return self._arquivos[url]
@@ -1,74 +1,203 @@
 # app/services/score_service.py
 
+import json
+import os
+import threading
+import time
+import numpy as np
 from flask import current_app
 
+# As regras de pontuação ficam em SCORE_RULES_PATH (padrão: app/rules/score_rules.json).
+# Em cada etapa as regras são avaliadas em ordem e apenas a primeira que casar é aplicada
+# (equivalente a um if/elif/else). Condição vazia = "senão". Condições suportadas:
+# "status" (igualdade) e "similaridade_maior_que".
+CONDICOES_SUPORTADAS = {"status", "similaridade_maior_que"}
+
+
+class RegrasInvalidas(ValueError):
+    """O arquivo de regras de score não pôde ser carregado ou validado."""
+
+
+class MotorScore:
+    """
+    Regras de score compiladas para avaliação vetorizada (NumPy).
+    As features de cada etapa são o código do status e a similaridade; cada regra vira uma
+    máscara booleana sobre o lote, e o resultado de um único workflow é o de um lote de tamanho 1.
+    """
+
+    def __init__(self, regras: dict):
+        try:
+            self._compilar(regras)
+        except (KeyError, TypeError, ValueError) as e:
+            raise RegrasInvalidas(f"Regras de score inválidas: {e!r}") from e
+
+    def _compilar(self, regras: dict):
+        self.regras = regras
+        self.versao = str(regras["versao"])
+        self.score_base = int(regras["score_base"])
+        self.score_min = int(regras["score_min"])
+        self.score_max = int(regras["score_max"])
+        self.ratings = [(faixa["score_minimo"], faixa["rating"]) for faixa in regras["ratings"]]
+        if not self.ratings or self.ratings[-1][0] is not None:
+            raise ValueError("a última faixa de rating deve ter score_minimo nulo")
+        self.etapas = list(regras["etapas"].keys())
+        for regras_etapa in regras["etapas"].values():
+            for regra in regras_etapa:
+                desconhecidas = set(regra["condicao"]) - CONDICOES_SUPORTADAS
+                if desconhecidas:
+                    raise ValueError(f"condições não suportadas: {sorted(desconhecidas)}")
+
+        # Vocabulário de status citados nas regras; qualquer outro (ou ausente) recebe o código -1.
+        status_conhecidos = sorted({
+            regra["condicao"]["status"]
+            for regras_etapa in regras["etapas"].values() for regra in regras_etapa
+            if "status" in regra["condicao"]
+        })
+        self.codigos_status = {status: codigo for codigo, status in enumerate(status_conhecidos)}
+
+        # Lista plana de regras: (índice da etapa, código do status ou None, limiar de similaridade ou None, delta, motivo).
+        self.regras_compiladas = []
+        for indice_etapa, nome_etapa in enumerate(self.etapas):
+            for regra in regras["etapas"][nome_etapa]:
+                condicao = regra["condicao"]
+                codigo = self.codigos_status[condicao["status"]] if "status" in condicao else None
+                self.regras_compiladas.append(
+                    (indice_etapa, codigo, condicao.get("similaridade_maior_que"), int(regra["delta"]), regra["motivo"])
+                )
+
+    def extrair_features(self, workflows: list):
+        """Converte uma lista de workflow_executado em matrizes (etapas x lote) de status e similaridade."""
+        n = len(workflows)
+        status = np.full((len(self.etapas), n), -1, dtype=np.int16)
+        similaridade = np.zeros((len(self.etapas), n), dtype=np.float64)
+        codigos = self.codigos_status
+        for coluna, workflow in enumerate(workflows):
+            for linha, nome_etapa in enumerate(self.etapas):
+                etapa = workflow.get(nome_etapa) or {}
+                status[linha, coluna] = codigos.get(etapa.get('status'), -1)
+                similaridade[linha, coluna] = etapa.get('similaridade') or 0
+        return status, similaridade
+
+    def avaliar(self, status: np.ndarray, similaridade: np.ndarray):
+        """
+        Aplica as regras ao lote. Retorna (scores, ratings, regras_aplicadas), onde regras_aplicadas
+        é uma matriz booleana (regras x lote) indicando quais regras contribuíram para cada score.
+        """
+        n = status.shape[1]
+        scores = np.full(n, self.score_base, dtype=np.int64)
+        aplicadas = np.zeros((len(self.regras_compiladas), n), dtype=bool)
+        ja_casou = np.zeros((len(self.etapas), n), dtype=bool)
+
+        for indice, (etapa, codigo, limiar, delta, _) in enumerate(self.regras_compiladas):
+            mascara = ~ja_casou[etapa]
+            if codigo is not None:
+                mascara &= status[etapa] == codigo
+            if limiar is not None:
+                mascara &= similaridade[etapa] > limiar
+            scores += mascara * delta
+            ja_casou[etapa] |= mascara
+            aplicadas[indice] = mascara
+
+        scores = np.clip(scores, self.score_min, self.score_max)
+
+        ratings = np.empty(n, dtype=object)
+        pendentes = np.ones(n, dtype=bool)
+        for limite, rating in self.ratings:
+            mascara = pendentes if limite is None else pendentes & (scores >= limite)
+            ratings[mascara] = rating
+            pendentes &= ~mascara
+        return scores, ratings, aplicadas
+
+    def pontuar_lote(self, workflows: list):
+        """Retorna (scores, ratings) para uma lista de workflow_executado."""
+        scores, ratings, _ = self.avaliar(*self.extrair_features(workflows))
+        return scores, ratings
+
+    def motivos(self, aplicadas: np.ndarray, coluna: int) -> list:
+        """Textos ("+delta: motivo") das regras que contribuíram para o score da coluna `coluna` do lote."""
+        return [
+            f"{'+' if delta >= 0 else ''}{delta}: {motivo}"
+            for indice, (_, _, _, delta, motivo) in enumerate(self.regras_compiladas)
+            if aplicadas[indice, coluna]
+        ]
+
+    def resultado(self, scores, ratings, aplicadas, coluna: int) -> dict:
+        """Resultado da coluna `coluna` de avaliar(), no mesmo formato retornado por calculate_risk_score."""
+        return {"score": int(scores[coluna]), "rating": ratings[coluna], "reasons": self.motivos(aplicadas, coluna),
+                "versao_regras": self.versao}
+
+    def pontuar(self, workflow_executado: dict) -> dict:
+        """Pontua um único workflow, no mesmo formato retornado por calculate_risk_score."""
+        return self.resultado(*self.avaliar(*self.extrair_features([workflow_executado])), 0)
+
+
+def _caminho_regras():
+    return current_app.config.get('SCORE_RULES_PATH') or os.path.join(current_app.root_path, 'rules', 'score_rules.json')
+
+
+def carregar_motor(caminho: str) -> MotorScore:
+    """Lê e compila um arquivo de regras. Lança RegrasInvalidas se o arquivo for inválido."""
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            regras = json.load(f)
+    except (OSError, ValueError) as e:
+        raise RegrasInvalidas(f"Não foi possível ler as regras de score em {caminho}: {e}") from e
+    return MotorScore(regras)
+
+
+_motor = None
+_assinatura = None
+_proxima_verificacao = 0.0
+_recarga_lock = threading.Lock()
+
+
+def get_motor() -> MotorScore:
+    """
+    Retorna o motor de score compilado. O arquivo de regras é verificado (mtime/tamanho) no máximo
+    a cada SCORE_RULES_CHECK_INTERVAL segundos; se mudou, é recompilado e trocado atomicamente.
+    Uma versão inválida é ignorada e o motor anterior continua em uso.
+    """
+    global _motor, _assinatura, _proxima_verificacao
+    agora = time.monotonic()
+    if _motor is not None and agora < _proxima_verificacao:
+        return _motor
+
+    with _recarga_lock:
+        if _motor is not None and agora < _proxima_verificacao:
+            return _motor
+        caminho = _caminho_regras()
+        _proxima_verificacao = agora + current_app.config.get('SCORE_RULES_CHECK_INTERVAL', 5)
+        try:
+            stat = os.stat(caminho)
+            assinatura = (caminho, stat.st_mtime_ns, stat.st_size)
+        except OSError as e:
+            if _motor is None:
+                raise RegrasInvalidas(f"Arquivo de regras de score não encontrado: {caminho}") from e
+            current_app.logger.error(f"SCORE_SERVICE: Arquivo de regras indisponível ({e}); mantendo a versão {_motor.versao}.")
+            return _motor
+
+        if assinatura != _assinatura:
+            try:
+                novo_motor = carregar_motor(caminho)
+            except RegrasInvalidas as e:
+                if _motor is None:
+                    raise
+                current_app.logger.error(f"SCORE_SERVICE: {e}; mantendo a versão {_motor.versao}.")
+            else:
+                _motor = novo_motor
+                current_app.logger.info(f"SCORE_SERVICE: Regras de score versão {novo_motor.versao} carregadas.")
+            _assinatura = assinatura
+    return _motor
+
+
 def calculate_risk_score(workflow_executado: dict):
     """
     Calcula um score de risco com base nos resultados do workflow de verificação.
-    As regras e pesos abaixo são exemplos e devem ser ajustados conforme a necessidade do negócio.
     """
     logger = current_app.logger
-    score = 500  # Score base (escala de 0 a 1000, por exemplo)
-    reasons = []
-
     logger.info("SCORE_SERVICE: Iniciando cálculo de score de risco.")
 
-    # 1. Análise de Face Match (Liveness vs. Documento)
-    face_match = workflow_executado.get('face_match_liveness', {})
-    if face_match.get('status') == 'APROVADO':
-        similaridade = face_match.get('similaridade', 0)
-        if similaridade > 0.98:
-            score += 150
-            reasons.append("+150: Altíssima similaridade no Face Match.")
-        else:
-            score += 75
-            reasons.append("+75: Boa similaridade no Face Match.")
-    else:
-        score -= 200
-        reasons.append("-200: Falha no Face Match principal.")
-
-    # 2. Análise de Liveness Passivo
-    liveness_passivo = workflow_executado.get('liveness_passivo', {})
-    if liveness_passivo.get('status') == 'APROVADO':
-        score += 100
-        reasons.append("+100: Prova de vida passiva aprovada (selfie genuína).")
-    else:
-        score -= 150
-        reasons.append("-150: Suspeita de fraude na prova de vida passiva.")
-
-    # 3. Análise de Background Check (BGC)
-    bgc = workflow_executado.get('background_check', {})
-    if bgc.get('status') == 'PENDENCIA':
-        score -= 250
-        reasons.append("-250: Pendências encontradas no Background Check.")
-    elif bgc.get('status') == 'APROVADO':
-        score += 50
-        reasons.append("+50: Nenhuma pendência encontrada no Background Check.")
-
-    # 4. Análise da Validação do Documento
-    validacao_doc = workflow_executado.get('validacao_documento', {})
-    if validacao_doc.get('status') == 'APROVADO':
-        score += 100
-        reasons.append("+100: Documento validado com sucesso (sem indícios de fraude).")
-    else:
-        score -= 150
-        reasons.append("-150: Documento com pendência na análise de autenticidade.")
-
-    # Normaliza o score para ficar entre 0 e 1000
-    score = max(0, min(score, 1000))
-
-    # Define o rating com base em faixas de score
-    if score >= 800:
-        rating = "BAIXO RISCO"
-    elif score >= 500:
-        rating = "MÉDIO RISCO"
-    else:
-        rating = "ALTO RISCO"
-
-    logger.info(f"SCORE_SERVICE: Cálculo finalizado. Score: {score}, Rating: {rating}")
-
-    return {
-        "score": score,
-        "rating": rating,
-        "reasons": reasons
-    }
\ No newline at end of file
+    resultado = get_motor().pontuar(workflow_executado)
+
+    logger.info(f"SCORE_SERVICE: Cálculo finalizado. Score: {resultado['score']}, Rating: {resultado['rating']}")
+    return resultado
@@ -0,0 +1,135 @@
+# app/services/stats_service.py
+
+from collections import Counter
+from datetime import datetime, timedelta
+from app import db
+from app.models import AgregadoVerificacao, Verificacao
+
+TAMANHO_FAIXA_SCORE = 100
+
+
+def _chave_grupo(timestamp, tipo_verificacao, status_geral, risk_score):
+    hora = (timestamp or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+    faixa = -1 if risk_score is None else int(risk_score) // TAMANHO_FAIXA_SCORE
+    return hora, tipo_verificacao or 'N/A', status_geral or 'N/A', faixa
+
+
+def _upsert(contagens: Counter):
+    """Soma as contagens aos rollups existentes com INSERT ... ON CONFLICT DO UPDATE (Postgres e SQLite)."""
+    contagens = {chave: total for chave, total in contagens.items() if total}
+    if not contagens:
+        return
+    dialeto = db.engine.dialect.name
+    if dialeto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialeto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+
+    tabela = AgregadoVerificacao.__table__
+    for (hora, tipo, status, faixa), total in contagens.items():
+        valores = {'hora': hora, 'tipo_verificacao': tipo, 'status_geral': status, 'faixa_score': faixa, 'total': total}
+        if insert is not None:
+            comando = insert(tabela).values(**valores)
+            comando = comando.on_conflict_do_update(
+                index_elements=['hora', 'tipo_verificacao', 'status_geral', 'faixa_score'],
+                set_={'total': tabela.c.total + comando.excluded.total}
+            )
+            db.session.execute(comando)
+        else:
+            atualizados = db.session.execute(
+                tabela.update()
+                .where(tabela.c.hora == hora, tabela.c.tipo_verificacao == tipo,
+                       tabela.c.status_geral == status, tabela.c.faixa_score == faixa)
+                .values(total=tabela.c.total + total)
+            ).rowcount
+            if not atualizados:
+                db.session.execute(tabela.insert().values(**valores))
+
+
+def registrar(verificacoes):
+    """
+    Incrementa os rollups para as verificações informadas (objetos Verificacao ou dicts com
+    timestamp, tipo_verificacao, status_geral e risk_score). Deve ser chamada antes do commit
+    que grava as verificações, para que ambos fiquem na mesma transação.
+    """
+    contagens = Counter()
+    for v in verificacoes:
+        if isinstance(v, dict):
+            chave = _chave_grupo(v.get('timestamp'), v.get('tipo_verificacao'), v.get('status_geral'), v.get('risk_score'))
+        else:
+            chave = _chave_grupo(v.timestamp, v.tipo_verificacao, v.status_geral, v.risk_score)
+        contagens[chave] += 1
+    _upsert(contagens)
+
+
+def reclassificar(alteracoes):
+    """
+    Move verificações re-pontuadas entre faixas de score nos rollups: para cada (timestamp, tipo_verificacao,
+    status_geral, score_antigo, score_novo), decrementa o grupo antigo e incrementa o novo. Assim como
+    registrar, deve ser chamada antes do commit que grava os novos scores.
+    """
+    contagens = Counter()
+    for timestamp, tipo, status, score_antigo, score_novo in alteracoes:
+        contagens[_chave_grupo(timestamp, tipo, status, score_antigo)] -= 1
+        contagens[_chave_grupo(timestamp, tipo, status, score_novo)] += 1
+    _upsert(contagens)
+
+
+def reconstruir(lote: int = 5000) -> int:
+    """Recalcula todos os rollups a partir da tabela Verificacao (compactador/backfill). Retorna o nº de verificações."""
+    contagens = Counter()
+    total = 0
+    query = (db.session.query(Verificacao.timestamp, Verificacao.tipo_verificacao,
+                              Verificacao.status_geral, Verificacao.risk_score)
+             .execution_options(stream_results=True).yield_per(lote))
+    for timestamp, tipo, status, risk_score in query:
+        contagens[_chave_grupo(timestamp, tipo, status, risk_score)] += 1
+        total += 1
+    db.session.query(AgregadoVerificacao).delete()
+    _upsert(contagens)
+    db.session.commit()
+    return total
+
+
+def resumo(horas: int = 24) -> dict:
+    """
+    Contagens por status e tipo, histograma de score e throughput horário das últimas `horas` horas,
+    lidos apenas dos rollups. Todos os totais usam a mesma janela, de modo que o custo depende dela
+    (pela faixa de `hora` no índice único) e não do tamanho do histórico.
+    """
+    tabela = AgregadoVerificacao
+    soma = db.func.sum(tabela.total)
+    inicio = (datetime.utcnow() - timedelta(hours=horas)).replace(minute=0, second=0, microsecond=0)
+
+    por_status, por_tipo, por_faixa = Counter(), Counter(), Counter()
+    grupos = (db.session.query(tabela.status_geral, tabela.tipo_verificacao, tabela.faixa_score, soma)
+              .filter(tabela.hora >= inicio)
+              .group_by(tabela.status_geral, tabela.tipo_verificacao, tabela.faixa_score)
+              .all())
+    for status, tipo, faixa, total in grupos:
+        por_status[status] += total
+        por_tipo[tipo] += total
+        por_faixa[faixa] += total
+
+    por_hora = (db.session.query(tabela.hora, soma)
+                .filter(tabela.hora >= inicio)
+                .group_by(tabela.hora)
+                .order_by(tabela.hora)
+                .all())
+
+    # Grupos zerados por reclassificar (rescore) ficam na tabela até o próximo rebuild-stats.
+    histograma = [
+        {'faixa': f"{f * TAMANHO_FAIXA_SCORE}-{f * TAMANHO_FAIXA_SCORE + TAMANHO_FAIXA_SCORE - 1}", 'total': int(por_faixa[f])}
+        for f in sorted(k for k, total in por_faixa.items() if k >= 0 and total)
+    ]
+    return {
+        'janela_horas': horas,
+        'total': int(sum(por_status.values())),
+        'por_status': {k: int(v) for k, v in por_status.items()},
+        'por_tipo': {k: int(v) for k, v in por_tipo.items()},
+        'histograma_score': histograma,
+        'sem_score': int(por_faixa.get(-1, 0)),
+        'throughput_horario': [{'hora': hora.isoformat(), 'total': int(total)} for hora, total in por_hora],
+    }
@@ -0,0 +1,129 @@
+# app/services/storage_service.py
+
+import hashlib
+import os
+import threading
+import requests
+from io import BytesIO
+from flask import current_app
+from app.services import metrics_service, provedores_mock, workflow_service
+
+
+class CloudinaryStorage:
+    """Armazena as imagens no Cloudinary (backend padrão em produção)."""
+
+    def __init__(self, config):
+        import cloudinary
+        import cloudinary.uploader
+        self._uploader = cloudinary.uploader
+        cloudinary.config(
+            cloud_name=os.environ.get('CLOUDINARY_CLOUD_NAME'),
+            api_key=os.environ.get('CLOUDINARY_API_KEY'),
+            api_secret=os.environ.get('CLOUDINARY_API_SECRET'),
+            secure=True
+        )
+
+    @metrics_service.medir('upload_cloudinary')
+    def salvar(self, conteudo: bytes, pasta: str, nome_arquivo: str = None) -> str:
+        arquivo = BytesIO(conteudo)
+        arquivo.name = nome_arquivo or 'upload'
+        return self._uploader.upload(arquivo, folder=pasta).get('secure_url')
+
+    def ler(self, url: str) -> bytes:
+        resposta = requests.get(url, timeout=current_app.config.get('STORAGE_UPLOAD_TIMEOUT', 30))
+        resposta.raise_for_status()
+        return resposta.content
+
+
+class LocalStorage:
+    """Grava as imagens no sistema de arquivos local, útil para desenvolvimento e benchmarks offline."""
+
+    def __init__(self, config):
+        self.diretorio = config.get('STORAGE_LOCAL_DIR')
+        self.url_base = config.get('STORAGE_LOCAL_URL_BASE')
+
+    @metrics_service.medir('upload_local')
+    def salvar(self, conteudo: bytes, pasta: str, nome_arquivo: str = None) -> str:
+        # O nome do arquivo é o hash do conteúdo, o que torna o upload idempotente.
+        extensao = os.path.splitext(nome_arquivo or '')[1] or '.bin'
+        nome = hashlib.sha256(conteudo).hexdigest() + extensao
+        destino_dir = os.path.join(self.diretorio, pasta)
+        os.makedirs(destino_dir, exist_ok=True)
+        destino = os.path.join(destino_dir, nome)
+        if not os.path.exists(destino):
+            with open(destino, 'wb') as f:
+                f.write(conteudo)
+        if self.url_base:
+            return f"{self.url_base.rstrip('/')}/{pasta}/{nome}"
+        return 'file://' + os.path.abspath(destino)
+
+    def ler(self, url: str) -> bytes:
+        """
+        Lê um arquivo gravado por este backend (URL file:// ou iniciada por STORAGE_LOCAL_URL_BASE).
+        Levanta ValueError para URLs de outro backend (ex: Cloudinary, gravadas antes de uma troca de
+        STORAGE_BACKEND) ou que apontem para fora de STORAGE_LOCAL_DIR.
+        """
+        prefixo = f"{self.url_base.rstrip('/')}/" if self.url_base else None
+        if url.startswith('file://'):
+            caminho = url[len('file://'):]
+        elif prefixo and url.startswith(prefixo):
+            caminho = os.path.join(self.diretorio, url[len(prefixo):])
+        else:
+            raise ValueError(f"URL não pertence ao armazenamento local (STORAGE_LOCAL_URL_BASE={self.url_base!r}): {url}")
+        diretorio = os.path.realpath(self.diretorio)
+        caminho = os.path.realpath(caminho)
+        if os.path.commonpath([diretorio, caminho]) != diretorio:
+            raise ValueError(f"URL fora do diretório do armazenamento local ({self.diretorio}): {url}")
+        with open(caminho, 'rb') as f:
+            return f.read()
+
+
+BACKENDS = {
+    'cloudinary': CloudinaryStorage,
+    'local': LocalStorage,
+    'mock': provedores_mock.ArmazenamentoMock,
+}
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Retorna a instância do backend configurado em STORAGE_BACKEND (criada uma única vez por processo)."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                nome_backend = current_app.config.get('STORAGE_BACKEND', 'cloudinary')
+                if current_app.config.get('PROVEDORES_MOCK'):
+                    nome_backend = 'mock'
+                if nome_backend not in BACKENDS:
+                    raise ValueError(f"Backend de armazenamento desconhecido: {nome_backend}")
+                _storage = BACKENDS[nome_backend](current_app.config)
+                current_app.logger.info(f"STORAGE_SERVICE: Backend '{nome_backend}' inicializado.")
+    return _storage
+
+
+def iniciar_uploads(arquivos: dict) -> dict:
+    """
+    Dispara os uploads em paralelo, sem bloquear o chamador, no pool próprio de uploads
+    (STORAGE_UPLOAD_MAX_WORKERS), separado do pool das etapas dos workflows.
+    arquivos: {nome: (conteudo_bytes, pasta, nome_arquivo)}.
+    Retorna {nome: Future} cujo resultado é a URL pública do arquivo.
+    """
+    storage = get_storage()
+    return {
+        nome: workflow_service.submeter(lambda c=conteudo, p=pasta, n=nome_arquivo: storage.salvar(c, p, n), pool='uploads')
+        for nome, (conteudo, pasta, nome_arquivo) in arquivos.items()
+    }
+
+
+def aguardar_uploads(futuros: dict, timeout: float = None) -> dict:
+    """Aguarda os uploads iniciados por `iniciar_uploads` e retorna {nome: url}. Propaga a primeira falha."""
+    timeout = timeout if timeout is not None else current_app.config.get('STORAGE_UPLOAD_TIMEOUT', 30)
+    return {nome: futuro.result(timeout=timeout) for nome, futuro in futuros.items()}
+
+
+def baixar(url: str) -> bytes:
+    """Lê o conteúdo de um arquivo salvo pelo backend configurado (ex: a selfie do onboarding)."""
+    return get_storage().ler(url)
@@ -0,0 +1,185 @@
+# app/services/workflow_service.py
+
+import os
+import threading
+import time
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, FIRST_COMPLETED, wait
+from flask import current_app
+from app.services import metrics_service
+
+# Pools compartilhados por nome: (chave de configuração do nº de threads, padrão). Os uploads têm pool
+# próprio para que arquivos grandes ou um storage lento não ocupem as threads das etapas.
+POOLS = {
+    'etapas': ('WORKFLOW_MAX_WORKERS', 16),
+    'uploads': ('STORAGE_UPLOAD_MAX_WORKERS', 8),
+}
+
+_executores = {}
+_executor_lock = threading.Lock()
+
+
+def _get_executor(pool: str = 'etapas'):
+    """Retorna o pool de threads compartilhado `pool` (criado sob demanda)."""
+    executor = _executores.get(pool)
+    if executor is None:
+        with _executor_lock:
+            executor = _executores.get(pool)
+            if executor is None:
+                chave, padrao = POOLS[pool]
+                executor = ThreadPoolExecutor(max_workers=current_app.config.get(chave, padrao),
+                                              thread_name_prefix=f'workflow-{pool}')
+                _executores[pool] = executor
+    return executor
+
+
+def _resetar_executor():
+    """Descarta os pools herdados no processo filho após um fork (as threads não sobrevivem ao fork)."""
+    global _executores, _executor_lock
+    _executores = {}
+    _executor_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_resetar_executor)
+
+
+def _executar_no_contexto(app, funcao):
+    """Executa `funcao` numa thread do pool com o contexto da aplicação ativo."""
+    with app.app_context():
+        return funcao()
+
+
+def submeter(funcao, pool: str = 'etapas'):
+    """Agenda `funcao` (callable sem argumentos) no pool compartilhado `pool` e retorna o Future."""
+    app = current_app._get_current_object()
+    return _get_executor(pool).submit(_executar_no_contexto, app, funcao)
+
+
+class _Partida:
+    """Registra quando uma etapa saiu da fila do pool e começou a executar."""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.inicio = None
+
+    def marcar(self):
+        self.inicio = time.perf_counter()
+        self.evento.set()
+
+
+def _executar_etapa(funcao, partida: _Partida):
+    """Executa uma etapa e mede o seu tempo de parede, convertendo exceções em resultado de ERRO."""
+    partida.marcar()
+    try:
+        resultado = funcao()
+    except Exception as e:
+        current_app.logger.error(f"WORKFLOW: Erro inesperado na etapa: {e}", exc_info=True)
+        resultado = {"status": "ERRO", "motivo": "Falha inesperada na execução da etapa."}
+    return resultado, (time.perf_counter() - partida.inicio) * 1000
+
+
+def executar_etapas(etapas: dict, timeouts: dict = None) -> dict:
+    """
+    Executa as etapas independentes de um workflow em paralelo.
+    etapas: dicionário {nome_etapa: callable sem argumentos que retorna o dict de resultado}.
+    timeouts: prazo opcional (em segundos) por etapa; as demais usam WORKFLOW_STAGE_TIMEOUT. O prazo conta a
+    partir do início da execução da etapa, não do tempo na fila do pool; a espera na fila é limitada
+    separadamente por WORKFLOW_QUEUE_TIMEOUT, e a etapa que ainda estiver na fila depois disso é cancelada.
+    Uma etapa que estoura o prazo já em execução não pode ser interrompida: ela termina em segundo plano
+    e o seu resultado é descartado.
+    Retorna o workflow_executado na mesma ordem de `etapas`, com 'duracao_ms' em cada resultado.
+    """
+    logger = current_app.logger
+    timeouts = timeouts or {}
+    timeout_padrao = current_app.config.get('WORKFLOW_STAGE_TIMEOUT', 20)
+    timeout_fila = current_app.config.get('WORKFLOW_QUEUE_TIMEOUT', 30)
+
+    inicio = time.perf_counter()
+    partidas = {nome: _Partida() for nome in etapas}
+    futuros = {nome: submeter(partial(_executar_etapa, funcao, partidas[nome])) for nome, funcao in etapas.items()}
+
+    workflow_executado = {}
+    for nome_etapa, futuro in futuros.items():
+        prazo = timeouts.get(nome_etapa, timeout_padrao)
+        partida = partidas[nome_etapa]
+        resultado = None
+        if not partida.evento.wait(timeout=max(0.0, timeout_fila - (time.perf_counter() - inicio))) and futuro.cancel():
+            logger.warning(f"WORKFLOW: Etapa '{nome_etapa}' não saiu da fila do pool em {timeout_fila}s.")
+            resultado = {"status": "ERRO", "motivo": f"Etapa não iniciada: fila de execução cheia por mais de {timeout_fila}s."}
+            duracao_ms = 0.0
+        else:
+            partida.evento.wait()
+            restante = max(0.0, partida.inicio + prazo - time.perf_counter())
+            try:
+                resultado, duracao_ms = futuro.result(timeout=restante)
+            except FuturesTimeoutError:
+                logger.warning(f"WORKFLOW: Etapa '{nome_etapa}' excedeu o prazo de {prazo}s.")
+                resultado = {"status": "ERRO", "motivo": f"Tempo limite de {prazo}s excedido na etapa."}
+                duracao_ms = (time.perf_counter() - partida.inicio) * 1000
+
+        resultado = dict(resultado) if isinstance(resultado, dict) else {"status": "ERRO", "motivo": str(resultado)}
+        resultado['duracao_ms'] = round(duracao_ms, 1)
+        workflow_executado[nome_etapa] = resultado
+        metrics_service.observar(f"etapa_{nome_etapa}", str(resultado.get('status') or 'desconhecido').lower(), duracao_ms / 1000)
+
+    logger.info(f"WORKFLOW: {len(etapas)} etapas concluídas em {(time.perf_counter() - inicio) * 1000:.0f} ms.")
+    return workflow_executado
+
+
+def mapear_paralelo(funcao, itens: list, max_concorrencia: int, prazo: float, resultado_timeout=None) -> list:
+    """
+    Aplica `funcao` a cada item com no máximo `max_concorrencia` execuções simultâneas e um prazo
+    total de `prazo` segundos. Retorna os resultados na mesma ordem de `itens`; itens que não
+    terminarem no prazo recebem `resultado_timeout(item)`.
+    Usa um pool próprio para não disputar (nem bloquear) o pool compartilhado das etapas.
+    """
+    if not itens:
+        return []
+    app = current_app._get_current_object()
+    executor = ThreadPoolExecutor(max_workers=min(max_concorrencia, len(itens)), thread_name_prefix='workflow-map')
+    inicio = time.perf_counter()
+    try:
+        futuros = [executor.submit(_executar_no_contexto, app, partial(funcao, item)) for item in itens]
+        resultados = []
+        for item, futuro in zip(itens, futuros):
+            restante = max(0.0, prazo - (time.perf_counter() - inicio))
+            try:
+                resultados.append(futuro.result(timeout=restante))
+            except FuturesTimeoutError:
+                futuro.cancel()
+                resultados.append(resultado_timeout(item) if resultado_timeout else None)
+        return resultados
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def mapear_conforme_concluir(funcao, itens: list, max_concorrencia: int):
+    """
+    Gerador que aplica `funcao` aos itens com no máximo `max_concorrencia` execuções simultâneas
+    e produz (indice, item, resultado, erro) à medida que cada item termina.
+    Os itens são submetidos aos poucos, então a memória usada não cresce com o tamanho do lote;
+    se o consumidor abandonar o gerador, os itens ainda não iniciados são descartados.
+    """
+    if not itens:
+        return
+    app = current_app._get_current_object()
+    executor = ThreadPoolExecutor(max_workers=min(max_concorrencia, len(itens)), thread_name_prefix='workflow-lote')
+    pendentes = {}
+    proximos = iter(enumerate(itens))
+    try:
+        for indice, item in proximos:
+            pendentes[executor.submit(_executar_no_contexto, app, partial(funcao, item))] = (indice, item)
+            if len(pendentes) >= max_concorrencia:
+                break
+        while pendentes:
+            concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                indice, item = pendentes.pop(futuro)
+                erro = futuro.exception()
+                yield indice, item, (None if erro else futuro.result()), erro
+                proximo = next(proximos, None)
+                if proximo is not None:
+                    pendentes[executor.submit(_executar_no_contexto, app, partial(funcao, proximo[1]))] = proximo
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
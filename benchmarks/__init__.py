@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# Ferramentas de medição de desempenho executadas pela CLI (ver run.py).
@@ -0,0 +1,241 @@
+# benchmarks/carga.py
+# Teste de carga em malha aberta: dispara requisições nas rotas de onboarding PF, PJ e autenticação
+# a uma taxa fixa (RPS), contra a aplicação em processo (Flask test client) ou um servidor remoto.
+
+import base64
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import numpy as np
+from PIL import Image, ImageDraw
+
+ENDPOINTS = {
+    'pf': '/onboarding/pf/verificar',
+    'pj': '/onboarding/pj/verificar',
+    'auth': '/autenticacao/autenticar',
+}
+PERCENTIS = (50, 95, 99)
+
+
+def gerar_imagens(quantidade: int, semente: int = 42) -> list:
+    """Gera JPEGs distintos (640x480) com formas aleatórias, para não depender de fotos reais nem só acertar o cache."""
+    rng = random.Random(semente)
+    imagens = []
+    for _ in range(quantidade):
+        img = Image.new('RGB', (640, 480), tuple(rng.randint(60, 190) for _ in range(3)))
+        desenho = ImageDraw.Draw(img)
+        for _ in range(12):
+            x, y = rng.randint(0, 560), rng.randint(0, 400)
+            desenho.ellipse([x, y, x + rng.randint(20, 160), y + rng.randint(20, 160)],
+                            fill=tuple(rng.randint(0, 255) for _ in range(3)), outline=(20, 20, 20), width=3)
+        buffer = BytesIO()
+        img.save(buffer, format='JPEG', quality=85)
+        imagens.append(buffer.getvalue())
+    return imagens
+
+
+def gerar_documentos(quantidade: int, digitos: int, semente: int = 42) -> list:
+    rng = random.Random(f"{semente}:{digitos}")
+    return [''.join(str(rng.randint(0, 9)) for _ in range(digitos)) for _ in range(quantidade)]
+
+
+class AlvoLocal:
+    """Executa as requisições na aplicação em processo, com um test client por thread."""
+
+    def __init__(self, app, api_key: str):
+        self.app = app
+        self.headers = {'X-API-KEY': api_key}
+        self._local = threading.local()
+
+    def _cliente(self):
+        if not hasattr(self._local, 'cliente'):
+            self._local.cliente = self.app.test_client()
+        return self._local.cliente
+
+    def post(self, caminho: str, json=None, form=None, arquivos=None):
+        if json is not None:
+            resposta = self._cliente().post(caminho, json=json, headers=self.headers)
+        else:
+            dados = dict(form or {})
+            for campo, conteudo in (arquivos or {}).items():
+                dados[campo] = (BytesIO(conteudo), f'{campo}.jpg')
+            resposta = self._cliente().post(caminho, data=dados, headers=self.headers, content_type='multipart/form-data')
+        return resposta.status_code, resposta.get_json(silent=True)
+
+
+class AlvoRemoto:
+    """Executa as requisições via HTTP em um servidor já em execução, com uma requests.Session por thread."""
+
+    def __init__(self, url_base: str, api_key: str, timeout: float = 60):
+        self.url_base = url_base.rstrip('/')
+        self.headers = {'X-API-KEY': api_key}
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def post(self, caminho: str, json=None, form=None, arquivos=None):
+        import requests
+        if not hasattr(self._local, 'sessao'):
+            self._local.sessao = requests.Session()
+        arquivos = {campo: (f'{campo}.jpg', conteudo, 'image/jpeg') for campo, conteudo in (arquivos or {}).items()}
+        resposta = self._local.sessao.post(self.url_base + caminho, json=json, data=form, files=arquivos or None,
+                                           headers=self.headers, timeout=self.timeout)
+        try:
+            corpo = resposta.json()
+        except ValueError:
+            corpo = None
+        return resposta.status_code, corpo
+
+
+class Carga:
+    """Monta as requisições de cada tipo a partir de um conjunto fixo de imagens, CPFs e CNPJs."""
+
+    def __init__(self, alvo, imagens: int = 20, semente: int = 42):
+        self.alvo = alvo
+        self.imagens = gerar_imagens(imagens, semente)
+        self.cpfs = gerar_documentos(50, 11, semente)
+        self.cnpjs = gerar_documentos(200, 14, semente)
+        self.cpfs_autenticacao = self.cpfs[:5]
+
+    def _imagem(self, i: int, deslocamento: int = 0) -> bytes:
+        return self.imagens[(i + deslocamento) % len(self.imagens)]
+
+    def preparar(self):
+        """Faz o onboarding PF dos CPFs usados na autenticação (que exige uma verificação anterior)."""
+        for i, cpf in enumerate(self.cpfs_autenticacao):
+            self.requisitar('pf', i, cpf=cpf)
+
+    def requisitar(self, tipo: str, i: int, cpf: str = None):
+        if tipo == 'pf':
+            form = {
+                'nome': 'CLIENTE TESTE DE CARGA',
+                'cpf': cpf or self.cpfs[i % len(self.cpfs)],
+                # Foto 3x4 do documento (normalmente extraída pelo OCR), usada nos dois face match.
+                'foto_documento_b64': base64.b64encode(self._imagem(i, 3)).decode('ascii'),
+            }
+            return self.alvo.post(ENDPOINTS['pf'], form=form,
+                                  arquivos={'documento_frente': self._imagem(i), 'selfie_documento': self._imagem(i, 1),
+                                            'selfie_liveness': self._imagem(i, 2)})
+        if tipo == 'pj':
+            return self.alvo.post(ENDPOINTS['pj'], json={'cnpj': self.cnpjs[i % len(self.cnpjs)]})
+        if tipo == 'auth':
+            return self.alvo.post(ENDPOINTS['auth'], form={'cpf': self.cpfs_autenticacao[i % len(self.cpfs_autenticacao)]},
+                                  arquivos={'selfie_atual': self._imagem(i, 2)})
+        raise ValueError(f"Tipo de requisição desconhecido: {tipo}")
+
+
+def _sequencia(mix: dict) -> list:
+    """Intercala os tipos de requisição conforme os pesos do mix (ex: {'pf': 1, 'pj': 2})."""
+    sequencia = []
+    restantes = {tipo: peso for tipo, peso in mix.items() if peso > 0}
+    while restantes:
+        for tipo in list(restantes):
+            sequencia.append(tipo)
+            restantes[tipo] -= 1
+            if not restantes[tipo]:
+                del restantes[tipo]
+    return sequencia
+
+
+def _achatar_timings(timings, prefixo: str = '') -> dict:
+    planos = {}
+    for nome, valor in (timings or {}).items():
+        if isinstance(valor, dict):
+            planos.update(_achatar_timings(valor, f"{prefixo}{nome}."))
+        elif isinstance(valor, (int, float)):
+            planos[prefixo + nome] = valor
+    return planos
+
+
+def executar(carga: Carga, mix: dict, rps: float, duracao: float, max_concorrencia: int = 64) -> dict:
+    """
+    Dispara requisições a `rps` por segundo durante `duracao` segundos (malha aberta) e retorna
+    {"amostras": [...], "duracao_s": tempo até a última resposta}. A latência é medida a partir do
+    instante agendado, para que a fila no cliente (quando o servidor não acompanha) também seja contada.
+    """
+    sequencia = _sequencia(mix)
+    amostras = []
+    lock = threading.Lock()
+
+    def _disparar(tipo, i, agendado):
+        inicio_servico = time.perf_counter()
+        try:
+            status, corpo = carga.requisitar(tipo, i)
+        except Exception as e:
+            status, corpo = 0, {'erro': str(e)}
+        fim = time.perf_counter()
+        amostra = {
+            'tipo': tipo,
+            'status': status,
+            'latencia_ms': (fim - agendado) * 1000,
+            'servico_ms': (fim - inicio_servico) * 1000,
+            'timings': _achatar_timings(corpo.get('timings') if isinstance(corpo, dict) else None),
+            'fim': fim,
+        }
+        with lock:
+            amostras.append(amostra)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_concorrencia) as pool:
+        for i in itertools.count():
+            agendado = inicio + i / rps
+            if agendado - inicio >= duracao:
+                break
+            espera = agendado - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+            pool.submit(_disparar, sequencia[i % len(sequencia)], i, agendado)
+
+    fim = max((a['fim'] for a in amostras), default=time.perf_counter())
+    return {'amostras': amostras, 'duracao_s': fim - inicio}
+
+
+def _percentis(valores) -> dict:
+    if not valores:
+        return {f'p{p}': None for p in PERCENTIS}
+    calculados = np.percentile(np.asarray(valores, dtype=float), PERCENTIS)
+    return {f'p{p}': round(float(v), 1) for p, v in zip(PERCENTIS, calculados)}
+
+
+def relatorio(resultado: dict) -> dict:
+    """Vazão, taxa de sucesso e p50/p95/p99 por tipo de requisição, com o detalhamento por etapa (timings)."""
+    duracao = resultado['duracao_s']
+    por_tipo = {}
+    for tipo in sorted({a['tipo'] for a in resultado['amostras']}):
+        amostras = [a for a in resultado['amostras'] if a['tipo'] == tipo]
+        etapas = {}
+        for a in amostras:
+            for etapa, valor in a['timings'].items():
+                etapas.setdefault(etapa, []).append(valor)
+        por_tipo[tipo] = {
+            'requisicoes': len(amostras),
+            'vazao_rps': round(len(amostras) / duracao, 2) if duracao else None,
+            'sucesso': round(sum(1 for a in amostras if 200 <= a['status'] < 300) / len(amostras), 4),
+            'status': {str(s): sum(1 for a in amostras if a['status'] == s) for s in sorted({a['status'] for a in amostras})},
+            'latencia_ms': dict(_percentis([a['latencia_ms'] for a in amostras]),
+                                maxima=round(max(a['latencia_ms'] for a in amostras), 1)),
+            'servico_ms': _percentis([a['servico_ms'] for a in amostras]),
+            'etapas_ms': {etapa: _percentis(valores) for etapa, valores in sorted(etapas.items())},
+        }
+    total = len(resultado['amostras'])
+    return {
+        'duracao_s': round(duracao, 2),
+        'requisicoes': total,
+        'vazao_rps': round(total / duracao, 2) if duracao else None,
+        'por_tipo': por_tipo,
+    }
+
+
+def formatar(dados: dict) -> str:
+    linhas = [f"Duração: {dados['duracao_s']}s | Requisições: {dados['requisicoes']} | Vazão: {dados['vazao_rps']} req/s"]
+    for tipo, r in dados['por_tipo'].items():
+        lat = r['latencia_ms']
+        linhas.append(
+            f"\n[{tipo}] {r['requisicoes']} req, {r['vazao_rps']} req/s, sucesso {r['sucesso']:.1%}, status {r['status']}"
+            f"\n  latência (ms): p50 {lat['p50']} | p95 {lat['p95']} | p99 {lat['p99']} | máx {lat['maxima']}"
+        )
+        for etapa, p in r['etapas_ms'].items():
+            linhas.append(f"    {etapa:<45} p50 {p['p50']:>8} | p95 {p['p95']:>8} | p99 {p['p99']:>8}")
+    return '\n'.join(linhas)
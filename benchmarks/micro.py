@@ -0,0 +1,239 @@
+# benchmarks/micro.py
+# Micro-benchmarks dos trechos de CPU executados em toda requisição (parsing do OCR, formatação
+# do CNPJ, score, serialização do resultado e montagem das linhas do dashboard), com registro
+# de baseline em JSON e detecção de regressões.
+#
+# A baseline versionada fica em benchmarks/baseline.json e registra o ambiente em que foi gerada
+# (versão do Python, plataforma). Para comparar: `flask benchmark-micro` (sai com código 1 se alguma
+# mediana passar de --tolerancia). Para atualizar, na raiz do projeto e na mesma máquina usada nas
+# comparações, com a árvore sem alterações pendentes:
+#     flask benchmark-micro --salvar-baseline --repeticoes 7
+# e faça commit do benchmarks/baseline.json junto com a mudança que justificou a nova referência
+# (ou sozinho, ao trocar de máquina/versão do Python). Ao adicionar um benchmark, ele aparece como
+# NOVO até a baseline ser atualizada. A chave "notas" da baseline ({benchmark: texto}) registra por que
+# um número mudou (ex: um custo maior aceito em troca de funcionalidade) e é mantida ao atualizá-la.
+
+import json
+import platform
+import statistics
+import timeit
+from datetime import datetime, timedelta
+
+BENCHMARKS = {}
+
+
+def benchmark(nome: str):
+    """Registra uma fábrica de benchmark: recebe o app e retorna a função (sem argumentos) a medir."""
+    def decorator(fabrica):
+        BENCHMARKS[nome] = fabrica
+        return fabrica
+    return decorator
+
+
+# --- FIXTURES ---
+
+TEXTOS_OCR = {
+    'rg': (
+        "REPÚBLICA FEDERATIVA DO BRASIL\nESTADO DE SÃO PAULO\nSECRETARIA DA SEGURANÇA PÚBLICA\n"
+        "INSTITUTO DE IDENTIFICAÇÃO RICARDO GUMBLETON DAUNT\nCARTEIRA DE IDENTIDADE\n"
+        "REGISTRO GERAL 12.345.678-9 DATA DE EXPEDIÇÃO 15/03/2015\nNOME / NAME\nMARIA APARECIDA DOS SANTOS\n"
+        "FILIAÇÃO\nJOSE DOS SANTOS\nANA MARIA DOS SANTOS\nNATURALIDADE SAO PAULO - SP\n"
+        "DATA DE NASCIMENTO 21/07/1985\nDOC ORIGEM CERT NASC LV A123 FLS 45 N 6789\n"
+        "CPF 123.456.789-09\nASSINATURA DO DIRETOR\nLEI Nº 7.116 DE 29/08/83\n"
+    ),
+    'cnh': (
+        "REPÚBLICA FEDERATIVA DO BRASIL\nMINISTÉRIO DA INFRAESTRUTURA\nDEPARTAMENTO NACIONAL DE TRÂNSITO\n"
+        "CARTEIRA NACIONAL DE HABILITAÇÃO\nNOME E SOBRENOME\nJOAO CARLOS PEREIRA LIMA\n"
+        "DOC. IDENTIDADE / ÓRG. EMISSOR / UF 12345678 SSP SP\nCPF 987.654.321-00 DATA NASCIMENTO 02/11/1979\n"
+        "FILIAÇÃO\nCARLOS PEREIRA LIMA\nMARIA JOSE PEREIRA\nPERMISSÃO ACC CAT. HAB. AB\n"
+        "Nº REGISTRO 01234567890 VALIDADE 10/05/2031 1ª HABILITAÇÃO 12/01/1999\n"
+        "OBSERVAÇÕES EAR\nLOCAL SAO PAULO, SP DATA EMISSÃO 10/05/2021\n"
+    ),
+    'rne': (
+        "REPÚBLICA FEDERATIVA DO BRASIL\nMINISTÉRIO DA JUSTIÇA E SEGURANÇA PÚBLICA\nPOLÍCIA FEDERAL\n"
+        "CARTEIRA DE REGISTRO NACIONAL MIGRATÓRIO\nRNM V123456-7\nNOME / NAME\nSMITH\n"
+        "PRENOME / GIVEN NAMES\nJOHN WILLIAM\nNACIONALIDADE / NATIONALITY ESTADOS UNIDOS\n"
+        "DATA DE NASCIMENTO / DATE OF BIRTH\n04/04/1980\nVALIDADE / VALID UNTIL 01/01/2030\n"
+        "CPF\n529.982.247-25\nCLASSIFICAÇÃO RESIDENTE\n"
+    ),
+    'ilegivel': "\n".join(["TEXTO RECONHECIDO SEM CAMPOS ÚTEIS"] * 40),
+}
+
+
+def payload_brasilapi(socios: int) -> dict:
+    """Payload no formato da BrasilAPI (cnpj/v1), com `socios` membros no QSA."""
+    return {
+        "cnpj": "12345678000195", "razao_social": "EMPRESA DE BENCHMARK PARTICIPACOES S.A.",
+        "nome_fantasia": "BENCHMARK", "descricao_situacao_cadastral": "ATIVA",
+        "data_inicio_atividade": "2001-08-14", "descricao_porte": "DEMAIS",
+        "natureza_juridica": "Sociedade Anônima Fechada", "capital_social": 125000000.5,
+        "cnae_fiscal_descricao": "Holdings de instituições não-financeiras",
+        "logradouro": "AVENIDA PAULISTA", "numero": "1000", "bairro": "BELA VISTA", "municipio": "SAO PAULO",
+        "uf": "SP", "cep": "01310100", "ddd_telefone_1": "11", "telefone1": "30000000",
+        "email": "contato@benchmark.com.br", "fonte_dos_dados": "BrasilAPI",
+        "data_consulta_utc": "2024-01-31T12:00:00+00:00",
+        "qsa": [
+            {"nome_socio": f"SOCIO NUMERO {i} DA SILVA", "qualificacao_socio": "Diretor" if i % 3 else "Conselheiro de Administração",
+             "cnpj_cpf_do_socio": "***123456**", "data_entrada_sociedade": "2010-01-01", "faixa_etaria": "Entre 41 a 50 anos"}
+            for i in range(socios)
+        ],
+    }
+
+
+def workflow_pf() -> dict:
+    """Workflow PF típico, como retornado por workflow_service.executar_etapas."""
+    return {
+        "receita_federal_pep": {"status": "APROVADO", "detalhes": {"situacao_cadastral": "REGULAR", "pep": False}, "duracao_ms": 0.1},
+        "liveness_passivo": {"status": "APROVADO", "detalhes": "Selfie de alta qualidade e sorriso detectado. Prova de vida aprovada.", "duracao_ms": 212.4},
+        "face_match_liveness": {"status": "APROVADO", "similaridade": 0.9731, "threshold": 0.9, "detalhes": "Score de similaridade: 97.31%", "duracao_ms": 301.2},
+        "face_match_selfie_com_documento": {"status": "APROVADO", "similaridade": 0.9514, "threshold": 0.9, "detalhes": "Score de similaridade: 95.14%", "duracao_ms": 287.9},
+        "background_check": {"status": "APROVADO", "detalhes": {"processos": "Nada consta.", "listas_restritivas": "Nada consta."}, "duracao_ms": 0.2},
+        "validacao_documento": {"status": "APROVADO", "detalhes": {"score_autenticidade": 0.97, "analise": "Sem indícios de adulteração."}, "duracao_ms": 0.1},
+    }
+
+
+def resposta_pf() -> dict:
+    return {
+        "status_geral": "APROVADO",
+        "workflow_executado": workflow_pf(),
+        "risk_score": {"score": 900, "rating": "BAIXO RISCO", "versao_regras": "2024.1",
+                       "reasons": ["+150: Altíssima similaridade no Face Match.", "+100: Prova de vida passiva aprovada (selfie genuína).",
+                                   "+50: Nenhuma pendência encontrada no Background Check.",
+                                   "+100: Documento validado com sucesso (sem indícios de fraude)."]},
+    }
+
+
+# --- BENCHMARKS ---
+
+def _ocr(tipo):
+    def fabrica(app):
+        from app.services import ocr_service
+        texto = TEXTOS_OCR[tipo]
+        return lambda: ocr_service.extrair_campos(texto)
+    return fabrica
+
+
+for _tipo in TEXTOS_OCR:
+    benchmark(f'ocr.extrair_campos.{_tipo}')(_ocr(_tipo))
+
+
+@benchmark('pj.formatar_resultado_cnpj.qsa_5')
+def _cnpj_qsa_pequeno(app):
+    from app.onboarding_pj.routes import formatar_resultado_cnpj
+    payload = payload_brasilapi(5)
+    return lambda: formatar_resultado_cnpj(payload)
+
+
+@benchmark('pj.formatar_resultado_cnpj.qsa_200')
+def _cnpj_qsa_grande(app):
+    from app.onboarding_pj.routes import formatar_resultado_cnpj
+    payload = payload_brasilapi(200)
+    return lambda: formatar_resultado_cnpj(payload)
+
+
+@benchmark('score.calculate_risk_score')
+def _score(app):
+    from app.services import score_service
+    workflow = workflow_pf()
+    score_service.get_motor()
+    return lambda: score_service.calculate_risk_score(workflow)
+
+
+@benchmark('modelo.set_resultado_completo')
+def _serializar(app):
+    from app.models import Verificacao
+    resposta = resposta_pf()
+    verificacao = Verificacao()
+    return lambda: verificacao.set_resultado_completo(resposta)
+
+
+@benchmark('modelo.get_resultado_completo')
+def _desserializar(app):
+    from app.models import Verificacao
+    verificacao = Verificacao()
+    verificacao.set_resultado_completo(resposta_pf())
+    return verificacao.get_resultado_completo
+
+
+@benchmark('dashboard.serializar_verificacao.pagina_50')
+def _dashboard(app):
+    from app.dashboard.routes import serializar_verificacao
+    from app.models import Verificacao
+    inicio = datetime(2024, 1, 31, 12, 0, 0)
+    linhas = []
+    for i in range(50):
+        v = Verificacao(id=i + 1, tipo_verificacao='PF', status_geral='APROVADO', timestamp=inicio - timedelta(minutes=i),
+                        doc_frente_url=f'https://res.cloudinary.com/demo/onboarding_docs/{i}.jpg',
+                        selfie_url=f'https://res.cloudinary.com/demo/onboarding_selfies_liveness/{i}.jpg',
+                        dados_extra_json={'selfie_documento_url': f'https://res.cloudinary.com/demo/selfie_doc/{i}.jpg'},
+                        risk_score=900)
+        v.set_resultado_completo(resposta_pf())
+        linhas.append(v)
+    return lambda: [serializar_verificacao(v) for v in linhas]
+
+
+# --- EXECUÇÃO ---
+
+def medir(funcao, repeticoes: int = 5, alvo_s: float = 0.2) -> dict:
+    """Mede `funcao` como o timeit: calibra o nº de loops para ~alvo_s por repetição e retorna µs por chamada."""
+    temporizador = timeit.Timer(funcao)
+    loops, _ = temporizador.autorange()
+    loops = max(1, int(loops * alvo_s / 0.2))
+    tempos = [t / loops * 1e6 for t in temporizador.repeat(repeat=repeticoes, number=loops)]
+    return {'mediana_us': round(statistics.median(tempos), 3), 'minimo_us': round(min(tempos), 3), 'loops': loops}
+
+
+def executar(app, filtro: str = None, repeticoes: int = 5) -> dict:
+    """Executa os benchmarks (opcionalmente só os que contêm `filtro` no nome) dentro do contexto do app."""
+    resultados = {}
+    with app.app_context():
+        for nome, fabrica in BENCHMARKS.items():
+            if filtro and filtro not in nome:
+                continue
+            resultados[nome] = medir(fabrica(app), repeticoes)
+    return {
+        'gerado_em': datetime.utcnow().isoformat(timespec='seconds'),
+        'ambiente': {'python': platform.python_version(), 'plataforma': platform.platform(), 'processador': platform.machine()},
+        'resultados': resultados,
+    }
+
+
+def comparar(atual: dict, baseline: dict, tolerancia: float) -> dict:
+    """
+    Compara as medianas com a baseline: acima de (1 + tolerancia) é REGRESSAO, abaixo de (1 - tolerancia)
+    é MELHORIA. Retorna {nome: {"atual_us", "baseline_us", "variacao", "situacao"}}.
+    """
+    comparacao = {}
+    for nome, resultado in atual['resultados'].items():
+        referencia = baseline.get('resultados', {}).get(nome)
+        if not referencia:
+            comparacao[nome] = {'atual_us': resultado['mediana_us'], 'baseline_us': None, 'variacao': None, 'situacao': 'NOVO'}
+            continue
+        variacao = resultado['mediana_us'] / referencia['mediana_us'] - 1
+        if variacao > tolerancia:
+            situacao = 'REGRESSAO'
+        elif variacao < -tolerancia:
+            situacao = 'MELHORIA'
+        else:
+            situacao = 'OK'
+        comparacao[nome] = {'atual_us': resultado['mediana_us'], 'baseline_us': referencia['mediana_us'],
+                            'variacao': round(variacao, 4), 'situacao': situacao}
+    return comparacao
+
+
+def carregar_baseline(caminho: str):
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def salvar_baseline(caminho: str, resultado: dict):
+    """Grava a baseline, mantendo as "notas" (justificativas por benchmark) da baseline anterior."""
+    anterior = carregar_baseline(caminho) or {}
+    if anterior.get('notas'):
+        resultado = dict(resultado, notas=anterior['notas'])
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+        f.write('\n')
@@ -11,6 +11,95 @@ load_dotenv(os.path.join(basedir, '..', '.env'))
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'uma-chave-secreta-muito-dificil-de-adivinhar'
     BRASILAPI_BASE_URL = "https://brasilapi.com.br/api/cnpj/v1/"
+    BRASILAPI_TIMEOUT = float(os.environ.get('BRASILAPI_TIMEOUT', 10))
+    BRASILAPI_POOL_SIZE = int(os.environ.get('BRASILAPI_POOL_SIZE', 20))
+    # Chamadas por segundo à BrasilAPI por processo (0 desativa) e rajada permitida.
+    BRASILAPI_RATE_LIMIT = float(os.environ.get('BRASILAPI_RATE_LIMIT', 3))
+    BRASILAPI_RATE_BURST = int(os.environ.get('BRASILAPI_RATE_BURST', 3))
+    # Novas tentativas após um 429, respeitando o Retry-After (limitado a BRASILAPI_RETRY_AFTER_MAX segundos).
+    BRASILAPI_TENTATIVAS_429 = int(os.environ.get('BRASILAPI_TENTATIVAS_429', 3))
+    BRASILAPI_RETRY_AFTER_MAX = float(os.environ.get('BRASILAPI_RETRY_AFTER_MAX', 30))
+    CNPJ_CACHE_TTL = int(os.environ.get('CNPJ_CACHE_TTL', 86400))
+    CNPJ_CACHE_TTL_NEGATIVO = int(os.environ.get('CNPJ_CACHE_TTL_NEGATIVO', 3600))
+
+    # --- VERIFICAÇÃO DE CNPJS EM LOTE ---
+    PJ_LOTE_MAX_ITENS = int(os.environ.get('PJ_LOTE_MAX_ITENS', 5000))
+    PJ_LOTE_MAX_CONCORRENCIA = int(os.environ.get('PJ_LOTE_MAX_CONCORRENCIA', 8))
+    # Verificações acumuladas antes de cada gravação em lote (bulk insert) no banco.
+    PJ_LOTE_TAMANHO_GRAVACAO = int(os.environ.get('PJ_LOTE_TAMANHO_GRAVACAO', 200))
+
+    # --- NORMALIZAÇÃO DE IMAGENS (antes do Vision/Rekognition e do armazenamento) ---
+    IMAGEM_NORMALIZAR = os.environ.get('IMAGEM_NORMALIZAR', 'true').lower() == 'true'
+    IMAGEM_MAX_LADO = int(os.environ.get('IMAGEM_MAX_LADO', 1600))
+    IMAGEM_QUALIDADE_JPEG = int(os.environ.get('IMAGEM_QUALIDADE_JPEG', 90))
+    # Prazo (s) para normalizar as mídias de uma requisição; o que não terminar segue sem normalização.
+    IMAGEM_NORMALIZAR_TIMEOUT = float(os.environ.get('IMAGEM_NORMALIZAR_TIMEOUT', 10))
+
+    # --- OCR DE DOCUMENTOS ---
+    # Campos extraídos com confiança abaixo deste valor contam como não lidos. Desligado (0) por padrão;
+    # com 0.5, por exemplo, um CPF com dígito verificador inválido ou uma data impossível reprovam o OCR.
+    OCR_CONFIANCA_MINIMA = float(os.environ.get('OCR_CONFIANCA_MINIMA', 0))
+    # Guarda no banco (TextoOcr) o texto reconhecido em /extrair-ocr, para refazer a extração com flask reextrair-ocr.
+    OCR_ARMAZENAR_TEXTO = os.environ.get('OCR_ARMAZENAR_TEXTO', 'true').lower() == 'true'
+
+    # --- PROVA DE VIDA PASSIVA ---
+    # 'vision': só Google Vision; 'local_vision': pré-filtro local (NumPy) antes do Vision; 'local': só o pré-filtro,
+    # que avalia a qualidade da imagem e se há uma região com cor de pele no centro, mas não detecta nem conta
+    # rostos, então nunca aprova a prova de vida (a selfie que passa fica em PENDENCIA).
+    LIVENESS_MODO = os.environ.get('LIVENESS_MODO', 'vision')
+    LIVENESS_LOCAL_MIN_LADO = int(os.environ.get('LIVENESS_LOCAL_MIN_LADO', 200))
+    LIVENESS_LOCAL_CONTRASTE_MIN = float(os.environ.get('LIVENESS_LOCAL_CONTRASTE_MIN', 8))
+    LIVENESS_LOCAL_BRILHO_MIN = float(os.environ.get('LIVENESS_LOCAL_BRILHO_MIN', 40))
+    LIVENESS_LOCAL_BRILHO_MAX = float(os.environ.get('LIVENESS_LOCAL_BRILHO_MAX', 225))
+    LIVENESS_LOCAL_NITIDEZ_MIN = float(os.environ.get('LIVENESS_LOCAL_NITIDEZ_MIN', 15))
+    # Fração mínima de pixels com cor de pele na região central da selfie (0 desativa essa verificação).
+    LIVENESS_LOCAL_PELE_MIN = float(os.environ.get('LIVENESS_LOCAL_PELE_MIN', 0.1))
+
+    # --- BGC DOS SÓCIOS (QSA) ---
+    BGC_SOCIOS_MAX_CONCORRENCIA = int(os.environ.get('BGC_SOCIOS_MAX_CONCORRENCIA', 8))
+    BGC_SOCIOS_PRAZO = float(os.environ.get('BGC_SOCIOS_PRAZO', 15))
+    BGC_SOCIOS_CACHE_TTL = int(os.environ.get('BGC_SOCIOS_CACHE_TTL', 300))
+
+    # --- EXECUÇÃO PARALELA DAS ETAPAS DOS WORKFLOWS ---
+    WORKFLOW_MAX_WORKERS = int(os.environ.get('WORKFLOW_MAX_WORKERS', 16))
+    # Prazo de cada etapa, contado a partir do início da sua execução.
+    WORKFLOW_STAGE_TIMEOUT = float(os.environ.get('WORKFLOW_STAGE_TIMEOUT', 20))
+    # Espera máxima (s) das etapas de uma requisição na fila do pool antes de serem canceladas.
+    WORKFLOW_QUEUE_TIMEOUT = float(os.environ.get('WORKFLOW_QUEUE_TIMEOUT', 30))
+
+    # --- REGRAS DE SCORE (recarregadas automaticamente quando o arquivo muda) ---
+    SCORE_RULES_PATH = os.environ.get('SCORE_RULES_PATH')
+    SCORE_RULES_CHECK_INTERVAL = float(os.environ.get('SCORE_RULES_CHECK_INTERVAL', 5))
+
+    # --- JOBS ASSÍNCRONOS DE VERIFICAÇÃO ---
+    JOBS_BACKEND = os.environ.get('JOBS_BACKEND', 'local')
+    JOBS_MAX_WORKERS = int(os.environ.get('JOBS_MAX_WORKERS', 4))
+    JOBS_CALLBACK_TIMEOUT = float(os.environ.get('JOBS_CALLBACK_TIMEOUT', 10))
+    # Hosts aceitos no callback_url, separados por vírgula (ex: "hooks.cliente.com.br"). Vazio aceita qualquer
+    # host https que resolva só para endereços públicos.
+    JOBS_CALLBACK_HOSTS = frozenset(h.strip().lower() for h in os.environ.get('JOBS_CALLBACK_HOSTS', '').split(',') if h.strip())
+
+    # --- ARMAZENAMENTO DAS IMAGENS ('cloudinary' ou 'local') ---
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'cloudinary')
+    STORAGE_LOCAL_DIR = os.environ.get('STORAGE_LOCAL_DIR') or os.path.join(basedir, 'uploads')
+    STORAGE_LOCAL_URL_BASE = os.environ.get('STORAGE_LOCAL_URL_BASE')
+    STORAGE_UPLOAD_TIMEOUT = float(os.environ.get('STORAGE_UPLOAD_TIMEOUT', 30))
+    # Threads do pool de uploads, separado do pool das etapas (WORKFLOW_MAX_WORKERS).
+    STORAGE_UPLOAD_MAX_WORKERS = int(os.environ.get('STORAGE_UPLOAD_MAX_WORKERS', 8))
+
+    # --- PROVEDORES SIMULADOS (testes de carga / desenvolvimento offline) ---
+    # Substitui Vision, Rekognition, Cloudinary e BrasilAPI pelos mocks de app/services/provedores_mock.py.
+    PROVEDORES_MOCK = os.environ.get('PROVEDORES_MOCK', 'false').lower() == 'true'
+    # JSON com ajustes por provedor, ex: {"vision": {"mediana_ms": 200, "p95_ms": 800, "taxa_erro": 0.02}}
+    MOCK_PERFIS = os.environ.get('MOCK_PERFIS', '')
+    MOCK_SEMENTE = int(os.environ.get('MOCK_SEMENTE', 42))
+
+    # --- CACHE DE RESULTADOS BIOMÉTRICOS/OCR ('memory' ou 'redis') ---
+    CACHE_ENABLED = os.environ.get('CACHE_ENABLED', 'true').lower() == 'true'
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+    CACHE_TTL = int(os.environ.get('CACHE_TTL', 3600))
+    CACHE_MAX_ITENS = int(os.environ.get('CACHE_MAX_ITENS', 1024))
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
     
     # --- LÓGICA DO BANCO DE DADOS CENTRALIZADA E CORRIGIDA ---
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -23,4 +112,18 @@ class Config:
         DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
     
     # Define a configuração final, com um fallback para SQLite se a DATABASE_URL não estiver definida
-    SQLALCHEMY_DATABASE_URI = DATABASE_URL or 'sqlite:///' + os.path.join(basedir, 'antifraude.db')
\ No newline at end of file
+    SQLALCHEMY_DATABASE_URI = DATABASE_URL or 'sqlite:///' + os.path.join(basedir, 'antifraude.db')
+
+    # --- POOL DE CONEXÕES DO BANCO ---
+    # 'queue': pool por processo (gunicorn/servidor tradicional).
+    # 'null': sem pool, uma conexão por uso (serverless ou atrás de um pooler externo, ex: PgBouncer).
+    DB_POOL_MODE = os.environ.get('DB_POOL_MODE') or ('null' if os.environ.get('VERCEL') else 'queue')
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+    # Recicla conexões mais antigas que isso (s), antes que o servidor ou um proxy as encerre.
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    # SQLite (uso local): journal em WAL permite leituras concorrentes com uma escrita.
+    SQLITE_WAL = os.environ.get('SQLITE_WAL', 'true').lower() == 'true'
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
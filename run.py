@@ -1,6 +1,11 @@
 # run.py
 from app import create_app, db
-from app.models import Verificacao
+from app.models import ResultadoEtapa, TextoOcr, Verificacao, chave_documento, codificar_resultado, decodificar_resultado
+from app.services import consulta_service, export_service, imagem_service, lote_service, score_service, stats_service
+import json
+import statistics
+import sys
+import time
 import click
 
 app = create_app()
@@ -24,5 +29,483 @@ def clear_db_command():
         db.create_all()
     click.echo("Base de dados limpa e recriada com sucesso.")
 
+def _sincronizar_schema():
+    """
+    Cria as tabelas novas e adiciona às existentes as colunas e índices declarados nos modelos
+    que ainda não existem no banco. Não altera nem remove colunas existentes.
+    """
+    db.create_all()
+    inspector = db.inspect(db.engine)
+    for tabela in db.metadata.sorted_tables:
+        colunas = {c['name'] for c in inspector.get_columns(tabela.name)}
+        for coluna in tabela.columns:
+            if coluna.name not in colunas:
+                tipo = coluna.type.compile(dialect=db.engine.dialect)
+                with db.engine.begin() as conn:
+                    conn.execute(db.text(f"ALTER TABLE {tabela.name} ADD COLUMN {coluna.name} {tipo}"))
+                click.echo(f"Coluna {tabela.name}.{coluna.name} criada.")
+        indices = {i['name'] for i in db.inspect(db.engine).get_indexes(tabela.name)}
+        for indice in tabela.indexes:
+            if indice.name not in indices:
+                indice.create(db.engine)
+                click.echo(f"Índice {indice.name} criado.")
+
+@app.cli.command("migrate-schema")
+def migrate_schema_command():
+    """Adiciona as tabelas, colunas e índices novos dos modelos a uma base existente."""
+    with app.app_context():
+        _sincronizar_schema()
+    click.echo("Schema sincronizado com sucesso.")
+
+@app.cli.command("migrate-documento-chave")
+@click.option('--batch-size', default=1000, show_default=True, help="Registros atualizados por commit.")
+def migrate_documento_chave_command(batch_size):
+    """Sincroniza o schema (coluna/índices de documento_chave) e preenche os registros antigos."""
+    with app.app_context():
+        _sincronizar_schema()
+
+        total = 0
+        ultimo_id = 0
+        while True:
+            lote = (Verificacao.query
+                    .filter(Verificacao.id > ultimo_id, Verificacao.documento_chave.is_(None))
+                    .order_by(Verificacao.id)
+                    .limit(batch_size)
+                    .all())
+            if not lote:
+                break
+            for v in lote:
+                try:
+                    dados = json.loads(v.dados_entrada_json) if v.dados_entrada_json else {}
+                except ValueError:
+                    dados = {}
+                v.documento_chave = chave_documento(dados.get('cpf') or dados.get('cnpj'))
+            ultimo_id = lote[-1].id
+            db.session.commit()
+            total += len(lote)
+            click.echo(f"{total} registros processados...")
+    click.echo(f"Backfill de documento_chave concluído ({total} registros).")
+
+@app.cli.command("export-verifications")
+@click.option('--formato', type=click.Choice(export_service.FORMATOS), default='ndjson', show_default=True)
+@click.option('--saida', type=click.Path(dir_okay=False, writable=True), default=None, help="Arquivo de saída (padrão: stdout).")
+@click.option('--tipo', default=None, help="Filtra por tipo de verificação (PF/PJ).")
+@click.option('--status', default=None, help="Filtra por status geral.")
+@click.option('--score-min', type=int, default=None)
+@click.option('--score-max', type=int, default=None)
+@click.option('--data-inicio', default=None, help="Data/hora inicial (ISO 8601).")
+@click.option('--data-fim', default=None, help="Data/hora final (ISO 8601).")
+@click.option('--batch-size', default=1000, show_default=True, help="Registros lidos do banco por vez.")
+def export_verifications_command(formato, saida, batch_size, **opcoes):
+    """Exporta as verificações em NDJSON ou CSV, em streaming."""
+    with app.app_context():
+        try:
+            filtros = consulta_service.ler_filtros(opcoes)
+        except consulta_service.FiltroInvalido as e:
+            raise click.BadParameter(str(e))
+        destino = open(saida, 'w', encoding='utf-8', newline='') if saida else sys.stdout
+        try:
+            for bloco in export_service.gerar_export(formato, filtros, lote=batch_size):
+                destino.write(bloco)
+        finally:
+            if saida:
+                destino.close()
+    if saida:
+        click.echo(f"Exportação concluída em {saida}.", err=True)
+
+@app.cli.command("rescore")
+@click.option('--batch-size', default=5000, show_default=True, help="Verificações pontuadas e atualizadas por lote.")
+@click.option('--somente-desatualizadas', is_flag=True, help="Apenas verificações pontuadas com outra versão das regras.")
+@click.option('--dry-run', is_flag=True, help="Apenas calcula e reporta, sem gravar.")
+def rescore_command(batch_size, somente_desatualizadas, dry_run):
+    """
+    Recalcula o risk_score das verificações PF com as regras atuais, em lotes vetorizados.
+    Atualiza a coluna risk_score, o risk_score (score, rating, reasons) guardado no resultado completo
+    e as faixas de score dos rollups horários do dashboard.
+    """
+    with app.app_context():
+        motor = score_service.get_motor()
+        click.echo(f"Regras de score: versão {motor.versao}.")
+        total = alterados = 0
+        ultimo_id = 0
+        while True:
+            query = (db.session.query(Verificacao.id, Verificacao.risk_score, Verificacao.risk_score_versao,
+                                      Verificacao.resultado_completo_bin, Verificacao.resultado_completo_json,
+                                      Verificacao.timestamp, Verificacao.tipo_verificacao, Verificacao.status_geral)
+                     .filter(Verificacao.tipo_verificacao == 'PF', Verificacao.id > ultimo_id))
+            if somente_desatualizadas:
+                query = query.filter(db.or_(Verificacao.risk_score_versao.is_(None),
+                                            Verificacao.risk_score_versao != motor.versao))
+            lote = query.order_by(Verificacao.id).limit(batch_size).all()
+            if not lote:
+                break
+            ultimo_id = lote[-1].id
+
+            resultados, workflows = [], []
+            for v in lote:
+                try:
+                    resultado = decodificar_resultado(v.resultado_completo_bin, v.resultado_completo_json)
+                    workflows.append(resultado.get('workflow_executado', {}))
+                except (AttributeError, ValueError):
+                    resultado = None
+                    workflows.append({})
+                resultados.append(resultado)
+            scores, ratings, aplicadas = motor.avaliar(*motor.extrair_features(workflows))
+
+            # O risk_score dentro do resultado completo (lido pela API, export, dashboard e /jobs) é
+            # reescrito junto com a coluna, para que os dois nunca divirjam.
+            atualizacoes, alteracoes_score = [], []
+            for coluna, (v, resultado) in enumerate(zip(lote, resultados)):
+                score = int(scores[coluna])
+                tem_resultado = isinstance(resultado, dict) and bool(resultado)
+                anterior = resultado.get('risk_score') if tem_resultado else None
+                resultado_em_dia = (not tem_resultado or isinstance(anterior, dict) and anterior.get('score') == score
+                                    and anterior.get('versao_regras') == motor.versao)
+                if v.risk_score == score and v.risk_score_versao == motor.versao and resultado_em_dia:
+                    continue
+                atualizacao = {'id': v.id, 'risk_score': score, 'risk_score_versao': motor.versao}
+                if v.risk_score != score:
+                    alteracoes_score.append((v.timestamp, v.tipo_verificacao, v.status_geral, v.risk_score, score))
+                if tem_resultado:
+                    resultado['risk_score'] = motor.resultado(scores, ratings, aplicadas, coluna)
+                    atualizacao['resultado_completo_bin'] = codificar_resultado(resultado)
+                    atualizacao['resultado_completo_json'] = None
+                atualizacoes.append(atualizacao)
+            if atualizacoes and not dry_run:
+                db.session.bulk_update_mappings(Verificacao, atualizacoes)
+                # Histograma de score dos rollups ajustado na mesma transação dos novos scores.
+                stats_service.reclassificar(alteracoes_score)
+                db.session.commit()
+            total += len(lote)
+            alterados += len(atualizacoes)
+            click.echo(f"{total} verificações pontuadas, {alterados} atualizadas...")
+    sufixo = " (dry-run, nada foi gravado)" if dry_run else ""
+    click.echo(f"Rescore concluído: {total} verificações, {alterados} atualizadas{sufixo}.")
+
+@app.cli.command("migrate-resultado-compacto")
+@click.option('--batch-size', default=500, show_default=True, help="Registros convertidos por commit.")
+@click.option('--pausa', default=0.0, show_default=True, help="Segundos de pausa entre lotes, para reduzir a carga no banco.")
+def migrate_resultado_compacto_command(batch_size, pausa):
+    """Converte os resultados completos antigos (JSON em texto) para o formato compacto."""
+    with app.app_context():
+        _sincronizar_schema()
+        total = bytes_antes = bytes_depois = 0
+        ultimo_id = 0
+        while True:
+            lote = (db.session.query(Verificacao.id, Verificacao.resultado_completo_json)
+                    .filter(Verificacao.id > ultimo_id,
+                            Verificacao.resultado_completo_bin.is_(None),
+                            Verificacao.resultado_completo_json.isnot(None))
+                    .order_by(Verificacao.id)
+                    .limit(batch_size)
+                    .all())
+            if not lote:
+                break
+            ultimo_id = lote[-1].id
+
+            atualizacoes = []
+            for v in lote:
+                try:
+                    resultado = json.loads(v.resultado_completo_json)
+                except ValueError:
+                    continue  # Resultado legado que não é JSON: permanece em texto.
+                if not isinstance(resultado, dict):
+                    continue
+                compacto = codificar_resultado(resultado)
+                bytes_antes += len(v.resultado_completo_json.encode('utf-8'))
+                bytes_depois += len(compacto)
+                atualizacoes.append({'id': v.id, 'resultado_completo_bin': compacto, 'resultado_completo_json': None})
+            if atualizacoes:
+                db.session.bulk_update_mappings(Verificacao, atualizacoes)
+                db.session.commit()
+            total += len(atualizacoes)
+            click.echo(f"{total} registros convertidos...")
+            if pausa:
+                time.sleep(pausa)
+    economia = f" ({bytes_antes} -> {bytes_depois} bytes)" if bytes_antes else ""
+    click.echo(f"Migração para o formato compacto concluída: {total} registros{economia}.")
+
+@app.cli.command("benchmark-armazenamento")
+@click.option('--amostra', default=1000, show_default=True, help="Número de verificações usadas na medição.")
+def benchmark_armazenamento_command(amostra):
+    """Compara bytes por registro e tempo de decodificação: JSON indentado (antigo) x formato compacto."""
+    with app.app_context():
+        linhas = (Verificacao.query.order_by(Verificacao.id.desc()).limit(amostra).all())
+        resultados = [v.get_resultado_completo() for v in linhas]
+    resultados = [r for r in resultados if isinstance(r, dict) and r]
+    if not resultados:
+        click.echo("Nenhuma verificação com resultado completo encontrada para a amostra.")
+        return
+
+    antigos = [json.dumps(r, indent=2) for r in resultados]
+    compactos = [codificar_resultado(r) for r in resultados]
+
+    def _medir(decodificar, dados):
+        inicio = time.perf_counter()
+        for d in dados:
+            decodificar(d)
+        return (time.perf_counter() - inicio) / len(dados) * 1e6
+
+    bytes_antigo = statistics.mean(len(a.encode('utf-8')) for a in antigos)
+    bytes_compacto = statistics.mean(len(c) for c in compactos)
+    tempo_antigo = _medir(json.loads, antigos)
+    tempo_compacto = _medir(decodificar_resultado, compactos)
+    click.echo(f"Amostra: {len(resultados)} verificações")
+    click.echo(f"JSON indentado (texto): {bytes_antigo:,.0f} bytes/registro, decodificação {tempo_antigo:,.1f} µs/registro")
+    click.echo(f"Compacto (zlib):        {bytes_compacto:,.0f} bytes/registro, decodificação {tempo_compacto:,.1f} µs/registro")
+    click.echo(f"Redução de tamanho: {100 * (1 - bytes_compacto / bytes_antigo):.1f}%")
+
+@app.cli.command("benchmark-imagens")
+@click.argument('arquivos', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--repeticoes', default=3, show_default=True, help="Execuções por imagem (usa-se a mediana).")
+@click.option('--banda-mbps', default=10.0, show_default=True, help="Banda de upload usada para estimar o tempo de envio.")
+@click.option('--provedor', type=click.Choice(['nenhum', 'liveness', 'face_match', 'ocr']), default='nenhum', show_default=True,
+              help="Chama o provedor real com a imagem original e a normalizada (requer credenciais).")
+def benchmark_imagens_command(arquivos, repeticoes, banda_mbps, provedor):
+    """Compara bytes enviados e latência com as imagens originais e normalizadas (imagem_service.normalizar)."""
+    from app.services import biometrics_service
+    from app.onboarding_pf.routes import analisar_documento_com_google_vision
+    chamadas = {
+        'liveness': biometrics_service.check_liveness_passivo,
+        'face_match': lambda conteudo: biometrics_service.check_facematch_real(conteudo, conteudo),
+        'ocr': analisar_documento_com_google_vision,
+    }
+
+    def _mediana_ms(funcao):
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            retorno = funcao()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tempos), retorno
+
+    with app.app_context():
+        # Sem cache, para que cada repetição chame o provedor.
+        app.config['CACHE_ENABLED'] = False
+        linhas = []
+        for caminho in arquivos:
+            with open(caminho, 'rb') as f:
+                original = f.read()
+            normalizacao_ms, normalizada = _mediana_ms(lambda: imagem_service.normalizar(original))
+            linha = {'arquivo': caminho, 'bytes_original': len(original), 'bytes_normalizada': len(normalizada),
+                     'normalizacao_ms': normalizacao_ms}
+            if provedor != 'nenhum':
+                linha['provedor_original_ms'], retorno_original = _mediana_ms(lambda: chamadas[provedor](original))
+                linha['provedor_normalizada_ms'], retorno_normalizada = _mediana_ms(lambda: chamadas[provedor](normalizada))
+                linha['status'] = f"{retorno_original.get('status')} -> {retorno_normalizada.get('status')}"
+            linhas.append(linha)
+
+    def _envio_ms(tamanho):
+        return tamanho * 8 / (banda_mbps * 1_000_000) * 1000
+
+    for linha in linhas:
+        texto = (f"{linha['arquivo']}: {linha['bytes_original']:,} -> {linha['bytes_normalizada']:,} bytes, "
+                 f"normalização {linha['normalizacao_ms']:.1f} ms, envio estimado "
+                 f"{_envio_ms(linha['bytes_original']):.0f} -> {_envio_ms(linha['bytes_normalizada']):.0f} ms")
+        if 'status' in linha:
+            texto += (f", {provedor} {linha['provedor_original_ms']:.0f} -> {linha['provedor_normalizada_ms']:.0f} ms"
+                      f" ({linha['status']})")
+        click.echo(texto)
+
+    total_original = sum(l['bytes_original'] for l in linhas)
+    total_normalizada = sum(l['bytes_normalizada'] for l in linhas)
+    click.echo(f"Total: {total_original:,} -> {total_normalizada:,} bytes "
+               f"({100 * (1 - total_normalizada / total_original):.1f}% menos), "
+               f"normalização média {statistics.mean(l['normalizacao_ms'] for l in linhas):.1f} ms/imagem, "
+               f"envio estimado a {banda_mbps:g} Mbps {_envio_ms(total_original):.0f} -> {_envio_ms(total_normalizada):.0f} ms")
+
+@app.cli.command("load-test")
+@click.option('--rps', default=10.0, show_default=True, help="Requisições por segundo (malha aberta).")
+@click.option('--duracao', default=30.0, show_default=True, help="Duração do disparo, em segundos.")
+@click.option('--mix', default='pf=1,pj=1,auth=1', show_default=True, help="Pesos por tipo de requisição (pf, pj, auth).")
+@click.option('--url', default=None, help="URL base de um servidor em execução; sem ela, a carga roda na aplicação em processo.")
+@click.option('--mock/--sem-mock', default=True, show_default=True, help="Em processo, usa os provedores simulados (PROVEDORES_MOCK).")
+@click.option('--concorrencia', default=64, show_default=True, help="Máximo de requisições simultâneas no cliente.")
+@click.option('--imagens', default=20, show_default=True, help="Quantidade de imagens distintas geradas para as requisições.")
+@click.option('--json', 'como_json', is_flag=True, help="Imprime o relatório em JSON.")
+def load_test_command(rps, duracao, mix, url, mock, concorrencia, imagens, como_json):
+    """Teste de carga de /onboarding/pf/verificar, /onboarding/pj/verificar e /autenticacao/autenticar."""
+    import os
+    from benchmarks import carga
+    try:
+        pesos = {tipo.strip(): int(peso) for tipo, peso in (item.split('=') for item in mix.split(','))}
+    except ValueError:
+        raise click.BadParameter("Use o formato tipo=peso, ex: pf=1,pj=2,auth=1.", param_hint='--mix')
+    desconhecidos = set(pesos) - set(carga.ENDPOINTS)
+    if desconhecidos:
+        raise click.BadParameter(f"Tipos desconhecidos: {', '.join(sorted(desconhecidos))}.", param_hint='--mix')
+
+    if url:
+        alvo = carga.AlvoRemoto(url, os.environ.get('PLATFORM_API_KEY', ''))
+    else:
+        os.environ.setdefault('PLATFORM_API_KEY', 'teste-de-carga')
+        if mock:
+            app.config['PROVEDORES_MOCK'] = True
+        with app.app_context():
+            db.create_all()
+        alvo = carga.AlvoLocal(app, os.environ['PLATFORM_API_KEY'])
+
+    teste = carga.Carga(alvo, imagens=imagens)
+    if pesos.get('auth'):
+        click.echo("Preparando os onboardings usados na autenticação...", err=True)
+        teste.preparar()
+    click.echo(f"Disparando {rps:g} req/s por {duracao:g}s ({mix})...", err=True)
+    dados = carga.relatorio(carga.executar(teste, pesos, rps, duracao, concorrencia))
+    click.echo(json.dumps(dados, indent=2, ensure_ascii=False) if como_json else carga.formatar(dados))
+
+@app.cli.command("benchmark-micro")
+@click.option('--baseline', 'caminho_baseline', default='benchmarks/baseline.json', show_default=True,
+              help="Arquivo JSON com a baseline usada na comparação.")
+@click.option('--salvar-baseline', is_flag=True, help="Grava o resultado desta execução como nova baseline.")
+@click.option('--tolerancia', default=0.2, show_default=True, help="Variação relativa da mediana tolerada antes de acusar regressão.")
+@click.option('--filtro', default=None, help="Executa só os benchmarks cujo nome contém este texto.")
+@click.option('--repeticoes', default=5, show_default=True, help="Repetições por benchmark (a mediana é comparada).")
+@click.option('--json', 'como_json', is_flag=True, help="Imprime o resultado e a comparação em JSON.")
+def benchmark_micro_command(caminho_baseline, salvar_baseline, tolerancia, filtro, repeticoes, como_json):
+    """
+    Micro-benchmarks de OCR, CNPJ, score, serialização e dashboard; sai com código 1 se houver regressão.
+
+    A baseline versionada é benchmarks/baseline.json; para atualizá-la, rode com --salvar-baseline na
+    mesma máquina das comparações e faça commit do arquivo (ver benchmarks/micro.py).
+    """
+    from benchmarks import micro
+    atual = micro.executar(app, filtro=filtro, repeticoes=repeticoes)
+    if not atual['resultados']:
+        raise click.BadParameter(f"Nenhum benchmark contém '{filtro}'.", param_hint='--filtro')
+
+    baseline = None if salvar_baseline else micro.carregar_baseline(caminho_baseline)
+    comparacao = micro.comparar(atual, baseline, tolerancia) if baseline else {}
+
+    if como_json:
+        click.echo(json.dumps({'atual': atual, 'comparacao': comparacao}, indent=2, ensure_ascii=False))
+    else:
+        for nome, r in atual['resultados'].items():
+            linha = f"{nome:<45} mediana {r['mediana_us']:>10.2f} µs | mín {r['minimo_us']:>10.2f} µs"
+            if nome in comparacao and comparacao[nome]['baseline_us'] is not None:
+                c = comparacao[nome]
+                linha += f" | baseline {c['baseline_us']:>10.2f} µs ({c['variacao']:+.1%}) {c['situacao']}"
+            click.echo(linha)
+
+    if salvar_baseline:
+        micro.salvar_baseline(caminho_baseline, atual)
+        click.echo(f"Baseline gravada em {caminho_baseline}.", err=True)
+    elif baseline is None:
+        click.echo(f"Sem baseline em {caminho_baseline}; use --salvar-baseline para criar uma.", err=True)
+
+    regressoes = [nome for nome, c in comparacao.items() if c['situacao'] == 'REGRESSAO']
+    if regressoes:
+        click.echo(f"Regressões acima de {tolerancia:.0%}: {', '.join(regressoes)}", err=True)
+        sys.exit(1)
+
+@app.cli.command("backfill-etapas")
+@click.option('--batch-size', default=1000, show_default=True, help="Verificações processadas por commit.")
+def backfill_etapas_command(batch_size):
+    """Preenche a tabela resultado_etapa a partir dos resultados completos das verificações antigas."""
+    with app.app_context():
+        _sincronizar_schema()
+        total = etapas = 0
+        ultimo_id = 0
+        while True:
+            lote = (db.session.query(Verificacao.id, Verificacao.timestamp,
+                                     Verificacao.resultado_completo_bin, Verificacao.resultado_completo_json)
+                    .filter(Verificacao.id > ultimo_id,
+                            ~db.exists().where(ResultadoEtapa.verificacao_id == Verificacao.id))
+                    .order_by(Verificacao.id)
+                    .limit(batch_size)
+                    .all())
+            if not lote:
+                break
+            ultimo_id = lote[-1].id
+
+            mapeamentos = []
+            for v in lote:
+                try:
+                    resultado = decodificar_resultado(v.resultado_completo_bin, v.resultado_completo_json)
+                    workflow = resultado.get('workflow_executado', {})
+                except (AttributeError, ValueError):
+                    continue
+                for nome_etapa, resultado_etapa in workflow.items():
+                    if isinstance(resultado_etapa, dict):
+                        etapa = ResultadoEtapa.de_resultado(nome_etapa, resultado_etapa, v.timestamp)
+                        mapeamentos.append({
+                            'verificacao_id': v.id, 'etapa': etapa.etapa, 'status': etapa.status,
+                            'similaridade': etapa.similaridade, 'score': etapa.score,
+                            'latencia_ms': etapa.latencia_ms, 'timestamp': etapa.timestamp
+                        })
+            if mapeamentos:
+                db.session.bulk_insert_mappings(ResultadoEtapa, mapeamentos)
+                db.session.commit()
+            total += len(lote)
+            etapas += len(mapeamentos)
+            click.echo(f"{total} verificações processadas, {etapas} etapas gravadas...")
+    click.echo(f"Backfill de resultado_etapa concluído: {etapas} etapas de {total} verificações.")
+
+@app.cli.command("rebuild-stats")
+def rebuild_stats_command():
+    """Recalcula os rollups do dashboard (agregado_verificacao) a partir de todas as verificações."""
+    with app.app_context():
+        _sincronizar_schema()
+        total = stats_service.reconstruir()
+    click.echo(f"Rollups do dashboard reconstruídos a partir de {total} verificações.")
+
+@app.cli.command("verify-cnpjs")
+@click.argument('arquivo', type=click.File('r', encoding='utf-8'))
+@click.option('--saida', type=click.File('w', encoding='utf-8'), default='-', help="Arquivo NDJSON de saída (padrão: stdout).")
+@click.option('--concorrencia', type=int, default=None, help="Verificações simultâneas (padrão: PJ_LOTE_MAX_CONCORRENCIA).")
+def verify_cnpjs_command(arquivo, saida, concorrencia):
+    """Verifica os CNPJs de ARQUIVO (um por linha ou na 1ª coluna de um CSV) e escreve os resultados em NDJSON."""
+    from app.onboarding_pj.routes import verificar_cnpj
+    entradas = [linha.split(',')[0].strip() for linha in arquivo if linha.strip()]
+    with app.app_context():
+        for evento in lote_service.verificar_cnpjs(entradas, verificar_cnpj, concorrencia):
+            saida.write(json.dumps(evento, ensure_ascii=False) + '\n')
+            saida.flush()
+            if evento['tipo'] == 'resultado':
+                click.echo(f"[{evento['progresso']}] {evento['cnpj']}: HTTP {evento['status_code']}", err=True)
+            elif evento['tipo'] == 'fim':
+                click.echo(f"Lote concluído: {evento['sucesso']} sucesso(s), {evento['falha']} falha(s) em {evento['duracao_s']}s.", err=True)
+
+@app.cli.command("reextrair-ocr")
+@click.argument('entrada', type=click.Path(exists=True), required=False)
+@click.option('--saida', type=click.File('w', encoding='utf-8'), default='-', help="Arquivo NDJSON de saída (padrão: stdout).")
+@click.option('--confianca-minima', type=float, default=None, help="Confiança mínima por campo (padrão: OCR_CONFIANCA_MINIMA).")
+@click.option('--batch-size', default=1000, show_default=True, help="Textos lidos do banco por consulta (sem ENTRADA).")
+def reextrair_ocr_command(entrada, saida, confianca_minima, batch_size):
+    """
+    Refaz a extração de campos sobre textos de OCR armazenados. Sem ENTRADA, lê os textos guardados no banco
+    por /extrair-ocr (TextoOcr). ENTRADA pode ser um NDJSON com "texto_ocr" ou "texto" e, opcionalmente, "id",
+    ou um diretório de arquivos .txt.
+    """
+    import os
+    from app.services import ocr_service
+    if entrada is None:
+        def _do_banco():
+            with app.app_context():
+                query = db.session.query(TextoOcr.id, TextoOcr.texto).order_by(TextoOcr.id).yield_per(batch_size)
+                for id_texto, texto in query:
+                    yield {'id': id_texto, 'texto': texto}
+        registros = _do_banco()
+    elif os.path.isdir(entrada):
+        registros = []
+        for nome in sorted(os.listdir(entrada)):
+            if nome.endswith('.txt'):
+                with open(os.path.join(entrada, nome), encoding='utf-8') as f:
+                    registros.append({'id': nome, 'texto': f.read()})
+    else:
+        with open(entrada, encoding='utf-8') as f:
+            registros = [json.loads(linha) for linha in f if linha.strip()]
+    if confianca_minima is None:
+        confianca_minima = app.config.get('OCR_CONFIANCA_MINIMA', 0)
+
+    total = completos = 0
+    por_tipo = {}
+    for resultado in ocr_service.reextrair(registros, confianca_minima):
+        saida.write(json.dumps(resultado, ensure_ascii=False) + '\n')
+        total += 1
+        completos += not resultado['campos_faltando']
+        tipo = resultado['tipo_documento'] or 'não identificado'
+        por_tipo[tipo] = por_tipo.get(tipo, 0) + 1
+    click.echo(f"{total} texto(s), {completos} com todos os campos obrigatórios. Modelos: {por_tipo}", err=True)
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file